@@ -16,13 +16,16 @@ django.setup()
 from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
+from notifications.middleware import JWTAuthMiddleware
 import LMS.routing as routing
 
 # Set up Django before anything else
 application = ProtocolTypeRouter(
     {
         "http": get_asgi_application(),
-        "websocket": AuthMiddlewareStack(URLRouter(routing.websocket_urlpatterns)),
+        "websocket": AuthMiddlewareStack(
+            JWTAuthMiddleware(URLRouter(routing.websocket_urlpatterns))
+        ),
     }
 )
 
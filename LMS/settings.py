@@ -31,6 +31,15 @@ HS256_KEY = os.getenv("HS256_KEY")
 ACCESS_TOKEN_LIFETIME = os.getenv("ACCESS_TOKEN_LIFETIME")
 REFRESH_TOKEN_LIFETIME = os.getenv("REFRESH_TOKEN_LIFETIME")
 DEBUG = os.getenv("DEBUG")
+LEAD_LEASE_TTL_MINUTES = int(os.getenv("LEAD_LEASE_TTL_MINUTES", 30))
+LEAD_INGEST_ENGINE = os.getenv("LEAD_INGEST_ENGINE", "copy")
+LEAD_INGEST_WORKERS = int(os.getenv("LEAD_INGEST_WORKERS", 1))
+UPLOAD_JOB_WORKERS = int(os.getenv("UPLOAD_JOB_WORKERS", 2))
+UPLOAD_JOB_STALE_SECONDS = int(os.getenv("UPLOAD_JOB_STALE_SECONDS", 300))
+PURGE_BATCH_SIZE = int(os.getenv("PURGE_BATCH_SIZE", 5000))
+LEAD_QUOTA_CACHE_SECONDS = int(os.getenv("LEAD_QUOTA_CACHE_SECONDS", 3600))
+LEAD_QUOTA_LOCAL_CACHE_SECONDS = int(os.getenv("LEAD_QUOTA_LOCAL_CACHE_SECONDS", 10))
+NOTIFICATION_RELAY_BATCH_SIZE = int(os.getenv("NOTIFICATION_RELAY_BATCH_SIZE", 500))
 ALLOWED_HOSTS = ["*"]
 
 
@@ -116,6 +125,14 @@ CHANNEL_LAYERS = {
     },
 }
 
+# CACHE, shared by every process (same redis as the channel layer):
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": f"redis://{os.getenv('REDIS_HOST')}:{os.getenv('REDIS_PORT')}",
+    }
+}
+
 
 REST_FRAMEWORK = {
     "EXCEPTION_HANDLER": "LMS.custom_exception_handler.custom_exception_handler",
@@ -183,6 +200,8 @@ USE_TZ = True
 
 
 STATIC_URL = "static/"
+MEDIA_URL = "media/"
+MEDIA_ROOT = os.getenv("MEDIA_ROOT", os.path.join(BASE_DIR, "media"))
 # STATICFILES_DIRS = (
 #     os.path.join(BASE_DIR, "static"),
 # )
@@ -13,7 +13,8 @@ from accounts.api.serializers import (
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from utilities import utils, pagination
+from utilities import utils
+from utilities.utils import get_paginator
 from rest_framework.exceptions import ValidationError
 from django.db import IntegrityError
 from accounts.models import User
@@ -218,10 +219,11 @@ class UsersAPIView(APIView):
                     ),
                     to_attr="roles",
                 )
-            ).order_by("-created_on")
+            ).order_by("-created_on", "-id")
 
+            paginator = get_paginator(request, ordering="-created_on")
             try:
-                paginated_user_qs = pagination.paginate_queryset(users_with_roles, request)
+                paginated_user_qs = paginator.paginate_queryset(users_with_roles, request)
             except NotFound:
                 payload = utils.get_payload(
                     request,
@@ -234,7 +236,7 @@ class UsersAPIView(APIView):
                 request,
                 detail=serialized_user_qs,
                 message="Users List.",
-                extra_information=pagination.get_paginated_response(
+                extra_information=paginator.get_paginated_response(
                     data=serialized_user_qs
                 ),
             )
@@ -72,6 +72,12 @@ class User(AbstractUser):
     REQUIRED_FIELDS = [] # Email & Password are required by default.
     objects = UserManager()
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # keyset pagination of the user list
+            models.Index(fields=["created_on", "id"]),
+        ]
+
     def __str__(self):
         return "{0}".format(self.email)
 
@@ -1,3 +1,123 @@
+import json
+from base64 import urlsafe_b64encode
+from datetime import datetime, timezone
+from urllib.parse import parse_qs, urlsplit
 from django.test import TestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from accounts.models import User
+from utilities.custom_exceptions import PageNotFound
+from utilities.utils import KeysetPagination
 
-# Create your tests here.
+
+class KeysetPaginationTestCase(TestCase):
+    """
+    Keyset pages of users ordered by the nullable created_on, with several
+    users per timestamp and several without one.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        timestamps = [
+            datetime(2024, 1, 1, 9, 0, 0, 1, tzinfo=timezone.utc),
+            datetime(2024, 1, 1, 9, 0, 0, 2, tzinfo=timezone.utc),
+            datetime(2024, 3, 5, 12, 30, tzinfo=timezone.utc),
+            None,
+        ]
+        for index in range(17):
+            user = User.objects.create_user(email=f"user{index}@example.com")
+            # auto_now_add ignores a value passed to create().
+            User.objects.filter(id=user.id).update(created_on=timestamps[index % 4])
+
+        cls.users = list(User.objects.values_list("id", "created_on"))
+
+    def expected_ids(self, descending: bool):
+        """Ids in (created_on, id) order, NULLs last ascending, first descending."""
+        dated = sorted((created_on, pk) for pk, created_on in self.users if created_on)
+        undated = sorted((None, pk) for pk, created_on in self.users if not created_on)
+        rows = dated + undated
+        if descending:
+            rows.reverse()
+        return [pk for _, pk in rows]
+
+    def get_page(self, ordering: str, page_size: int, cursor: str = None):
+        params = {"page_size": page_size, "count": "none"}
+        if cursor is not None:
+            params["cursor"] = cursor
+        request = Request(APIRequestFactory().get("/api/v1/users/", params))
+        paginator = KeysetPagination(ordering=ordering)
+        page = paginator.paginate_queryset(User.objects.all(), request)
+        links = paginator.get_paginated_response([])["pagination_info"]["links"]
+        return [user.id for user in page], links
+
+    def get_cursor(self, link: str) -> str:
+        return parse_qs(urlsplit(link).query)["cursor"][0]
+
+    def test_seek_filter_continues_after_every_row(self):
+        for ordering in ("created_on", "-created_on"):
+            paginator = KeysetPagination(ordering=ordering)
+            paginator.model = User
+            expected = self.expected_ids(paginator.descending)
+            direction = "-" if paginator.descending else ""
+            users = {user.id: user for user in User.objects.all()}
+
+            for position, pk in enumerate(expected):
+                with self.subTest(ordering=ordering, position=position):
+                    cursor = paginator.encode_cursor(users[pk])
+                    value, cursor_pk, reverse = paginator.parse_cursor(cursor, User)
+                    self.assertEqual((value, cursor_pk, reverse), (users[pk].created_on, pk, False))
+
+                    rest = User.objects.filter(
+                        paginator.get_seek_filter(User, value, cursor_pk, paginator.descending)
+                    ).order_by(f"{direction}created_on", f"{direction}pk")
+                    self.assertEqual(list(rest.values_list("id", flat=True)), expected[position + 1 :])
+
+    def test_pages_have_no_gaps_or_duplicates(self):
+        for ordering in ("created_on", "-created_on"):
+            for page_size in (1, 2, 3, 5):
+                with self.subTest(ordering=ordering, page_size=page_size):
+                    expected = self.expected_ids(ordering.startswith("-"))
+
+                    # Forward through the next links.
+                    pages = []
+                    page, links = self.get_page(ordering, page_size)
+                    pages.append(page)
+                    while links["next"]:
+                        page, links = self.get_page(
+                            ordering, page_size, self.get_cursor(links["next"])
+                        )
+                        pages.append(page)
+                    self.assertEqual(sum(pages, []), expected)
+                    self.assertTrue(all(len(page) == page_size for page in pages[:-1]))
+
+                    # Back from the last page through the previous links.
+                    backward = [page]
+                    while links["previous"]:
+                        page, links = self.get_page(
+                            ordering, page_size, self.get_cursor(links["previous"])
+                        )
+                        backward.insert(0, page)
+                    self.assertEqual(sum(backward, []), expected)
+                    self.assertEqual(backward, pages)
+
+    def test_malformed_cursor_raises_page_not_found(self):
+        paginator = KeysetPagination(ordering="-created_on")
+
+        def encode(cursor) -> str:
+            return urlsafe_b64encode(json.dumps(cursor).encode()).decode()
+
+        malformed = [
+            "not a cursor",
+            urlsafe_b64encode(b"{not json").decode(),
+            encode({"v": "2024-01-01T09:00:00+00:00", "r": False}),
+            encode({"v": "yesterday", "id": 1, "r": False}),
+            encode({"v": None, "id": "one", "r": False}),
+        ]
+        for cursor in malformed:
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(PageNotFound):
+                    paginator.parse_cursor(cursor, User)
+
+        request = Request(APIRequestFactory().get("/api/v1/users/", {"cursor": "not a cursor"}))
+        with self.assertRaises(PageNotFound):
+            paginator.paginate_queryset(User.objects.all(), request)
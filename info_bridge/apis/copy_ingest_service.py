@@ -0,0 +1,125 @@
+import io
+from django.db import connection
+from info_bridge.apis import lead_dedupe_service
+
+
+STAGING_TABLE = "lead_upload_staging"
+
+STAGING_COLUMNS = [
+    "row_no",
+    "first_name",
+    "last_name",
+    "email",
+    "contact_no",
+    "alt_contact_no",
+    "school",
+    "father_name",
+    "mother_name",
+    "parents_contact_no",
+    "country_id",
+    "state_id",
+    "city_id",
+    "postal_code",
+]
+
+# ON COMMIT DROP keeps the staging table private to the upload transaction;
+# chunks that share one transaction reuse it after a TRUNCATE.
+CREATE_STAGING_SQL = f"""
+CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} (
+    row_no integer,
+    first_name text,
+    last_name text,
+    email text,
+    contact_no text,
+    alt_contact_no text,
+    school text,
+    father_name text,
+    mother_name text,
+    parents_contact_no text,
+    country_id bigint,
+    state_id bigint,
+    city_id bigint,
+    postal_code text
+) ON COMMIT DROP;
+TRUNCATE {STAGING_TABLE};
+"""
+
+COPY_STAGING_SQL = (
+    f"COPY {STAGING_TABLE} ({', '.join(STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+)
+
+# Fan the staged rows out in one statement. New leads are mapped back to their
+# staging row by email, which is unique on leads_studentleads. Duplicates are
+# filtered out before staging; ON CONFLICT only covers a lead inserted
+# concurrently, whose staged row comes back with a NULL lead_id.
+FAN_OUT_SQL = f"""
+WITH inserted_leads AS (
+    INSERT INTO leads_studentleads (
+        first_name, last_name, email, contact_no, alt_contact_no,
+        gender, school, is_attempted, is_assigned, uploaded_id
+    )
+    SELECT
+        first_name, last_name, email, contact_no, alt_contact_no,
+        %s, school, FALSE, FALSE, %s
+    FROM {STAGING_TABLE}
+    ORDER BY row_no
+    ON CONFLICT (email) DO NOTHING
+    RETURNING id, email
+),
+staged AS (
+    SELECT il.id AS lead_id, st.*
+    FROM inserted_leads il
+    JOIN {STAGING_TABLE} st ON st.email = il.email
+),
+inserted_parents_info AS (
+    INSERT INTO leads_parentsinfo (
+        lead_id, father_name, mother_name, father_contact_no, mother_contact_no
+    )
+    SELECT lead_id, father_name, mother_name, parents_contact_no, parents_contact_no
+    FROM staged
+),
+inserted_addresses AS (
+    INSERT INTO locations_address (lead_id, country_id, state_id, city_id, postal_code)
+    SELECT lead_id, country_id, state_id, city_id, postal_code
+    FROM staged
+)
+SELECT st.row_no, st.email, staged.lead_id
+FROM {STAGING_TABLE} st
+LEFT JOIN staged ON staged.row_no = st.row_no
+ORDER BY st.row_no;
+"""
+
+
+def copy_lead_data(dataframe, uploaded_id: int, gender: str):
+    """
+    Stream a normalised, geography-resolved chunk into the staging table with
+    COPY and insert its leads, parents info and addresses set-based.
+    Must run inside a transaction.
+
+    Returns (lead_ids, rejections): the new lead ids in row order, and an
+    (row_no, email, "ALREADY_EXISTS", lead_id) tuple for every row whose
+    email another upload inserted after the chunk was deduplicated.
+    """
+    if "row_no" not in dataframe:
+        dataframe = dataframe.assign(row_no=range(1, len(dataframe) + 1))
+    buffer = io.StringIO()
+    dataframe[STAGING_COLUMNS].to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+
+    with connection.cursor() as cursor:
+        cursor.execute(CREATE_STAGING_SQL)
+        cursor.copy_expert(COPY_STAGING_SQL, buffer)
+        cursor.execute(FAN_OUT_SQL, [gender, uploaded_id])
+        rows = cursor.fetchall()
+
+    lead_ids = [lead_id for _, _, lead_id in rows if lead_id is not None]
+    conflicts = [(row_no, email) for row_no, email, lead_id in rows if lead_id is None]
+    if not conflicts:
+        return lead_ids, []
+
+    # The conflicting leads committed after this statement's snapshot was
+    # taken, so they are only visible to a new one.
+    existing = lead_dedupe_service.find_existing_emails([email for _, email in conflicts])
+    return lead_ids, [
+        (row_no, email, "ALREADY_EXISTS", existing.get(email)) for row_no, email in conflicts
+    ]
@@ -0,0 +1,87 @@
+from itertools import repeat
+from django.db import connection
+
+
+DUPLICATE_MODE_REJECT = "reject"
+DUPLICATE_MODE_MERGE = "merge"
+DUPLICATE_MODES = [DUPLICATE_MODE_REJECT, DUPLICATE_MODE_MERGE]
+
+# One probe per chunk against the unique email index.
+FIND_EXISTING_EMAILS_SQL = """
+SELECT sl.email, sl.id
+FROM unnest(%s::text[]) AS probe(email)
+JOIN leads_studentleads sl ON sl.email = probe.email;
+"""
+
+# Merging only fills contact details the existing lead is missing, so the
+# lead's school and address (and with them its facet) never move.
+MERGE_INTO_EXISTING_SQL = """
+UPDATE leads_studentleads sl
+SET last_name = COALESCE(sl.last_name, m.last_name),
+    contact_no = COALESCE(sl.contact_no, m.contact_no),
+    alt_contact_no = COALESCE(sl.alt_contact_no, m.alt_contact_no)
+FROM unnest(%s::bigint[], %s::text[], %s::text[], %s::text[])
+    AS m(id, last_name, contact_no, alt_contact_no)
+WHERE sl.id = m.id;
+"""
+
+
+def _as_text(values):
+    return [None if value is None else str(value) for value in values]
+
+
+def find_existing_emails(emails) -> dict:
+    """email -> id of the leads that already use one of ``emails``."""
+    if not emails:
+        return {}
+    with connection.cursor() as cursor:
+        cursor.execute(FIND_EXISTING_EMAILS_SQL, [list(emails)])
+        return dict(cursor.fetchall())
+
+
+def merge_into_existing(dataframe, lead_ids):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            MERGE_INTO_EXISTING_SQL,
+            [
+                list(lead_ids),
+                _as_text(dataframe["last_name"]),
+                _as_text(dataframe["contact_no"]),
+                _as_text(dataframe["alt_contact_no"]),
+            ],
+        )
+
+
+def split_duplicates(dataframe, duplicate_mode: str = DUPLICATE_MODE_REJECT):
+    """
+    Split a normalised chunk (with a row_no column) into the rows to insert
+    and the rejected ones. Rows without an email, repeats of an email earlier
+    in the chunk and emails that already exist are taken out. In merge mode
+    the latter are folded into the existing lead first.
+
+    Returns (dataframe, rejections) where rejections are
+    (row_no, email, reason, lead_id) tuples.
+    """
+    rejections = []
+
+    is_missing = dataframe["email"].isna()
+    is_repeated = ~is_missing & dataframe.duplicated("email", keep="first")
+    for mask, reason in ((is_missing, "MISSING_EMAIL"), (is_repeated, "DUPLICATE_IN_FILE")):
+        rejected = dataframe[mask]
+        rejections.extend(zip(rejected["row_no"], rejected["email"], repeat(reason), repeat(None)))
+    dataframe = dataframe[~(is_missing | is_repeated)]
+
+    existing = find_existing_emails(dataframe["email"].tolist())
+    if existing:
+        is_existing = dataframe["email"].isin(existing.keys())
+        duplicates = dataframe[is_existing]
+        lead_ids = duplicates["email"].map(existing).tolist()
+        if duplicate_mode == DUPLICATE_MODE_MERGE:
+            merge_into_existing(duplicates, lead_ids)
+            reason = "MERGED"
+        else:
+            reason = "ALREADY_EXISTS"
+        rejections.extend(zip(duplicates["row_no"], duplicates["email"], repeat(reason), lead_ids))
+        dataframe = dataframe[~is_existing]
+
+    return dataframe, rejections
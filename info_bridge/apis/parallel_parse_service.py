@@ -0,0 +1,221 @@
+# Imported by spawned parse workers before Django is set up, so Django and
+# the apps are only imported inside functions.
+import io
+import multiprocessing
+import re
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.worksheet._reader import WorkSheetParser
+
+
+READ_SIZE = 1 << 20
+SHEET_DATA_RE = re.compile(rb"<(?P<prefix>[\w.-]+:)?sheetData\b[^>]*?(?P<empty>/)?>")
+ROOT_TAG_RE = re.compile(rb"<(?![?!])(?P<name>[\w.:-]+)[^>]*>")
+
+_parser_state = {}
+
+
+def _init_parser(shared_strings, root_tag, root_name, epoch, date_formats, timedelta_formats):
+    from django.apps import apps
+
+    if not apps.ready:
+        import django
+
+        django.setup()
+    _parser_state.update(
+        shared_strings=shared_strings,
+        root_tag=root_tag,
+        root_name=root_name,
+        epoch=epoch,
+        date_formats=date_formats,
+        timedelta_formats=timedelta_formats,
+    )
+
+
+def _parse_rows(block: bytes):
+    """Yield the value tuples of the rows in ``block``, as the serial reader would."""
+    source = io.BytesIO(
+        _parser_state["root_tag"]
+        + b"<sheetData>"
+        + block
+        + b"</sheetData></"
+        + _parser_state["root_name"]
+        + b">"
+    )
+    parser = WorkSheetParser(
+        source,
+        _parser_state["shared_strings"],
+        data_only=True,
+        epoch=_parser_state["epoch"],
+        date_formats=_parser_state["date_formats"],
+        timedelta_formats=_parser_state["timedelta_formats"],
+    )
+    for _, cells in parser.parse():
+        if not cells:
+            continue
+        values = [None] * cells[-1]["column"]
+        for cell in cells:
+            values[cell["column"] - 1] = cell["value"]
+        yield values
+
+
+def _parse_block(block: bytes, columns):
+    from info_bridge.apis.upload_service import DataProcessor
+
+    width = len(columns)
+    rows = []
+    for values in _parse_rows(block):
+        values = (values + [None] * width)[:width]
+        if any(value is not None for value in values):
+            rows.append(values)
+
+    dataframe = DataProcessor._normalize_lead_frame(pd.DataFrame(rows, columns=columns))
+    dataframe.attrs["normalized"] = True
+    return dataframe
+
+
+def _header_values(block: bytes):
+    """
+    Values of the row in ``block`` if it can be the header, None if blank.
+    Like the serial reader, the first row with a value is the header.
+    """
+    for values in _parse_rows(block):
+        if any(value is not None for value in values):
+            return values
+    return None
+
+
+def _iter_row_blocks(stream, chunk_size: int):
+    """
+    Yield (root_tag, root_name) first, then each row's XML on its own up to
+    and including the header row, then blocks of up to ``chunk_size`` rows
+    of the worksheet XML. The parser must be initialised from the root tag
+    before the rows are read, to tell blank rows from the header.
+    """
+    buffer = bytearray()
+    row_end = None
+    rows_per_block = 1  # rows go alone until the header is found
+    header_found = False
+    rows_found = 0
+    scan_from = 0
+
+    while True:
+        data = stream.read(READ_SIZE)
+        buffer += data
+
+        if row_end is None:
+            sheet_data = SHEET_DATA_RE.search(buffer)
+            if sheet_data is None:
+                if not data:
+                    return
+                continue
+            if sheet_data.group("empty"):
+                return
+            root = ROOT_TAG_RE.search(buffer)
+            yield bytes(root.group(0)), root.group("name")
+            row_end = b"</" + (sheet_data.group("prefix") or b"") + b"row>"
+            sheet_data_end = b"</" + (sheet_data.group("prefix") or b"") + b"sheetData>"
+            del buffer[: sheet_data.end()]
+
+        while True:
+            position = buffer.find(row_end, scan_from)
+            if position == -1:
+                scan_from = max(0, len(buffer) - len(row_end))
+                break
+            scan_from = position + len(row_end)
+            rows_found += 1
+            if rows_found == rows_per_block:
+                block = bytes(buffer[:scan_from])
+                yield block
+                del buffer[:scan_from]
+                scan_from = rows_found = 0
+                if not header_found and _header_values(block) is not None:
+                    header_found = True
+                    rows_per_block = chunk_size
+
+        if not data:
+            end = buffer.find(sheet_data_end)
+            tail = bytes(buffer[:end] if end != -1 else buffer)
+            if tail.strip():
+                yield tail
+            return
+
+
+def iter_excel_chunks_parallel(
+    file_path, chunk_size: int, skip_rows: int = 0, workers: int = 2
+):
+    """
+    Same contract as DataProcessor.iter_excel_chunks, but parsing and
+    normalisation run in ``workers`` processes. This process only inflates
+    the worksheet XML and cuts it into blocks of ``chunk_size`` rows at
+    ``</row>`` boundaries. The workers parse every block with openpyxl's own
+    WorkSheetParser, so values match the serial reader. Blocks come back in
+    file order to the single writer consuming this generator, and at most
+    ``2 * workers`` are in flight.
+    """
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        parser_args = (
+            workbook.shared_strings,
+            workbook.epoch,
+            workbook._date_formats,
+            workbook._timedelta_formats,
+        )
+        worksheet_path = workbook.worksheets[0]._worksheet_path
+    finally:
+        workbook.close()
+
+    if hasattr(file_path, "seek"):
+        file_path.seek(0)
+    with zipfile.ZipFile(file_path) as archive, archive.open(worksheet_path) as stream:
+        blocks = _iter_row_blocks(stream, chunk_size)
+        root = next(blocks, None)
+        if root is None:
+            return
+
+        shared_strings, epoch, date_formats, timedelta_formats = parser_args
+        init_args = (shared_strings, *root, epoch, date_formats, timedelta_formats)
+        _init_parser(*init_args)
+        header = None
+        for header_block in blocks:
+            header = _header_values(header_block)
+            if header is not None:
+                break
+        if header is None:
+            return
+        columns = [
+            str(column).strip() if column is not None else f"unnamed_{index}"
+            for index, column in enumerate(header)
+        ]
+
+        # Spawned rather than forked: the upload workers run as threads and
+        # hold open database connections.
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_parser,
+            initargs=init_args,
+        ) as executor:
+            in_flight = deque()
+            for block in blocks:
+                in_flight.append(executor.submit(_parse_block, block, columns))
+                if len(in_flight) < 2 * workers:
+                    continue
+                dataframe, skip_rows = _skip(in_flight.popleft().result(), skip_rows)
+                if not dataframe.empty:
+                    yield dataframe
+
+            while in_flight:
+                dataframe, skip_rows = _skip(in_flight.popleft().result(), skip_rows)
+                if not dataframe.empty:
+                    yield dataframe
+
+
+def _skip(dataframe, skip_rows: int):
+    if not skip_rows:
+        return dataframe, 0
+    skipped = min(skip_rows, len(dataframe))
+    return dataframe.iloc[skipped:], skip_rows - skipped
@@ -0,0 +1,94 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from info_bridge.models import DataBridge
+from leads.services import lead_counter_service, lead_facet_service
+
+
+# Next batch of purgeable leads in id order. The row locks keep the claim
+# service (which skips locked rows) from handing one of them out meanwhile.
+SELECT_PURGE_BATCH_SQL = """
+SELECT id
+FROM leads_studentleads
+WHERE uploaded_id = %s AND NOT is_attempted AND id > %s
+ORDER BY id
+LIMIT %s
+FOR UPDATE;
+"""
+
+# One set-based DELETE per dependent table, children first. Each takes the
+# batch's lead ids as its only parameter.
+PURGE_BATCH_SQL = [
+    """
+    DELETE FROM notifications_notificationoutbox o
+    USING notifications_notification n, leads_leadremark lr
+    WHERE o.notification_id = n.id AND n.lead_id = lr.id
+    AND lr.lead_id = ANY(%s::bigint[]);
+    """,
+    """
+    DELETE FROM notifications_notification n
+    USING leads_leadremark lr
+    WHERE n.lead_id = lr.id AND lr.lead_id = ANY(%s::bigint[]);
+    """,
+    """
+    DELETE FROM leads_leadremarkhistory lrh
+    USING leads_leadremark lr
+    WHERE lrh.leadremark_id = lr.id AND lr.lead_id = ANY(%s::bigint[]);
+    """,
+    "DELETE FROM leads_leadremark WHERE lead_id = ANY(%s::bigint[]);",
+    "DELETE FROM leads_followup WHERE lead_id = ANY(%s::bigint[]);",
+    "DELETE FROM leads_assignedto WHERE lead_id = ANY(%s::bigint[]);",
+    "DELETE FROM leads_parentsinfo WHERE lead_id = ANY(%s::bigint[]);",
+    "DELETE FROM leads_education WHERE lead_id = ANY(%s::bigint[]);",
+    "DELETE FROM leads_generaldetails WHERE lead_id = ANY(%s::bigint[]);",
+    "DELETE FROM locations_address WHERE lead_id = ANY(%s::bigint[]);",
+    "DELETE FROM leads_studentleads WHERE id = ANY(%s::bigint[]);",
+]
+
+
+def _purge_batch(data_bridge_id: int, after_id: int, batch_size: int) -> list:
+    """Delete the next batch of leads and everything hanging off them."""
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(SELECT_PURGE_BATCH_SQL, [data_bridge_id, after_id, batch_size])
+            lead_ids = [lead_id for lead_id, in cursor.fetchall()]
+            if not lead_ids:
+                return lead_ids
+
+            lead_facet_service.remove_leads(lead_ids)
+            lead_counter_service.remove_leads(lead_ids)
+            for sql in PURGE_BATCH_SQL:
+                cursor.execute(sql, [lead_ids])
+
+        DataBridge.objects.filter(id=data_bridge_id).update(
+            lead_count=F("lead_count") - len(lead_ids)
+        )
+    return lead_ids
+
+
+def purge_data_bridge(data_bridge_id: int, batch_size: int = None, on_progress=None) -> int:
+    """
+    Delete the unattempted leads of an uploaded file in id-ordered batches of
+    ``batch_size``, each batch committed on its own. The file itself goes
+    too once none of its leads are left.
+
+    Safe to run again after an interruption. Returns the number of leads deleted.
+    """
+    batch_size = batch_size or settings.PURGE_BATCH_SIZE
+    rows_deleted = 0
+    after_id = 0
+
+    while True:
+        lead_ids = _purge_batch(data_bridge_id, after_id, batch_size)
+        if not lead_ids:
+            break
+        rows_deleted += len(lead_ids)
+        after_id = lead_ids[-1]
+        if on_progress is not None:
+            on_progress(rows_deleted)
+
+    data_bridge_qs = DataBridge.objects.filter(id=data_bridge_id)
+    if not data_bridge_qs.filter(student_lead__isnull=False).exists():
+        data_bridge_qs.delete()
+
+    return rows_deleted
@@ -1,6 +1,7 @@
 from rest_framework import serializers
-from info_bridge.models import DataBridge
+from info_bridge.models import DataBridge, DataBridgeJob
 from utilities import utils
+from utilities.row_serializers import RowSerializer, format_datetime
 
 
 class DataBridgeSerializer(serializers.ModelSerializer):
@@ -52,4 +53,56 @@ class DataBridgeListSerializer(serializers.ModelSerializer):
     def get_lead_uploaded_at(self, obj=None):
         if obj is not None:
             return utils.convert_into_desired_dtime_format(obj=obj.lead_uploaded_at)
-        return None
\ No newline at end of file
+        return None
+
+class DataBridgeListRowSerializer(RowSerializer):
+    """DataBridgeListSerializer's output, from DataBridge values() rows."""
+
+    fields = (
+        ("id", "id", None),
+        ("file_name", "file_name", None),
+        ("source", "source", None),
+        ("sub_source", "sub_source", None),
+        ("year", "year", None),
+        ("lead_count", "lead_count", None),
+        ("uploaded_by", "uploaded_by__email", None),
+        ("lead_uploaded_at", "lead_uploaded_at", format_datetime),
+    )
+
+
+class DataBridgeJobSerializer(serializers.ModelSerializer):
+
+    file_name = serializers.SerializerMethodField()
+    created_at = serializers.SerializerMethodField()
+    finished_at = serializers.SerializerMethodField()
+
+    class Meta:
+        model = DataBridgeJob
+        fields = [
+            "id",
+            "job_type",
+            "status",
+            "file_name",
+            "rows_parsed",
+            "rows_inserted",
+            "rows_rejected",
+            "rows_deleted",
+            "error_message",
+            "created_at",
+            "finished_at",
+        ]
+
+    def get_file_name(self, obj=None):
+        if obj is not None and obj.data_bridge is not None:
+            return obj.data_bridge.file_name
+        return None
+
+    def get_created_at(self, obj=None):
+        if obj is not None:
+            return utils.convert_into_desired_dtime_format(obj=obj.created_at)
+        return None
+
+    def get_finished_at(self, obj=None):
+        if obj is not None and obj.finished_at is not None:
+            return utils.convert_into_desired_dtime_format(obj=obj.finished_at)
+        return None
@@ -0,0 +1,204 @@
+import hashlib
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from info_bridge.apis import purge_service
+from info_bridge.apis.lead_dedupe_service import DUPLICATE_MODE_REJECT
+from info_bridge.apis.upload_service import DataProcessor
+from info_bridge.models import DataBridgeJob, UploadCheckpoint
+from notifications.services import notification_service
+
+
+CLAIM_NEXT_JOB_SQL = """
+UPDATE info_bridge_databridgejob
+SET status = 'RUNNING', started_at = %s, heartbeat_at = %s
+WHERE id = (
+    SELECT id
+    FROM info_bridge_databridgejob
+    WHERE status = 'QUEUED'
+    ORDER BY id
+    FOR UPDATE SKIP LOCKED
+    LIMIT 1
+)
+RETURNING id;
+"""
+
+
+def compute_file_hash(file) -> str:
+    sha256 = hashlib.sha256()
+    for chunk in file.chunks():
+        sha256.update(chunk)
+    file.seek(0)
+    return sha256.hexdigest()
+
+
+def get_resumable_checkpoint(data_bridge, file_hash: str):
+    """The unfinished checkpoint of an earlier upload of the same file, if any."""
+    return UploadCheckpoint.objects.filter(
+        data_bridge=data_bridge, file_hash=file_hash, is_completed=False
+    ).first()
+
+
+def enqueue_job(
+    job_type: str,
+    file,
+    created_by,
+    data_bridge,
+    file_hash: str = None,
+    duplicate_mode: str = DUPLICATE_MODE_REJECT,
+) -> DataBridgeJob:
+    """Store the uploaded file and queue it for the upload workers."""
+    return DataBridgeJob.objects.create(
+        job_type=job_type,
+        file=file,
+        file_hash=file_hash or compute_file_hash(file),
+        duplicate_mode=duplicate_mode,
+        created_by=created_by,
+        data_bridge=data_bridge,
+    )
+
+
+def enqueue_purge_job(data_bridge, created_by) -> DataBridgeJob:
+    """Queue the deletion of a file's unattempted leads."""
+    return DataBridgeJob.objects.create(
+        job_type="PURGE", created_by=created_by, data_bridge=data_bridge
+    )
+
+
+def get_active_purge_job(data_bridge):
+    return DataBridgeJob.objects.filter(
+        job_type="PURGE", data_bridge=data_bridge, status__in=["QUEUED", "RUNNING"]
+    ).first()
+
+
+def get_job_checkpoint(job: DataBridgeJob):
+    return UploadCheckpoint.objects.filter(
+        data_bridge_id=job.data_bridge_id, file_hash=job.file_hash
+    ).first()
+
+
+def retry_job(job: DataBridgeJob) -> bool:
+    """Queue a failed job again; it resumes after its last committed chunk."""
+    return bool(
+        DataBridgeJob.objects.filter(id=job.id, status="FAILED")
+        .exclude(file="")
+        .update(status="QUEUED", error_message=None, finished_at=None)
+    )
+
+
+def requeue_stale_jobs(stale_after: timedelta = None) -> int:
+    """Hand RUNNING jobs whose worker stopped heartbeating back to the queue."""
+    if stale_after is None:
+        stale_after = timedelta(seconds=settings.UPLOAD_JOB_STALE_SECONDS)
+    return DataBridgeJob.objects.filter(
+        status="RUNNING", heartbeat_at__lt=timezone.now() - stale_after
+    ).update(status="QUEUED")
+
+
+def claim_next_job():
+    """Mark the oldest queued job as RUNNING. Concurrent workers skip each other's rows."""
+    now = timezone.now()
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(CLAIM_NEXT_JOB_SQL, [now, now])
+            row = cursor.fetchone()
+    if row is None:
+        return None
+    return DataBridgeJob.objects.select_related("data_bridge").get(id=row[0])
+
+
+def get_job_progress(job: DataBridgeJob) -> dict:
+    return {
+        "job_id": job.id,
+        "job_type": job.job_type,
+        "status": job.status,
+        "file_name": job.data_bridge.file_name if job.data_bridge else None,
+        "rows_parsed": job.rows_parsed,
+        "rows_inserted": job.rows_inserted,
+        "rows_rejected": job.rows_rejected,
+        "rows_deleted": job.rows_deleted,
+        "error_message": job.error_message,
+    }
+
+
+def publish_progress(job: DataBridgeJob):
+    """Push the job progress to the websockets of the user who started it."""
+    try:
+        notification_service.send_event(
+            {"type": "upload_progress", "message": get_job_progress(job)},
+            user_ids=[job.created_by_id],
+        )
+    except Exception:
+        # Progress is best effort; the status endpoint stays authoritative.
+        pass
+
+
+def _save_progress(job: DataBridgeJob, *fields):
+    # Scoped to this claim, so a worker whose job was requeued as stale cannot
+    # overwrite the progress of the run that took over.
+    job.heartbeat_at = timezone.now()
+    DataBridgeJob.objects.filter(id=job.id, started_at=job.started_at).update(
+        heartbeat_at=job.heartbeat_at, **{field: getattr(job, field) for field in fields}
+    )
+    publish_progress(job)
+
+
+def _run_upload(job: DataBridgeJob):
+    def on_progress(rows_parsed, rows_inserted):
+        job.rows_parsed = rows_parsed
+        job.rows_inserted = rows_inserted
+        job.rows_rejected = rows_parsed - rows_inserted
+        _save_progress(job, "rows_parsed", "rows_inserted", "rows_rejected")
+
+    checkpoint, _ = UploadCheckpoint.objects.get_or_create(
+        data_bridge_id=job.data_bridge_id, file_hash=job.file_hash
+    )
+    if not checkpoint.is_completed:
+        with job.file.open("rb") as upload_file:
+            DataProcessor.process_upload_file(
+                upload_file=upload_file,
+                uploaded_id=job.data_bridge_id,
+                on_progress=on_progress,
+                checkpoint=checkpoint,
+                duplicate_mode=job.duplicate_mode,
+            )
+        UploadCheckpoint.objects.filter(id=checkpoint.id).update(is_completed=True)
+    on_progress(checkpoint.chunk_offset, checkpoint.rows_committed)
+
+
+def _run_purge(job: DataBridgeJob):
+    # Batches an interrupted run committed are gone already, keep counting on.
+    rows_deleted_before = job.rows_deleted
+
+    def on_progress(rows_deleted):
+        job.rows_deleted = rows_deleted_before + rows_deleted
+        _save_progress(job, "rows_deleted")
+
+    purge_service.purge_data_bridge(job.data_bridge_id, on_progress=on_progress)
+
+
+def run_job(job: DataBridgeJob):
+    """
+    Run a claimed job, reporting progress after every chunk or batch.
+    Uploads skip the rows an earlier run of the same file already committed;
+    purges simply carry on with the leads that are left.
+    """
+    publish_progress(job)
+    try:
+        if job.data_bridge_id is None:
+            raise ValueError("The file this job belongs to no longer exists.")
+
+        if job.job_type == "PURGE":
+            _run_purge(job)
+        else:
+            _run_upload(job)
+    except Exception as e:
+        job.status = "FAILED"
+        job.error_message = str(e)
+    else:
+        job.status = "COMPLETED"
+        job.file.delete(save=False)
+
+    job.finished_at = timezone.now()
+    _save_progress(job, "status", "error_message", "finished_at", "file")
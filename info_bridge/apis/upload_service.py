@@ -1,115 +1,429 @@
 # uploads/services.py
 
+import functools
 import pandas as pd
+from django.conf import settings
 from django.db import transaction
-# from info_bridge.models import DataBridge
+from django.db.models import F
+from django.utils import timezone
+from info_bridge.models import DataBridge, UploadCheckpoint, UploadRejection
 from leads.models import StudentLeads, ParentsInfo
 from locations.models import Address, Country, State, City
 from utilities.custom_exceptions import UnexpectedError
-# from openpyxl import load_workbook
+from leads.services import lead_facet_service
+from info_bridge.apis import (
+    copy_ingest_service,
+    lead_dedupe_service,
+    parallel_parse_service,
+)
+from openpyxl import load_workbook
+
+
+UPLOAD_COLUMNS = [
+    "first_name",
+    "last_name",
+    "email",
+    "contact_no",
+    "alt_contact_no",
+    "school",
+    "father_name",
+    "mother_name",
+    "parents_contact_no",
+    "country",
+    "state",
+    "city",
+    "postal_code",
+]
+UPPERCASE_COLUMNS = ["school", "country", "state", "city"]
+
+UPLOAD_CHUNK_SIZE = 100000
+
+INGEST_ENGINE_ORM = "orm"
+INGEST_ENGINE_COPY = "copy"
+INGEST_ENGINES = [INGEST_ENGINE_ORM, INGEST_ENGINE_COPY]
 
 
 class DataProcessor:
 
     @staticmethod
-    def get_total_rows(file_path):
-        df = pd.read_excel(file_path, usecols=[0])  # Read only the first column
-        return len(df)
+    def iter_excel_chunks(
+        file_path, chunk_size: int = UPLOAD_CHUNK_SIZE, skip_rows: int = 0
+    ):
+        """
+        Stream the first worksheet once with openpyxl's read-only reader and
+        yield DataFrames of at most ``chunk_size`` rows. The first row with a
+        value is the header. Blank rows are skipped, as are the first
+        ``skip_rows`` data rows (already committed ones).
+        """
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header = next(
+                (row for row in rows if any(value is not None for value in row)), None
+            )
+            if header is None:
+                return
 
+            columns = [
+                str(column).strip() if column is not None else f"unnamed_{index}"
+                for index, column in enumerate(header)
+            ]
+            width = len(columns)
+            batch = []
+            for row in rows:
+                row = row[:width]
+                if all(value is None for value in row):
+                    continue
+                if skip_rows:
+                    skip_rows -= 1
+                    continue
+                batch.append(row)
+                if len(batch) == chunk_size:
+                    yield pd.DataFrame(batch, columns=columns)
+                    batch = []
+            if batch:
+                yield pd.DataFrame(batch, columns=columns)
+        finally:
+            workbook.close()
 
     @staticmethod
-    def process_excel_in_chunks(file_path: str, uploaded_id: int):
-        chunk_size = 100000
-        start_row = 0
-        total_rows = DataProcessor.get_total_rows(file_path)
-        df_header = pd.read_excel(
-            file_path, nrows=0
-        )  # Read the header first to get the column names
-
-        columns = df_header.columns
-        while True:
-            df_chunk = pd.read_excel(
-                file_path, skiprows=start_row, nrows=chunk_size, header=0, names=columns
+    def iter_csv_chunks(
+        file_path, chunk_size: int = UPLOAD_CHUNK_SIZE, skip_rows: int = 0
+    ):
+        """
+        Stream a CSV with pandas' C parser and yield DataFrames of at most
+        ``chunk_size`` rows. Only UPLOAD_COLUMNS are parsed, every value is
+        kept as text (so contact numbers never turn into floats), only empty
+        cells count as missing and blank rows are skipped, as for XLSX. The
+        first ``skip_rows`` data rows are parsed but not yielded.
+        """
+        reader = pd.read_csv(
+            file_path,
+            chunksize=chunk_size,
+            dtype=str,
+            usecols=lambda column: column.strip() in UPLOAD_COLUMNS,
+            keep_default_na=False,
+            na_values=[""],
+            encoding="utf-8-sig",
+        )
+        for df_chunk in reader:
+            df_chunk = df_chunk.rename(columns=str.strip).dropna(how="all")
+            if skip_rows:
+                skipped = min(skip_rows, len(df_chunk))
+                df_chunk = df_chunk.iloc[skipped:]
+                skip_rows -= skipped
+            if not df_chunk.empty:
+                yield df_chunk
+
+    @staticmethod
+    def process_in_chunks(
+        iter_chunks,
+        file_path,
+        uploaded_id: int,
+        engine: str,
+        on_progress=None,
+        checkpoint=None,
+        duplicate_mode: str = lead_dedupe_service.DUPLICATE_MODE_REJECT,
+    ):
+        """
+        Ingest the file chunk by chunk, one transaction per chunk. After
+        every chunk ``on_progress(rows_parsed, rows_inserted)`` is called.
+        With an UploadCheckpoint, rows it already covers are skipped and every
+        chunk advances it in the chunk's own transaction.
+        """
+        rows_parsed = checkpoint.chunk_offset if checkpoint else 0
+        rows_inserted = checkpoint.rows_committed if checkpoint else 0
+        for df_chunk in iter_chunks(file_path, skip_rows=rows_parsed):
+            rows_parsed += len(df_chunk)
+            rows_inserted += DataProcessor._process_lead_data(
+                df_chunk, uploaded_id, engine, checkpoint, duplicate_mode
             )
-            if df_chunk.empty:
-                break
-            DataProcessor._process_lead_data(df_chunk, uploaded_id)
-            start_row += chunk_size
-        return total_rows
+            if on_progress is not None:
+                on_progress(rows_parsed, rows_inserted)
+        return rows_inserted
 
     @staticmethod
-    def process_upload_file(upload_file: str, uploaded_id: int):
+    def process_upload_file(
+        upload_file: str,
+        uploaded_id: int,
+        engine: str = None,
+        on_progress=None,
+        checkpoint=None,
+        duplicate_mode: str = lead_dedupe_service.DUPLICATE_MODE_REJECT,
+        parse_workers: int = None,
+    ):
+        """
+        Ingest a CSV or XLSX upload. Returns the number of leads inserted.
+        With more than one parse worker, XLSX files are parsed in parallel.
+        """
         try:
-            file_type = upload_file.name.split(".")[1].upper()
+            engine = engine or settings.LEAD_INGEST_ENGINE
+            if engine not in INGEST_ENGINES:
+                raise ValueError(f"Unsupported ingest engine: {engine}")
+            parse_workers = parse_workers or settings.LEAD_INGEST_WORKERS
+
+            file_type = upload_file.name.rsplit(".", 1)[-1].upper()
 
             if file_type == "CSV":
-                data = pd.read_csv(upload_file)
+                iter_chunks = DataProcessor.iter_csv_chunks
+
+            elif file_type == "XLSX" and parse_workers > 1:
+                iter_chunks = functools.partial(
+                    parallel_parse_service.iter_excel_chunks_parallel,
+                    chunk_size=UPLOAD_CHUNK_SIZE,
+                    workers=parse_workers,
+                )
 
             elif file_type == "XLSX":
-                return DataProcessor.process_excel_in_chunks(upload_file, uploaded_id)
+                iter_chunks = DataProcessor.iter_excel_chunks
 
             else:
                 raise ValueError("Unsupported file type")
 
+            return DataProcessor.process_in_chunks(
+                iter_chunks,
+                upload_file,
+                uploaded_id,
+                engine,
+                on_progress,
+                checkpoint,
+                duplicate_mode,
+            )
+
         except Exception as e:
             raise UnexpectedError(message=str(e))
 
     @staticmethod
-    def _process_lead_data(dataframe, uploaded_id: int):
+    def _normalize_lead_frame(dataframe):
+        """
+        Align the chunk on UPLOAD_COLUMNS, upper-case the geography and school
+        columns, trim emails and turn missing cells into None.
+        """
+        dataframe = dataframe.reindex(columns=UPLOAD_COLUMNS)
+        for column in UPPERCASE_COLUMNS:
+            dataframe[column] = dataframe[column].astype("string").str.upper()
+        dataframe["email"] = (
+            dataframe["email"].astype("string").str.strip().replace("", pd.NA)
+        )
+        return dataframe.astype(object).where(dataframe.notna(), None)
 
-        with transaction.atomic():
-            leads_to_create = []
-            parents_info = []
-            st_location = []
+    @staticmethod
+    def _resolve_ids(model, keys, existing_qs, key_fields, build):
+        """
+        Map every key tuple in ``keys`` to a primary key, bulk creating the
+        missing rows of ``model``. Returns a DataFrame of
+        [*key_fields, "<model>_id"].
+        """
+        ids = {}
+        for row in existing_qs.order_by("-id").values_list(*key_fields, "id"):
+            ids[row[:-1]] = row[-1]
 
-            for index, row in dataframe.iterrows():
-                country, _ = Country.objects.get_or_create(
-                    name=row.get("country", None).upper()
-                )
-                state, _ = State.objects.get_or_create(
-                    name=row.get("state", None).upper(), country=country
-                )
-                city, _ = City.objects.get_or_create(
-                    name=row.get("city", None).upper(), state=state
-                )
+        missing = [key for key in keys if key not in ids]
+        if missing:
+            for obj in model.objects.bulk_create([build(*key) for key in missing]):
+                ids[tuple(getattr(obj, field) for field in key_fields)] = obj.id
 
-                student_lead = StudentLeads(
-                    first_name=row.get("first_name"),
-                    last_name=row.get("last_name", None),
-                    email=row.get("email", None),
-                    contact_no=row.get("contact_no", None),
-                    alt_contact_no=row.get("alt_contact_no", None),
-                    school=(
-                        row.get("school", None).upper()
-                        if row.get("school", None)
-                        else None
-                    ),
-                    uploaded_id=uploaded_id
-                )
+        id_column = f"{model._meta.model_name}_id"
+        return pd.DataFrame(
+            [(*key, pk) for key, pk in ids.items()],
+            columns=[*key_fields, id_column],
+        )
+
+    @staticmethod
+    def _resolve_geography(dataframe):
+        """
+        Resolve the distinct (country, state, city) triples of the chunk to
+        Country/State/City ids with a handful of set-based queries, then merge
+        country_id/state_id/city_id back onto every row.
+        """
+        geography = dataframe[["country", "state", "city"]].drop_duplicates()
+
+        country_names = [(name,) for name in geography["country"].dropna().unique()]
+        countries = DataProcessor._resolve_ids(
+            Country,
+            country_names,
+            Country.objects.filter(name__in=[name for name, in country_names]),
+            ["name"],
+            lambda name: Country(name=name),
+        ).rename(columns={"name": "country"})
+        geography = geography.merge(countries, on="country", how="left")
 
-                student_parents_info = ParentsInfo(
-                    lead=student_lead,
-                    father_name=row.get("father_name", None),
-                    mother_name=row.get("mother_name", None),
-                    father_contact_no=row.get("parents_contact_no", None),
-                    mother_contact_no=row.get("parents_contact_no", None),
+        states = geography.dropna(subset=["state", "country_id"])
+        state_keys = list(
+            dict.fromkeys(zip(states["state"], states["country_id"].astype(int)))
+        )
+        states = DataProcessor._resolve_ids(
+            State,
+            state_keys,
+            State.objects.filter(
+                name__in={name for name, _ in state_keys},
+                country_id__in={country_id for _, country_id in state_keys},
+            ),
+            ["name", "country_id"],
+            lambda name, country_id: State(name=name, country_id=country_id),
+        ).rename(columns={"name": "state"})
+        geography = geography.merge(states, on=["state", "country_id"], how="left")
+
+        cities = geography.dropna(subset=["city", "state_id"])
+        city_keys = list(
+            dict.fromkeys(zip(cities["city"], cities["state_id"].astype(int)))
+        )
+        cities = DataProcessor._resolve_ids(
+            City,
+            city_keys,
+            City.objects.filter(
+                name__in={name for name, _ in city_keys},
+                state_id__in={state_id for _, state_id in city_keys},
+            ),
+            ["name", "state_id"],
+            lambda name, state_id: City(name=name, state_id=state_id),
+        ).rename(columns={"name": "city"})
+        geography = geography.merge(cities, on=["city", "state_id"], how="left")
+
+        dataframe = dataframe.merge(
+            geography, on=["country", "state", "city"], how="left"
+        )
+        for column in ("country_id", "state_id", "city_id"):
+            dataframe[column] = dataframe[column].astype("Int64").astype(object)
+            dataframe[column] = dataframe[column].where(dataframe[column].notna(), None)
+        return dataframe
+
+    @staticmethod
+    def _advance_checkpoint(checkpoint, rows: int, rows_inserted: int):
+        """
+        Move the checkpoint past one chunk. The offset doubles as a version, so a
+        second worker ingesting the same file fails instead of double inserting.
+        """
+        updated = UploadCheckpoint.objects.filter(
+            id=checkpoint.id, chunk_offset=checkpoint.chunk_offset
+        ).update(
+            chunk_offset=F("chunk_offset") + rows,
+            rows_committed=F("rows_committed") + rows_inserted,
+            updated_at=timezone.now(),
+        )
+        if not updated:
+            raise ValueError("Upload checkpoint moved, the file is being ingested elsewhere.")
+        checkpoint.chunk_offset += rows
+        checkpoint.rows_committed += rows_inserted
+
+    @staticmethod
+    def _process_lead_data(
+        dataframe,
+        uploaded_id: int,
+        engine: str = INGEST_ENGINE_ORM,
+        checkpoint=None,
+        duplicate_mode: str = lead_dedupe_service.DUPLICATE_MODE_REJECT,
+    ):
+        """
+        Insert one chunk in its own transaction and add it to the DataBridge
+        lead_count (and the checkpoint, if any). Duplicate emails are taken out
+        beforehand and recorded as rejections of the checkpoint.
+        Returns the rows inserted.
+        """
+        rows = len(dataframe)
+        row_offset = checkpoint.chunk_offset if checkpoint is not None else 0
+        if not dataframe.attrs.get("normalized"):
+            dataframe = DataProcessor._normalize_lead_frame(dataframe)
+        dataframe = dataframe.assign(row_no=range(row_offset + 1, row_offset + rows + 1))
+
+        with transaction.atomic():
+            dataframe, rejections = lead_dedupe_service.split_duplicates(
+                dataframe, duplicate_mode
+            )
+            dataframe = DataProcessor._resolve_geography(dataframe)
+            if dataframe.empty:
+                lead_ids = []
+            elif engine == INGEST_ENGINE_COPY:
+                lead_ids, conflicts = copy_ingest_service.copy_lead_data(
+                    dataframe,
+                    uploaded_id,
+                    gender=StudentLeads._meta.get_field("gender").default,
                 )
+                rejections.extend(conflicts)
+            else:
+                lead_ids = DataProcessor._bulk_create_lead_data(dataframe, uploaded_id)
 
-                student_location = Address(
-                    lead=student_lead,
-                    country=country,
-                    state=state,
-                    city=city,
-                    postal_code=row.get("postal_code", None),
+            lead_facet_service.add_leads(lead_ids)
+            DataBridge.objects.filter(id=uploaded_id).update(
+                lead_count=F("lead_count") + len(lead_ids)
+            )
+            if checkpoint is not None:
+                UploadRejection.objects.bulk_create(
+                    [
+                        UploadRejection(
+                            checkpoint_id=checkpoint.id,
+                            row_no=row_no,
+                            email=email,
+                            reason=reason,
+                            lead_id=lead_id,
+                        )
+                        for row_no, email, reason, lead_id in rejections
+                    ]
                 )
+                DataProcessor._advance_checkpoint(checkpoint, rows, len(lead_ids))
+        return len(lead_ids)
 
-                leads_to_create.append(student_lead)
-                parents_info.append(student_parents_info)
-                st_location.append(student_location)
+    @staticmethod
+    def _bulk_create_lead_data(dataframe, uploaded_id: int):
+        columns = {column: dataframe[column].tolist() for column in dataframe}
+
+        leads_to_create = [
+            StudentLeads(
+                first_name=first_name,
+                last_name=last_name,
+                email=email,
+                contact_no=contact_no,
+                alt_contact_no=alt_contact_no,
+                school=school,
+                uploaded_id=uploaded_id,
+            )
+            for first_name, last_name, email, contact_no, alt_contact_no, school in zip(
+                columns["first_name"],
+                columns["last_name"],
+                columns["email"],
+                columns["contact_no"],
+                columns["alt_contact_no"],
+                columns["school"],
+            )
+        ]
+        if leads_to_create:
+            StudentLeads.objects.bulk_create(leads_to_create)
+
+        parents_info = [
+            ParentsInfo(
+                lead_id=lead.id,
+                father_name=father_name,
+                mother_name=mother_name,
+                father_contact_no=parents_contact_no,
+                mother_contact_no=parents_contact_no,
+            )
+            for lead, father_name, mother_name, parents_contact_no in zip(
+                leads_to_create,
+                columns["father_name"],
+                columns["mother_name"],
+                columns["parents_contact_no"],
+            )
+        ]
+        if parents_info:
+            ParentsInfo.objects.bulk_create(parents_info)
+
+        st_location = [
+            Address(
+                lead_id=lead.id,
+                country_id=country_id,
+                state_id=state_id,
+                city_id=city_id,
+                postal_code=postal_code,
+            )
+            for lead, country_id, state_id, city_id, postal_code in zip(
+                leads_to_create,
+                columns["country_id"],
+                columns["state_id"],
+                columns["city_id"],
+                columns["postal_code"],
+            )
+        ]
+        if st_location:
+            Address.objects.bulk_create(st_location)
 
-            if leads_to_create:
-                StudentLeads.objects.bulk_create(leads_to_create)
-            if parents_info:
-                ParentsInfo.objects.bulk_create(parents_info)
-            if st_location:
-                Address.objects.bulk_create(st_location)
+        return [lead.id for lead in leads_to_create]
@@ -1,10 +1,17 @@
 
 from django.urls import path
-from info_bridge.apis.views import DataBridgeAPIView, DataBridgeAppendAPIView
+from info_bridge.apis.views import (
+    DataBridgeAPIView,
+    DataBridgeAppendAPIView,
+    DataBridgeJobAPIView,
+    DataBridgeJobRejectionAPIView,
+)
 
 app_name='uploads'
 
 urlpatterns = [
     path('', DataBridgeAPIView.as_view(), name='data-bridge'),
     path('append/', DataBridgeAppendAPIView.as_view(), name='data-bridge-append'),
+    path('jobs/', DataBridgeJobAPIView.as_view(), name='data-bridge-jobs'),
+    path('jobs/rejections/', DataBridgeJobRejectionAPIView.as_view(), name='data-bridge-job-rejections'),
 ]
\ No newline at end of file
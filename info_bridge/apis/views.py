@@ -1,21 +1,26 @@
+import csv
+import itertools
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from utilities import utils as ut
 from utilities import pagination as pn
 from utilities import const
-from info_bridge.models import DataBridge
-from leads.models import StudentLeads, ParentsInfo
-from locations.models import Address
+from utilities.utils import get_paginator
+from info_bridge.models import DataBridge, DataBridgeJob
 from permissions.custom_permissions import CustomPermission
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from info_bridge.apis.serializers import DataBridgeSerializer, DataBridgeListSerializer
-from info_bridge.apis.upload_service import DataProcessor
+from info_bridge.apis.serializers import (
+    DataBridgeSerializer,
+    DataBridgeListRowSerializer,
+    DataBridgeJobSerializer,
+)
+from info_bridge.apis import upload_job_service
+from info_bridge.apis.lead_dedupe_service import DUPLICATE_MODES
 from utilities.custom_exceptions import UnexpectedError
 from django.db import transaction
-from django.db.models import F
+from django.http import StreamingHttpResponse
 from rest_framework.exceptions import NotFound
-from django.core.exceptions import ObjectDoesNotExist
 # from django.shortcuts import get_object_or_404
 
 
@@ -26,7 +31,7 @@ class DataBridgeAPIView(APIView):
     ]  # check for user is autnenticated or not.
     permission_classes = [CustomPermission]  # check for user has permissions or not
     data_bridge_serializer = DataBridgeSerializer
-    data_bridge_list_serializer_class = DataBridgeListSerializer
+    data_bridge_list_serializer_class = DataBridgeListRowSerializer
 
     def get_file_extension(self, filename: str):
         if not filename:
@@ -34,10 +39,13 @@ class DataBridgeAPIView(APIView):
         return filename.split(".")[-1].upper()
 
     def get(self, request):
-        data_bridge_qs = DataBridge.objects.all().order_by("-uploaded_by")
+        data_bridge_qs = self.data_bridge_list_serializer_class.project(
+            DataBridge.objects.order_by("-lead_uploaded_at", "-id")
+        )
 
+        paginator = get_paginator(request, ordering="-lead_uploaded_at")
         try:
-            paginated_user_qs = pn.paginate_queryset(data_bridge_qs, request)
+            paginated_user_qs = paginator.paginate_queryset(data_bridge_qs, request)
         except NotFound:
             payload = ut.get_payload(request, detail=[], message="File info list.")
             return Response(data=payload, status=status.HTTP_200_OK)
@@ -48,7 +56,7 @@ class DataBridgeAPIView(APIView):
             request,
             detail=serialized_user_qs,
             message="File info list",
-            extra_information=pn.get_paginated_response(data=serialized_user_qs),
+            extra_information=paginator.get_paginated_response(data=serialized_user_qs),
         )
         return Response(data=payload, status=status.HTTP_200_OK)
 
@@ -59,6 +67,7 @@ class DataBridgeAPIView(APIView):
         sub_source = data.get("sub_source", None)
         year = data.get("year", None)
         file = data.get("file", None)
+        duplicate_mode = data.get("on_duplicate", "reject")
         uploaded_by = request.user
         file_name = f"{source}_{sub_source}_{year}_Leads_data.xlsx"
 
@@ -66,6 +75,16 @@ class DataBridgeAPIView(APIView):
             payload = ut.get_payload(request, message="Source file should be required.")
             return Response(payload, status=status.HTTP_400_BAD_REQUEST)
 
+        if self.get_file_extension(file.name) not in const.files_extensions:
+            payload = ut.get_payload(request, message="Invalid file extension.")
+            return Response(payload, status=status.HTTP_400_BAD_REQUEST)
+
+        if duplicate_mode not in DUPLICATE_MODES:
+            payload = ut.get_payload(
+                request, message=f"on_duplicate should be one of {DUPLICATE_MODES}."
+            )
+            return Response(payload, status=status.HTTP_400_BAD_REQUEST)
+
         deserialize_data = self.data_bridge_serializer(data=data)
         if deserialize_data.is_valid(raise_exception=True):
             try:
@@ -80,18 +99,34 @@ class DataBridgeAPIView(APIView):
                             uploaded_by=uploaded_by,
                             file_name=file_name,
                         )
-
-                        df_count = DataProcessor.process_upload_file(
-                            upload_file=file, uploaded_id=data_bridge_obj.id
+                        data_bridge_job_obj = upload_job_service.enqueue_job(
+                            job_type="UPLOAD",
+                            file=file,
+                            created_by=uploaded_by,
+                            data_bridge=data_bridge_obj,
+                            duplicate_mode=duplicate_mode,
                         )
-                        data_bridge_obj.lead_count = df_count
-                        data_bridge_obj.save()
 
                 else:
-                    payload = ut.get_payload(
-                        request, detail={}, message="File already exists."
+                    # Re-uploading a file whose earlier ingest was interrupted
+                    # resumes it from the last committed chunk.
+                    file_hash = upload_job_service.compute_file_hash(file)
+                    if upload_job_service.get_resumable_checkpoint(
+                        databridge_qs[0], file_hash
+                    ) is None:
+                        payload = ut.get_payload(
+                            request, detail={}, message="File already exists."
+                        )
+                        return Response(data=payload, status=status.HTTP_409_CONFLICT)
+
+                    data_bridge_job_obj = upload_job_service.enqueue_job(
+                        job_type="UPLOAD",
+                        file=file,
+                        created_by=uploaded_by,
+                        data_bridge=databridge_qs[0],
+                        file_hash=file_hash,
+                        duplicate_mode=duplicate_mode,
                     )
-                    return Response(data=payload, status=status.HTTP_409_CONFLICT)
 
             except ValueError as ve:
                 payload = ut.get_payload(request, detail={}, message=str(ve))
@@ -104,9 +139,11 @@ class DataBridgeAPIView(APIView):
                 )
 
         payload = ut.get_payload(
-            request, message="Leads has been uploaded, successfully."
+            request,
+            detail=DataBridgeJobSerializer(data_bridge_job_obj).data,
+            message="Leads upload has been queued.",
         )
-        return Response(data=payload, status=status.HTTP_200_OK)
+        return Response(data=payload, status=status.HTTP_202_ACCEPTED)
 
     def delete(self, request):
         file_name = request.data.get("file_name", None)
@@ -118,48 +155,25 @@ class DataBridgeAPIView(APIView):
             payload = ut.get_payload(request, message="Invalid file extension.")
             return Response(data=payload, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            with transaction.atomic():
-                try:
-                    data_bridge_obj = DataBridge.objects.get(file_name=file_name)
-                    student_leads_qs = StudentLeads.objects.filter(
-                        uploaded_id=data_bridge_obj.id, is_attempted=False
-                    )
-                    lead_count = student_leads_qs.count()
-                    if lead_count > 0:
-                        # Delete related ParentsInfo and Address in bulk
-                        ParentsInfo.objects.filter(
-                            lead_id__in=student_leads_qs
-                        ).delete()
-                        Address.objects.filter(lead_id__in=student_leads_qs).delete()
-
-                        # Delete student leads in bulk
-                        student_leads_qs.delete()
-
-                        # Update lead count
-                        data_bridge_obj.lead_count -= lead_count
-                        data_bridge_obj.save()
-
-                        if data_bridge_obj.lead_count == 0:
-                            data_bridge_obj.delete()
-
-                    payload = ut.get_payload(
-                        request,
-                        detail={},
-                        message="File and related leads has been deleted successfully.",
-                    )
-                    return Response(data=payload, status=status.HTTP_204_NO_CONTENT)
-
-                except ObjectDoesNotExist:
-                    raise ObjectDoesNotExist("Object doesn't exists.")
-
-        except ObjectDoesNotExist:
+        data_bridge_obj = DataBridge.objects.filter(file_name=file_name).first()
+        if data_bridge_obj is None:
             payload = ut.get_payload(request, message="Related file doesn't exists.")
             return Response(data=payload, status=status.HTTP_404_NOT_FOUND)
 
-        except UnexpectedError as ue:
-            payload = ut.get_payload(request, message=str(ue))
-            return Response(data=payload, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        # The leads go in batches on an upload worker; a repeated request
+        # reports the purge that is already under way.
+        data_bridge_job_obj = upload_job_service.get_active_purge_job(data_bridge_obj)
+        if data_bridge_job_obj is None:
+            data_bridge_job_obj = upload_job_service.enqueue_purge_job(
+                data_bridge=data_bridge_obj, created_by=request.user
+            )
+
+        payload = ut.get_payload(
+            request,
+            detail=DataBridgeJobSerializer(data_bridge_job_obj).data,
+            message="File deletion has been queued.",
+        )
+        return Response(data=payload, status=status.HTTP_202_ACCEPTED)
 
 
 class DataBridgeAppendAPIView(APIView):
@@ -182,6 +196,7 @@ class DataBridgeAppendAPIView(APIView):
 
         file = data.get("file", None)
         file_name = data.get("file_name", None)
+        duplicate_mode = data.get("on_duplicate", "reject")
         is_extend_entries = self.get_is_extended_var(data=data)
 
         if not file:
@@ -192,6 +207,16 @@ class DataBridgeAppendAPIView(APIView):
             payload = ut.get_payload(request, message="Filename should be required.")
             return Response(payload, status=status.HTTP_400_BAD_REQUEST)
 
+        if file.name.rsplit(".", 1)[-1].upper() not in const.files_extensions:
+            payload = ut.get_payload(request, message="Invalid file extension.")
+            return Response(payload, status=status.HTTP_400_BAD_REQUEST)
+
+        if duplicate_mode not in DUPLICATE_MODES:
+            payload = ut.get_payload(
+                request, message=f"on_duplicate should be one of {DUPLICATE_MODES}."
+            )
+            return Response(payload, status=status.HTTP_400_BAD_REQUEST)
+
         if not isinstance(is_extend_entries, bool):
             payload = ut.get_payload(
                 request, message="extended field should be bool not str or None."
@@ -206,19 +231,21 @@ class DataBridgeAppendAPIView(APIView):
             databridge_qs = DataBridge.objects.filter(file_name=file_name)
 
             if databridge_qs.exists() and is_extend_entries:
-                with transaction.atomic():
-                    df_count = DataProcessor.process_upload_file(
-                        upload_file=file, uploaded_id=databridge_qs[0].id
-                    )
-                    databridge_qs.update(
-                        lead_count=F("lead_count") + df_count
-                    )  # Increment lead_count using F expressions (to avoid race conditions)
+                # The worker adds every committed chunk to lead_count itself.
+                data_bridge_job_obj = upload_job_service.enqueue_job(
+                    job_type="APPEND",
+                    file=file,
+                    created_by=request.user,
+                    data_bridge=databridge_qs[0],
+                    duplicate_mode=duplicate_mode,
+                )
 
                 payload = ut.get_payload(
                     request,
-                    message=f"Leads has been appended successfully into {file_name} file.",
+                    detail=DataBridgeJobSerializer(data_bridge_job_obj).data,
+                    message=f"Leads append into {file_name} file has been queued.",
                 )
-                return Response(data=payload, status=status.HTTP_200_OK)
+                return Response(data=payload, status=status.HTTP_202_ACCEPTED)
 
             else:
                 payload = ut.get_payload(
@@ -233,3 +260,116 @@ class DataBridgeAppendAPIView(APIView):
         except UnexpectedError as ue:
             payload = ut.get_payload(request, detail={}, message=str(ue))
             return Response(data=payload, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class DataBridgeJobAPIView(APIView):
+
+    authentication_classes = [
+        JWTAuthentication
+    ]  # check for user is autnenticated or not.
+    permission_classes = [CustomPermission]  # check for user has permissions or not
+    data_bridge_job_serializer_class = DataBridgeJobSerializer
+
+    def get_queryset(self, request):
+        data_bridge_job_qs = DataBridgeJob.objects.select_related("data_bridge")
+        if not request.user.is_superuser:
+            data_bridge_job_qs = data_bridge_job_qs.filter(created_by=request.user)
+        return data_bridge_job_qs
+
+    def get(self, request):
+        job_id = request.query_params.get("job_id", None)
+        data_bridge_job_qs = self.get_queryset(request)
+
+        if job_id:
+            data_bridge_job_obj = data_bridge_job_qs.filter(id=job_id).first()
+            if data_bridge_job_obj is None:
+                payload = ut.get_payload(request, message="Upload job doesn't exists.")
+                return Response(data=payload, status=status.HTTP_404_NOT_FOUND)
+
+            payload = ut.get_payload(
+                request,
+                detail=self.data_bridge_job_serializer_class(data_bridge_job_obj).data,
+                message="Upload job status.",
+            )
+            return Response(data=payload, status=status.HTTP_200_OK)
+
+        try:
+            paginated_job_qs = pn.paginate_queryset(
+                data_bridge_job_qs.order_by("-id"), request
+            )
+        except NotFound:
+            payload = ut.get_payload(request, detail=[], message="Upload job list.")
+            return Response(data=payload, status=status.HTTP_200_OK)
+        serialized_job_qs = self.data_bridge_job_serializer_class(
+            paginated_job_qs, many=True
+        ).data
+        payload = ut.get_payload(
+            request,
+            detail=serialized_job_qs,
+            message="Upload job list.",
+            extra_information=pn.get_paginated_response(data=serialized_job_qs),
+        )
+        return Response(data=payload, status=status.HTTP_200_OK)
+
+    def post(self, request):
+        """Retry a failed job; it resumes after its last committed chunk."""
+        job_id = request.data.get("job_id", None)
+        data_bridge_job_obj = self.get_queryset(request).filter(id=job_id).first()
+        if data_bridge_job_obj is None:
+            payload = ut.get_payload(request, message="Upload job doesn't exists.")
+            return Response(data=payload, status=status.HTTP_404_NOT_FOUND)
+
+        if not upload_job_service.retry_job(data_bridge_job_obj):
+            payload = ut.get_payload(
+                request, message="Only failed upload jobs can be retried."
+            )
+            return Response(data=payload, status=status.HTTP_409_CONFLICT)
+
+        data_bridge_job_obj.refresh_from_db()
+        payload = ut.get_payload(
+            request,
+            detail=self.data_bridge_job_serializer_class(data_bridge_job_obj).data,
+            message="Upload job has been queued again.",
+        )
+        return Response(data=payload, status=status.HTTP_202_ACCEPTED)
+
+
+class Echo:
+    """A file-like object whose write() just hands the line back to csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+class DataBridgeJobRejectionAPIView(DataBridgeJobAPIView):
+
+    http_method_names = ["get", "options"]
+
+    def get(self, request):
+        """Download the rows of an upload that were rejected or merged, as CSV."""
+        job_id = request.query_params.get("job_id", None)
+        data_bridge_job_obj = self.get_queryset(request).filter(id=job_id).first()
+        checkpoint = (
+            upload_job_service.get_job_checkpoint(data_bridge_job_obj)
+            if data_bridge_job_obj is not None
+            else None
+        )
+        if checkpoint is None:
+            payload = ut.get_payload(request, message="Upload job doesn't exists.")
+            return Response(data=payload, status=status.HTTP_404_NOT_FOUND)
+
+        rejections = (
+            checkpoint.rejections.order_by("row_no")
+            .values_list("row_no", "email", "reason", "lead_id")
+            .iterator(chunk_size=5000)
+        )
+        writer = csv.writer(Echo())
+        rows = itertools.chain(
+            [writer.writerow(["row_no", "email", "reason", "existing_lead_id"])],
+            (writer.writerow(rejection) for rejection in rejections),
+        )
+        response = StreamingHttpResponse(rows, content_type="text/csv")
+        response["Content-Disposition"] = (
+            f'attachment; filename="upload_job_{data_bridge_job_obj.id}_rejections.csv"'
+        )
+        return response
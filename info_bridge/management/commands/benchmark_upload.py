@@ -0,0 +1,200 @@
+import os
+import tempfile
+import time
+import uuid
+import numpy as np
+import pandas as pd
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from accounts.models import User
+from info_bridge.apis.upload_service import (
+    DataProcessor,
+    INGEST_ENGINES,
+    INGEST_ENGINE_COPY,
+)
+from info_bridge.models import DataBridge
+from leads.models import StudentLeads, ParentsInfo
+from leads.services import lead_facet_service
+from locations.models import Address, Country, State, City
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark lead ingestion on a synthetic upload. Rows are pushed through "
+        "the upload pipeline chunk by chunk inside a transaction that is rolled "
+        "back at the end, and the run reports rows/sec."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user-id", type=int, required=True)
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--chunk-size", type=int, default=100_000)
+        parser.add_argument("--states", type=int, default=36)
+        parser.add_argument("--cities-per-state", type=int, default=20)
+        parser.add_argument(
+            "--mode",
+            choices=[*INGEST_ENGINES, "legacy"],
+            default=INGEST_ENGINE_COPY,
+            help="An ingest engine, or legacy to replay the old "
+            "iterrows()/get_or_create() flow.",
+        )
+        parser.add_argument(
+            "--file-format",
+            choices=["frame", "xlsx", "csv"],
+            default="frame",
+            help="frame feeds in-memory chunks to the ingest stage; xlsx and csv "
+            "write the synthetic rows to a file first and time the whole "
+            "process_upload_file() call, reader included.",
+        )
+        parser.add_argument(
+            "--parse-workers",
+            type=int,
+            default=None,
+            help="XLSX parse processes. Defaults to settings.LEAD_INGEST_WORKERS.",
+        )
+
+    def build_frame(self, rows, states, cities_per_state):
+        prefix = uuid.uuid4().hex[:8]
+        index = np.arange(rows)
+        state_no = index % states
+        city_no = (index // states) % cities_per_state
+        return pd.DataFrame(
+            {
+                "first_name": [f"student {i}" for i in index],
+                "last_name": "bench",
+                "email": [f"{prefix}.{i}@bench.example" for i in index],
+                "contact_no": [f"9{i:09d}" for i in index],
+                "alt_contact_no": None,
+                "school": np.where(index % 2, "dps", "kendriya vidyalaya"),
+                "father_name": "father",
+                "mother_name": "mother",
+                "parents_contact_no": [f"8{i:09d}" for i in index],
+                "country": "india",
+                "state": [f"state {s}" for s in state_no],
+                "city": [f"city {s}-{c}" for s, c in zip(state_no, city_no)],
+                "postal_code": [f"{110000 + i % 900:06d}" for i in index],
+            }
+        )
+
+    def legacy_process_lead_data(self, dataframe, uploaded_id):
+        """The pre-vectorized flow, kept only to compare against."""
+        with transaction.atomic():
+            leads_to_create, parents_info, st_location = [], [], []
+            for _, row in dataframe.iterrows():
+                country, _ = Country.objects.get_or_create(name=row.get("country").upper())
+                state, _ = State.objects.get_or_create(
+                    name=row.get("state").upper(), country=country
+                )
+                city, _ = City.objects.get_or_create(
+                    name=row.get("city").upper(), state=state
+                )
+                student_lead = StudentLeads(
+                    first_name=row.get("first_name"),
+                    last_name=row.get("last_name"),
+                    email=row.get("email"),
+                    contact_no=row.get("contact_no"),
+                    alt_contact_no=row.get("alt_contact_no"),
+                    school=row.get("school").upper() if row.get("school") else None,
+                    uploaded_id=uploaded_id,
+                )
+                leads_to_create.append(student_lead)
+                parents_info.append(
+                    ParentsInfo(
+                        lead=student_lead,
+                        father_name=row.get("father_name"),
+                        mother_name=row.get("mother_name"),
+                        father_contact_no=row.get("parents_contact_no"),
+                        mother_contact_no=row.get("parents_contact_no"),
+                    )
+                )
+                st_location.append(
+                    Address(
+                        lead=student_lead,
+                        country=country,
+                        state=state,
+                        city=city,
+                        postal_code=row.get("postal_code"),
+                    )
+                )
+            StudentLeads.objects.bulk_create(leads_to_create)
+            ParentsInfo.objects.bulk_create(parents_info)
+            Address.objects.bulk_create(st_location)
+            lead_facet_service.add_leads([lead.id for lead in leads_to_create])
+
+    def run_file(self, dataframe, file_format, engine, uploaded_id, parse_workers):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, f"benchmark.{file_format}")
+            if file_format == "csv":
+                dataframe.to_csv(file_path, index=False)
+            else:
+                dataframe.to_excel(file_path, index=False)
+            with open(file_path, "rb") as upload_file:
+                started_at = time.perf_counter()
+                total_rows = DataProcessor.process_upload_file(
+                    File(upload_file, name=os.path.basename(file_path)),
+                    uploaded_id,
+                    engine,
+                    parse_workers=parse_workers,
+                )
+                return total_rows, time.perf_counter() - started_at
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(id=options["user_id"]).first()
+        if user is None:
+            raise CommandError(f"User {options['user_id']} does not exist.")
+
+        dataframe = self.build_frame(
+            options["rows"], options["states"], options["cities_per_state"]
+        )
+        if options["mode"] == "legacy":
+            process = self.legacy_process_lead_data
+        else:
+            def process(chunk, uploaded_id):
+                DataProcessor._process_lead_data(chunk, uploaded_id, options["mode"])
+
+        chunk_size = options["chunk_size"]
+        elapsed = 0.0
+        try:
+            with transaction.atomic():
+                data_bridge_obj = DataBridge.objects.create(
+                    source="BENCHMARK",
+                    sub_source=options["mode"].upper(),
+                    uploaded_by=user,
+                )
+                if options["file_format"] != "frame":
+                    if options["mode"] == "legacy":
+                        raise CommandError("legacy mode only runs with --file-format frame.")
+                    total_rows, elapsed = self.run_file(
+                        dataframe,
+                        options["file_format"],
+                        options["mode"],
+                        data_bridge_obj.id,
+                        options["parse_workers"],
+                    )
+                    self.stdout.write(f"  {total_rows} rows read from the file")
+                    raise Rollback
+
+                for start in range(0, len(dataframe), chunk_size):
+                    chunk = dataframe.iloc[start : start + chunk_size]
+                    started_at = time.perf_counter()
+                    process(chunk, data_bridge_obj.id)
+                    chunk_elapsed = time.perf_counter() - started_at
+                    elapsed += chunk_elapsed
+                    self.stdout.write(
+                        f"  rows {start:>9}-{start + len(chunk) - 1:<9} "
+                        f"{len(chunk) / chunk_elapsed:,.0f} rows/s"
+                    )
+                raise Rollback
+        except Rollback:
+            pass
+
+        rows = len(dataframe)
+        self.stdout.write(f"mode:      {options['mode']}")
+        self.stdout.write(f"rows:      {rows}")
+        self.stdout.write(f"elapsed:   {elapsed:.2f}s")
+        self.stdout.write(f"rows/sec:  {rows / elapsed:,.0f}")
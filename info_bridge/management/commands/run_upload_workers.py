@@ -0,0 +1,70 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from info_bridge.apis import upload_job_service
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the upload worker pool. Every worker claims queued DataBridgeJob rows "
+        "with SKIP LOCKED and runs them (uploads and purges), so several pools can "
+        "share the queue. "
+        "Jobs whose worker stopped heartbeating are queued again and resume from "
+        "their last committed chunk."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Defaults to settings.UPLOAD_JOB_WORKERS.",
+        )
+        parser.add_argument(
+            "--interval", type=float, default=2, help="Seconds to wait on an empty queue."
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Stop every worker as soon as the queue is empty.",
+        )
+
+    def worker(self, interval, once, stop_event):
+        try:
+            while not stop_event.is_set():
+                upload_job_service.requeue_stale_jobs()
+                job = upload_job_service.claim_next_job()
+                if job is None:
+                    if once:
+                        return
+                    stop_event.wait(interval)
+                    continue
+
+                started_at = time.perf_counter()
+                upload_job_service.run_job(job)
+                self.stdout.write(
+                    f"job {job.id} {job.status.lower()}: {job.rows_inserted} rows "
+                    f"in {time.perf_counter() - started_at:.1f}s"
+                )
+        finally:
+            connection.close()
+
+    def handle(self, *args, **options):
+        workers = options["workers"] or settings.UPLOAD_JOB_WORKERS
+        stop_event = threading.Event()
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(
+                    self.worker, options["interval"], options["once"], stop_event
+                )
+                for _ in range(workers)
+            ]
+            try:
+                for future in futures:
+                    future.result()
+            except KeyboardInterrupt:
+                stop_event.set()
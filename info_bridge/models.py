@@ -22,4 +22,95 @@ class DataBridge(models.Model):
         indexes = [
             models.Index(fields=['source']),
             models.Index(fields=['sub_source']),
-        ]
\ No newline at end of file
+            # keyset pagination of the file list
+            models.Index(fields=['lead_uploaded_at', 'id']),
+        ]
+
+DUPLICATE_MODE_CHOICES = (
+    ("reject", "Reject rows whose email already exists"),
+    ("merge", "Fill the existing lead's missing contact details"),
+)
+
+
+class DataBridgeJob(models.Model):
+    JOB_TYPE_CHOICES = (
+        ("UPLOAD", "Upload"),
+        ("APPEND", "Append"),
+        ("PURGE", "Purge"),
+    )
+    STATUS_CHOICES = (
+        ("QUEUED", "Queued"),
+        ("RUNNING", "Running"),
+        ("COMPLETED", "Completed"),
+        ("FAILED", "Failed"),
+    )
+
+    job_type = models.CharField(max_length=20, choices=JOB_TYPE_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="QUEUED")
+    data_bridge = models.ForeignKey(
+        DataBridge, on_delete=models.SET_NULL, null=True, blank=True, related_name="jobs"
+    )
+    file = models.FileField(upload_to="data_bridge_jobs/%Y/%m/%d/", null=True, blank=True)
+    file_hash = models.CharField(max_length=64, null=True, blank=True)
+    duplicate_mode = models.CharField(
+        max_length=20, choices=DUPLICATE_MODE_CHOICES, default="reject"
+    )
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name="data_bridge_jobs")
+    rows_parsed = models.BigIntegerField(default=0)
+    rows_inserted = models.BigIntegerField(default=0)
+    rows_rejected = models.BigIntegerField(default=0)
+    rows_deleted = models.BigIntegerField(default=0)
+    error_message = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["id"],
+                condition=models.Q(status="QUEUED"),
+                name="databridgejob_queued_idx",
+            ),
+            models.Index(fields=["created_by", "-created_at"]),
+        ]
+
+
+class UploadCheckpoint(models.Model):
+    """How far an upload of one file (by content hash) into a DataBridge got."""
+
+    data_bridge = models.ForeignKey(
+        DataBridge, on_delete=models.CASCADE, related_name="upload_checkpoints"
+    )
+    file_hash = models.CharField(max_length=64)
+    chunk_offset = models.BigIntegerField(default=0)  # data rows consumed so far
+    rows_committed = models.BigIntegerField(default=0)
+    is_completed = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["data_bridge", "file_hash"], name="unique_upload_checkpoint"
+            )
+        ]
+
+
+class UploadRejection(models.Model):
+    """An uploaded row that was not inserted as a new lead, and why."""
+
+    REASON_CHOICES = (
+        ("MISSING_EMAIL", "Missing email"),
+        ("DUPLICATE_IN_FILE", "Duplicate email in file"),
+        ("ALREADY_EXISTS", "Email already exists"),
+        ("MERGED", "Merged into existing lead"),
+    )
+
+    checkpoint = models.ForeignKey(
+        UploadCheckpoint, on_delete=models.CASCADE, related_name="rejections"
+    )
+    row_no = models.BigIntegerField()  # 1-based data row, blank rows not counted
+    email = models.CharField(max_length=254, null=True, blank=True)
+    reason = models.CharField(max_length=30, choices=REASON_CHOICES)
+    lead_id = models.BigIntegerField(null=True, blank=True)  # the existing lead
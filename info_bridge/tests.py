@@ -1,3 +1,496 @@
-from django.test import TestCase
+import csv
+import io
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from unittest import mock
+import pandas as pd
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from openpyxl import Workbook
+from openpyxl.styles import Font
+from accounts.models import User
+from info_bridge.apis import lead_dedupe_service, upload_job_service
+from info_bridge.apis.parallel_parse_service import iter_excel_chunks_parallel
+from info_bridge.apis.purge_service import purge_data_bridge
+from info_bridge.apis.lead_dedupe_service import DUPLICATE_MODE_MERGE
+from info_bridge.apis.upload_service import (
+    INGEST_ENGINE_COPY,
+    INGEST_ENGINE_ORM,
+    UPLOAD_COLUMNS,
+    DataProcessor,
+)
+from info_bridge.models import DataBridge, DataBridgeJob, UploadCheckpoint
+from leads.models import LeadRemark, StudentLeads
+from notifications.models import Notification, NotificationOutbox
+from notifications.services.notification_service import create_notification
 
-# Create your tests here.
+
+def build_workbook(rows) -> io.BytesIO:
+    """
+    XLSX of ``rows``. None rows are blank: written as a styled row with no
+    values, so they are in the worksheet XML, unlike skipped row numbers.
+    """
+    workbook = Workbook()
+    worksheet = workbook.active
+    for row_no, row in enumerate(rows, start=1):
+        if row is None:
+            worksheet.cell(row=row_no, column=1).font = Font(bold=True)
+            continue
+        for column_no, value in enumerate(row, start=1):
+            worksheet.cell(row=row_no, column=column_no, value=value)
+    file = io.BytesIO()
+    workbook.save(file)
+    file.seek(0)
+    return file
+
+
+def build_csv(rows, name="leads.csv") -> SimpleUploadedFile:
+    """CSV upload of UPLOAD_COLUMNS and ``rows``."""
+    file = io.StringIO()
+    writer = csv.writer(file)
+    writer.writerow(UPLOAD_COLUMNS)
+    writer.writerows(rows)
+    return SimpleUploadedFile(name, file.getvalue().encode())
+
+
+def lead_row(index: int):
+    return [
+        f"First{index}",
+        f"Last{index}",
+        f" lead{index}@example.com ",
+        f"98765{index:05d}",
+        None,
+        "Springfield High",
+        f"Father{index}",
+        None,
+        "9123456780",
+        "India",
+        "Kerala",
+        "Kochi",
+        682001,
+    ]
+
+
+class ExcelChunkReaderTestCase(SimpleTestCase):
+    """
+    The parallel reader relies on openpyxl internals (WorkSheetParser,
+    _date_formats, _worksheet_path), so it must keep matching the serial one.
+    """
+
+    header = [f" {column} " for column in UPLOAD_COLUMNS]
+
+    def read_serial(self, file, chunk_size, skip_rows):
+        file.seek(0)
+        return [
+            DataProcessor._normalize_lead_frame(chunk)
+            for chunk in DataProcessor.iter_excel_chunks(file, chunk_size, skip_rows)
+        ]
+
+    def read_parallel(self, file, chunk_size, skip_rows):
+        file.seek(0)
+        return list(iter_excel_chunks_parallel(file, chunk_size, skip_rows, workers=2))
+
+    def assert_same_rows(self, rows, chunk_size=3, skip_rows=0, expected_rows=None):
+        file = build_workbook(rows)
+        serial = self.read_serial(file, chunk_size, skip_rows)
+        parallel = self.read_parallel(file, chunk_size, skip_rows)
+
+        serial = pd.concat(serial, ignore_index=True) if serial else pd.DataFrame()
+        parallel = pd.concat(parallel, ignore_index=True) if parallel else pd.DataFrame()
+        self.assertEqual(serial.to_dict("records"), parallel.to_dict("records"))
+        if expected_rows is not None:
+            self.assertEqual(len(serial), expected_rows)
+        return serial
+
+    def test_plain_sheet(self):
+        rows = [self.header] + [lead_row(index) for index in range(10)]
+        serial = self.assert_same_rows(rows, expected_rows=10)
+        self.assertEqual(serial.loc[0, "email"], "lead0@example.com")
+        self.assertEqual(serial.loc[0, "school"], "SPRINGFIELD HIGH")
+
+    def test_leading_blank_rows(self):
+        rows = [None, None, self.header] + [lead_row(index) for index in range(10)]
+        serial = self.assert_same_rows(rows, expected_rows=10)
+        self.assertEqual(serial.loc[0, "first_name"], "First0")
+
+    def test_leading_missing_rows(self):
+        # Rows 1-2 are not in the XML at all; the serial reader fills them in.
+        rows = [[], [], self.header] + [lead_row(index) for index in range(10)]
+        self.assert_same_rows(rows, expected_rows=10)
+
+    def test_interior_blank_rows(self):
+        rows = [self.header]
+        for index in range(10):
+            rows.append(lead_row(index))
+            if index % 3 == 0:
+                rows += [None, []]
+        self.assert_same_rows(rows, expected_rows=10)
+
+    def test_skip_rows(self):
+        rows = [None, self.header]
+        for index in range(10):
+            rows.append(lead_row(index))
+            if index % 4 == 0:
+                rows.append(None)
+        for skip_rows in (0, 1, 3, 4, 9, 10, 12):
+            with self.subTest(skip_rows=skip_rows):
+                serial = self.assert_same_rows(
+                    rows, skip_rows=skip_rows, expected_rows=max(0, 10 - skip_rows)
+                )
+                if skip_rows < 10:
+                    self.assertEqual(serial.loc[0, "first_name"], f"First{skip_rows}")
+
+    def test_blank_sheet(self):
+        self.assert_same_rows([None, None], expected_rows=0)
+
+
+class PurgeDataBridgeTestCase(TestCase):
+    def test_purge_deletes_queued_notifications(self):
+        user = User.objects.create_user(email="agent@example.com")
+        data_bridge = DataBridge.objects.create(
+            file_name="leads.xlsx", source="WEB", sub_source="FORM", uploaded_by=user
+        )
+        lead = StudentLeads.objects.create(
+            first_name="Asha", email="asha@example.com", uploaded=data_bridge
+        )
+        # A released lease leaves the remark behind on an unattempted lead.
+        remark = LeadRemark.objects.create(lead=lead, user=user)
+        notification = create_notification(remark, "follow-up-reminder", "Call back", user=user)
+        self.assertTrue(NotificationOutbox.objects.filter(notification=notification).exists())
+
+        self.assertEqual(purge_data_bridge(data_bridge.id), 1)
+
+        # The FK checks are deferred to COMMIT; run them now.
+        connection.check_constraints()
+        self.assertFalse(Notification.objects.exists())
+        self.assertFalse(NotificationOutbox.objects.exists())
+        self.assertFalse(DataBridge.objects.filter(id=data_bridge.id).exists())
+
+
+@override_settings(
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+)
+class UploadJobQueueTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(email="admin@example.com")
+        cls.data_bridge = DataBridge.objects.create(
+            file_name="WEB_FORM_2024_Leads_data.xlsx",
+            source="WEB",
+            sub_source="FORM",
+            uploaded_by=cls.admin,
+        )
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_settings = override_settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin, token={"roles": ["admin"]})
+
+    def enqueue_upload(self, rows):
+        return upload_job_service.enqueue_job(
+            job_type="UPLOAD",
+            file=build_csv(rows),
+            created_by=self.admin,
+            data_bridge=self.data_bridge,
+        )
+
+    def test_claim_skips_running_jobs(self):
+        running = upload_job_service.enqueue_purge_job(self.data_bridge, self.admin)
+        DataBridgeJob.objects.filter(id=running.id).update(status="RUNNING")
+        queued = upload_job_service.enqueue_purge_job(self.data_bridge, self.admin)
+
+        job = upload_job_service.claim_next_job()
+        self.assertEqual(job.id, queued.id)
+        self.assertEqual(job.status, "RUNNING")
+        self.assertIsNotNone(job.heartbeat_at)
+        self.assertIsNone(upload_job_service.claim_next_job())
+
+    def test_requeue_stale_jobs(self):
+        stale = upload_job_service.enqueue_purge_job(self.data_bridge, self.admin)
+        alive = upload_job_service.enqueue_purge_job(self.data_bridge, self.admin)
+        now = timezone.now()
+        DataBridgeJob.objects.filter(id=stale.id).update(
+            status="RUNNING", heartbeat_at=now - timedelta(minutes=10)
+        )
+        DataBridgeJob.objects.filter(id=alive.id).update(status="RUNNING", heartbeat_at=now)
+
+        self.assertEqual(upload_job_service.requeue_stale_jobs(timedelta(minutes=5)), 1)
+        self.assertEqual(DataBridgeJob.objects.get(id=stale.id).status, "QUEUED")
+        self.assertEqual(DataBridgeJob.objects.get(id=alive.id).status, "RUNNING")
+
+    def test_retry_job(self):
+        upload = self.enqueue_upload([lead_row(0)])
+        purge = upload_job_service.enqueue_purge_job(self.data_bridge, self.admin)
+        DataBridgeJob.objects.update(status="FAILED", error_message="boom")
+
+        self.assertTrue(upload_job_service.retry_job(upload))
+        upload.refresh_from_db()
+        self.assertEqual(upload.status, "QUEUED")
+        self.assertIsNone(upload.error_message)
+        # Queued jobs are not failed, and a purge has no file to resume.
+        self.assertFalse(upload_job_service.retry_job(upload))
+        self.assertFalse(upload_job_service.retry_job(purge))
+
+    def test_run_upload_and_purge_jobs(self):
+        self.enqueue_upload([lead_row(index) for index in range(3)])
+        job = upload_job_service.claim_next_job()
+        upload_job_service.run_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, "COMPLETED", job.error_message)
+        self.assertEqual((job.rows_parsed, job.rows_inserted, job.rows_rejected), (3, 3, 0))
+        self.assertFalse(job.file)
+        self.data_bridge.refresh_from_db()
+        self.assertEqual(self.data_bridge.lead_count, 3)
+        self.assertTrue(upload_job_service.get_job_checkpoint(job).is_completed)
+
+        upload_job_service.enqueue_purge_job(self.data_bridge, self.admin)
+        job = upload_job_service.claim_next_job()
+        upload_job_service.run_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, "COMPLETED", job.error_message)
+        self.assertEqual(job.rows_deleted, 3)
+        self.assertFalse(StudentLeads.objects.exists())
+        self.assertFalse(DataBridge.objects.filter(id=self.data_bridge.id).exists())
+
+    def test_endpoints_queue_jobs(self):
+        response = self.client.post(
+            "/api/v1/uploads/",
+            {"source": "FAIR", "sub_source": "STALL", "year": 2024, "file": build_csv([lead_row(0)])},
+        )
+        self.assertEqual(response.status_code, 202, response.data)
+        self.assertEqual(response.data["detail"]["job_type"], "UPLOAD")
+        self.assertEqual(response.data["detail"]["status"], "QUEUED")
+
+        response = self.client.post(
+            "/api/v1/uploads/append/",
+            {
+                "file_name": self.data_bridge.file_name,
+                "extend_entries": "True",
+                "file": build_csv([lead_row(1)]),
+            },
+        )
+        self.assertEqual(response.status_code, 202, response.data)
+        self.assertEqual(response.data["detail"]["job_type"], "APPEND")
+
+        response = self.client.delete(
+            "/api/v1/uploads/", {"file_name": self.data_bridge.file_name}, format="json"
+        )
+        self.assertEqual(response.status_code, 202, response.data)
+        purge_id = response.data["detail"]["id"]
+        self.assertEqual(response.data["detail"]["job_type"], "PURGE")
+
+        # A second delete reports the purge already queued.
+        response = self.client.delete(
+            "/api/v1/uploads/", {"file_name": self.data_bridge.file_name}, format="json"
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["detail"]["id"], purge_id)
+        self.assertEqual(DataBridgeJob.objects.filter(status="QUEUED").count(), 3)
+
+
+class LeadIngestTestCase(TestCase):
+    lead_fields = [
+        "first_name",
+        "last_name",
+        "email",
+        "contact_no",
+        "alt_contact_no",
+        "gender",
+        "school",
+        "is_attempted",
+        "is_assigned",
+        "parents_info__father_name",
+        "parents_info__mother_name",
+        "parents_info__father_contact_no",
+        "parents_info__mother_contact_no",
+        "address__country__name",
+        "address__state__name",
+        "address__city__name",
+        "address__postal_code",
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        admin = User.objects.create_superuser(email="admin@example.com")
+        cls.data_bridge = DataBridge.objects.create(
+            file_name="leads.csv", source="WEB", sub_source="FORM", uploaded_by=admin
+        )
+
+    def upload(self, rows, engine=INGEST_ENGINE_ORM, **options):
+        return DataProcessor.process_upload_file(
+            build_csv(rows), self.data_bridge.id, engine=engine, **options
+        )
+
+    def create_checkpoint(self):
+        return UploadCheckpoint.objects.create(data_bridge=self.data_bridge, file_hash="x")
+
+    def get_rejections(self, checkpoint):
+        return list(
+            checkpoint.rejections.order_by("row_no").values_list(
+                "row_no", "email", "reason", "lead_id"
+            )
+        )
+
+    def test_engines_insert_identical_rows(self):
+        rows = [lead_row(index) for index in range(4)]
+        rows[1][3] = None  # no contact_no
+        rows[2][9:12] = [None, None, None]  # no geography
+        rows[3][11] = "Trivandrum"  # a city the upload creates
+
+        snapshots = {}
+        for engine in (INGEST_ENGINE_ORM, INGEST_ENGINE_COPY):
+            self.assertEqual(self.upload(rows, engine=engine), 4)
+            snapshots[engine] = list(
+                StudentLeads.objects.order_by("email").values_list(*self.lead_fields)
+            )
+            StudentLeads.objects.all().delete()
+
+        self.assertEqual(snapshots[INGEST_ENGINE_ORM], snapshots[INGEST_ENGINE_COPY])
+        self.assertEqual(
+            snapshots[INGEST_ENGINE_ORM][0][-4:], ("INDIA", "KERALA", "KOCHI", "682001")
+        )
+
+    def test_csv_returns_inserted_count(self):
+        self.assertEqual(self.upload([lead_row(index) for index in range(5)]), 5)
+        self.data_bridge.refresh_from_db()
+        self.assertEqual(self.data_bridge.lead_count, 5)
+
+    def test_resumed_checkpoint_skips_committed_rows(self):
+        rows = [lead_row(index) for index in range(5)]
+        checkpoint = self.create_checkpoint()
+        # An earlier run committed the first two rows before it stopped.
+        self.upload(rows[:2], checkpoint=checkpoint)
+        StudentLeads.objects.filter(email="lead0@example.com").update(first_name="Kept")
+
+        self.assertEqual(self.upload(rows, checkpoint=checkpoint), 5)
+        checkpoint.refresh_from_db()
+        self.assertEqual((checkpoint.chunk_offset, checkpoint.rows_committed), (5, 5))
+        self.assertEqual(self.get_rejections(checkpoint), [])
+        self.assertEqual(StudentLeads.objects.count(), 5)
+        self.assertEqual(StudentLeads.objects.get(email="lead0@example.com").first_name, "Kept")
+
+    def test_rejections_are_recorded(self):
+        for engine in (INGEST_ENGINE_ORM, INGEST_ENGINE_COPY):
+            with self.subTest(engine=engine):
+                StudentLeads.objects.all().delete()
+                self.upload([lead_row(0)], engine=engine)
+                existing_id = StudentLeads.objects.get().id
+
+                rows = [lead_row(index) for index in range(3)]
+                missing = lead_row(3)
+                missing[2] = "  "
+                checkpoint = self.create_checkpoint()
+                inserted = self.upload(
+                    rows + [missing, lead_row(1)], engine=engine, checkpoint=checkpoint
+                )
+
+                self.assertEqual(inserted, 2)
+                self.assertEqual(
+                    self.get_rejections(checkpoint),
+                    [
+                        (1, "lead0@example.com", "ALREADY_EXISTS", existing_id),
+                        (4, None, "MISSING_EMAIL", None),
+                        (5, "lead1@example.com", "DUPLICATE_IN_FILE", None),
+                    ],
+                )
+                checkpoint.delete()
+
+    def test_merge_only_fills_missing_contact_fields(self):
+        lead = StudentLeads.objects.create(
+            first_name="Asha", email="lead0@example.com", contact_no="1111111111"
+        )
+        row = lead_row(0)
+        row[4] = "2222222222"  # alt_contact_no
+        row[5] = "Other School"
+        checkpoint = self.create_checkpoint()
+
+        inserted = self.upload(
+            [row, lead_row(1)], checkpoint=checkpoint, duplicate_mode=DUPLICATE_MODE_MERGE
+        )
+
+        self.assertEqual(inserted, 1)
+        self.assertEqual(
+            self.get_rejections(checkpoint), [(1, "lead0@example.com", "MERGED", lead.id)]
+        )
+        lead.refresh_from_db()
+        self.assertEqual(lead.first_name, "Asha")
+        self.assertEqual(lead.last_name, "Last0")
+        self.assertEqual(lead.contact_no, "1111111111")
+        self.assertEqual(lead.alt_contact_no, "2222222222")
+        self.assertIsNone(lead.school)
+
+
+class CopyIngestConflictTestCase(TestCase):
+    def test_lead_inserted_after_dedupe_is_recorded_as_already_exists(self):
+        admin = User.objects.create_superuser(email="admin@example.com")
+        data_bridge = DataBridge.objects.create(
+            file_name="leads.csv", source="WEB", sub_source="FORM", uploaded_by=admin
+        )
+        checkpoint = UploadCheckpoint.objects.create(data_bridge=data_bridge, file_hash="x")
+        rows = [lead_row(index) for index in range(3)]
+        DataProcessor.process_upload_file(
+            build_csv(rows[1:2]), data_bridge.id, engine=INGEST_ENGINE_COPY
+        )
+        existing_id = StudentLeads.objects.get().id
+
+        # As if the lead committed between split_duplicates and the COPY.
+        with mock.patch.object(
+            lead_dedupe_service, "split_duplicates", lambda dataframe, mode: (dataframe, [])
+        ):
+            inserted = DataProcessor.process_upload_file(
+                build_csv(rows), data_bridge.id, engine=INGEST_ENGINE_COPY, checkpoint=checkpoint
+            )
+
+        self.assertEqual(inserted, 2)
+        self.assertEqual(
+            list(checkpoint.rejections.values_list("row_no", "email", "reason", "lead_id")),
+            [(2, "lead1@example.com", "ALREADY_EXISTS", existing_id)],
+        )
+        self.assertEqual((checkpoint.chunk_offset, checkpoint.rows_committed), (3, 2))
+
+
+class ClaimNextJobLockTestCase(TransactionTestCase):
+    """A job locked by another worker's claim is skipped, not waited on."""
+
+    def test_claim_skips_locked_jobs(self):
+        admin = User.objects.create_superuser(email="admin@example.com")
+        data_bridge = DataBridge.objects.create(
+            file_name="leads.xlsx", source="WEB", sub_source="FORM", uploaded_by=admin
+        )
+        locked = upload_job_service.enqueue_purge_job(data_bridge, admin)
+        free = upload_job_service.enqueue_purge_job(data_bridge, admin)
+
+        is_locked, release = threading.Event(), threading.Event()
+
+        def hold_lock():
+            try:
+                with transaction.atomic():
+                    DataBridgeJob.objects.select_for_update().get(id=locked.id)
+                    is_locked.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        worker = threading.Thread(target=hold_lock)
+        worker.start()
+        try:
+            self.assertTrue(is_locked.wait(10))
+            self.assertEqual(upload_job_service.claim_next_job().id, free.id)
+            self.assertIsNone(upload_job_service.claim_next_job())
+        finally:
+            release.set()
+            worker.join()
+
+        self.assertEqual(upload_job_service.claim_next_job().id, locked.id)
@@ -1,6 +1,7 @@
 from django.utils import timezone
 import re
 from utilities import utils
+from utilities.row_serializers import RowSerializer, format_datetime
 from info_bridge.models import DataBridge
 from rest_framework import serializers
 from leads.models import (
@@ -17,6 +18,8 @@ from locations.models import Address
 from utilities.custom_exceptions import UnexpectedError
 from permissions.models import LeadsDistributions, Role, UserRoleMapping
 from django.db import transaction
+from leads.services import lead_counter_service, lead_facet_service
+from permissions.services import quota_service
 
 
 class DataBridgeSourceModelSerializer(serializers.ModelSerializer):
@@ -147,6 +150,10 @@ class StudentLeadsSerializer(serializers.ModelSerializer):
         parents_info_data = validated_data.pop("parents_info", None)
         education_info_data = validated_data.pop("education_info", None)
         address_info_data = validated_data.pop("address", None)
+        moves_facet = "school" in validated_data or bool(address_info_data)
+
+        if moves_facet:
+            lead_facet_service.remove_leads([instance.id])
 
         if validated_data:
             StudentLeads.objects.filter(id=instance.id).update(**validated_data)
@@ -214,6 +221,9 @@ class StudentLeadsSerializer(serializers.ModelSerializer):
         if address_updates:
             Address.objects.bulk_update(address_updates, list(address_info_data.keys()))
 
+        if moves_facet:
+            lead_facet_service.add_leads([instance.id])
+
         return instance
 
 
@@ -271,6 +281,7 @@ class LeadRemarkSerializer(serializers.ModelSerializer):
             ]
             instance.is_follow_up = validated_data["is_follow_up"]
             instance.is_remarked = True
+            lead_counter_service.remove_leads([instance.lead_id])
             instance.save()
             validated_data["leadremark_id"] = instance.id
             validated_data["user_id"] = instance.user_id
@@ -290,6 +301,7 @@ class LeadRemarkSerializer(serializers.ModelSerializer):
                         "notes": validated_data["review"],
                     },
                 )
+            lead_counter_service.add_leads([instance.lead_id])
 
             # LEAD REMARK HISTORY CREATE.
             if instance.is_follow_up:
@@ -469,6 +481,7 @@ class AssignedTOSerializer(serializers.ModelSerializer):
     ):
         lead_status = "REFERRED"
         with transaction.atomic():
+            lead_counter_service.remove_leads([lead.id])
             if not assigned_to_exists:
                 AssignedTO.objects.create(
                     lead=lead, assign_to=assign_to, assign_by=assign_by
@@ -489,6 +502,7 @@ class AssignedTOSerializer(serializers.ModelSerializer):
                 LeadRemarkHistory.objects.create(
                     leadremark=leadremark_obj, user=assign_by, lead_status=lead_status
                 )
+            lead_counter_service.add_leads([lead.id])
 
         return validated_data
 
@@ -678,7 +692,7 @@ class LeadDistributionSerializer(serializers.ModelSerializer):
             validated_data["country"] = "INDIA"
 
         try:
-            return LeadsDistributions.objects.update_or_create(
+            lead_distribution = LeadsDistributions.objects.update_or_create(
                 user_id=user_id,
                 defaults={
                     "source": source,
@@ -689,3 +703,74 @@ class LeadDistributionSerializer(serializers.ModelSerializer):
             )
         except Exception as e:
             raise UnexpectedError(f"{e}")
+
+        quota_service.sync_quota_entries(user_id)
+        quota_service.invalidate_quota(user_id)
+        return lead_distribution
+
+
+def _lead_label(email, first_name, last_name):
+    if email:
+        return email
+    elif first_name:
+        return f"{first_name} {last_name}"
+    return None
+
+
+def _user_label(username, first_name, last_name):
+    if username:
+        return username
+    elif first_name:
+        return f"{first_name} {last_name}"
+    return None
+
+
+class PendingLeadsRowSerializer(RowSerializer):
+    """PendingLeadsSerializer's output, from LeadRemark values() rows."""
+
+    fields = (
+        ("id", "id", None),
+        ("contact_established", "contact_established", None),
+        ("contact_status", "contact_status", None),
+        ("review", "review", None),
+        ("lead_status", "lead_status", None),
+        ("contact_no", "lead__contact_no", None),
+        ("time_spent_on_lead_in_min", "time_spent_on_lead_in_min", None),
+        # PendingLeadsSerializer reports updated_at as created_at too.
+        ("created_at", "updated_at", format_datetime),
+        ("updated_at", "updated_at", format_datetime),
+        ("is_remarked", "is_remarked", None),
+        ("lead", ("lead__email", "lead__first_name", "lead__last_name"), _lead_label),
+        ("user", ("user__username", "user__first_name", "user__last_name"), _user_label),
+    )
+
+
+class ReferredLeadsRowSerializer(RowSerializer):
+    """ReferredLeadsSerializer's output, from AssignedTO values() rows."""
+
+    fields = (
+        ("id", "id", None),
+        ("assign_to", "assign_to__email", None),
+        ("assign_by", "assign_by__email", None),
+        ("lead", "lead__email", None),
+        ("lead_id", "lead_id", None),
+        ("assigned_at", "assigned_at", format_datetime),
+    )
+
+
+class LeadRemarkHistoryRowSerializer(RowSerializer):
+    """LeadRemarkHistorySerializer's output, from LeadRemarkHistory values() rows."""
+
+    fields = (
+        ("user", "user__email", None),
+        ("contact_established", "contact_established", None),
+        ("contact_status", "contact_status", None),
+        ("review", "review", None),
+        ("lead_status", "lead_status", None),
+        ("start_time", "start_time", format_datetime),
+        ("end_time", "end_time", format_datetime),
+        ("time_spent_on_lead_in_min", "time_spent_on_lead_in_min", None),
+        ("is_follow_up", "is_follow_up", None),
+        ("updated_at", "updated_at", format_datetime),
+        ("created_at", "created_at", format_datetime),
+    )
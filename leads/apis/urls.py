@@ -6,6 +6,7 @@ from leads.apis.views import (
     LeadRemarkHistoryAPIView,
     AssignLeadAPIVIew,
     StatusWiseLeadAPIView,
+    LeadStatusCounterAPIView,
     LeadDistributionAPIView,
     WeeklyNotificationsView
 )
@@ -19,6 +20,7 @@ urlpatterns = [
     path("remark-history/", LeadRemarkHistoryAPIView.as_view(), name="remark-history"),
     path("assign/", AssignLeadAPIVIew.as_view(), name="assign-leads"),
     path('status-wise-lead/', StatusWiseLeadAPIView.as_view(), name="status-wise-lead"),
+    path('status-counters/', LeadStatusCounterAPIView.as_view(), name="status-counters"),
     path('distribution-to-user/', LeadDistributionAPIView.as_view(), name='lead-distribution'),
     
     #  path('notifications/mark-viewed/', MarkNotificationsAsViewed.as_view(), name='mark_notifications_as_viewed'),
@@ -3,61 +3,55 @@ from django.db.models import Q
 from rest_framework.views import APIView
 from rest_framework import status
 from rest_framework.response import Response
-from utilities import utils, pagination
-from utilities.custom_exceptions import LeadAlreadyAttemptedException
+from utilities import utils, const
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from permissions.custom_permissions import CustomPermission
-from leads.models import (AssignedTO, FollowUp, LeadRemark, LeadRemarkHistory,
-    OptimizedAddressView, ParentsInfo, StudentLeads)
+from leads.models import (AssignedTO, FollowUp, LeadFacet, LeadRemark,
+    LeadRemarkHistory, ParentsInfo, StudentLeads)
 from info_bridge.models import DataBridge
 from leads.apis.serializers import (
     StudentLeadsSerializer,
     LeadRemarkSerializer,
-    LeadRemarkHistorySerializer,
     AssignedTOSerializer,
     FollowUpSerializer,
-    PendingLeadsSerializer,
-    ReferredLeadsSerializer,
+    PendingLeadsRowSerializer,
+    ReferredLeadsRowSerializer,
+    LeadRemarkHistoryRowSerializer,
     LeadDistributionSerializer,
 )
 from utilities.custom_exceptions import UnexpectedError, PageNotFound
-from django.db.models import Count
+from django.db.models import Exists, F, OuterRef, Sum
 from django.db import connection, transaction
 from leads.apis.lead_permission import IsLeadOwnerOrAdmin, LeadTypePermissions
 from LMS.settings import AUTH_PASSWORD_VALIDATORS
-from utilities.utils import StandardResultsSetPagination
-from permissions.models import LeadsDistributions
+from utilities.utils import StandardResultsSetPagination, get_paginator
+from utilities.row_serializers import RowSerializer
+from permissions.services import quota_service
+from leads.services.lead_claim_service import claim_leads
+from leads.services.lead_counter_service import get_counters
 
 
 class DynamicLeadFilterAPIView(APIView):
     """
-    CREATE MATERIALIZED VIEW optimized_address_view as
-    SELECT
-        db.source,
-        db.sub_source,
-        c.name AS country_name,
-        s.name AS state_name,
-        ci.name AS city_name,
-        sl.school
-    FROM
-        info_bridge_databridge db
-    JOIN
-        leads_studentleads sl ON sl.uploaded_id = db.id
-    JOIN
-        locations_address a ON a.lead_id = sl.id
-    JOIN
-        locations_country c ON a.country_id = c.id
-    JOIN
-        locations_state s ON a.state_id = s.id
-    JOIN
-        locations_city ci ON a.city_id = ci.id
-    WITH DATA;
+    Drill-down lists (source -> sub_source -> state -> city -> school) with
+    lead counts, read from the incrementally maintained LeadFacet table.
 
+    Every item comes back as {"name", "lead_count", "unattempted_count"} so the
+    UI can show e.g. "DELHI (1,234 open)" without extra queries. Non-empty
+    quota lists of the user restrict every level.
     """
 
     authentication_classes = [JWTAuthentication]
     permission_classes = [CustomPermission]
 
+    drill_down_levels = (
+        ("source", "Source List"),
+        ("sub_source", "Sub Source List"),
+        ("state_name", "State List"),
+        ("city_name", "City List"),
+        ("school", "School List"),
+    )
+
     def get(self, request):
         source = request.GET.get("source")
         sub_source = request.GET.get("sub_source")
@@ -66,74 +60,40 @@ class DynamicLeadFilterAPIView(APIView):
         city = request.GET.get("city")
         school = request.GET.get("school")
 
+        quota = {}
         # Superuser bypasses permissions
         if not request.user.is_superuser:
-            lead_distribution_qs = LeadsDistributions.objects.filter(user_id=request.user.id)
-            if not lead_distribution_qs.exists():
+            quota = quota_service.get_quota(request.user.id)
+            if quota is None:
                 payload = utils.get_payload(request, message="There are no leads in your quotas.")
                 return Response(data=payload, status=status.HTTP_200_OK)
 
-            # Extract user permission data
-            user_permission = lead_distribution_qs.first()
-            ld_source = user_permission.source or []
-            ld_sub_source = user_permission.sub_source or []
-            ld_state = user_permission.state or []
-            ld_city = user_permission.city or []
-            ld_school = user_permission.school or []
-            
-
-        # Helper function to build queryset filters dynamically
-        def filter_queryset():
-            filters = Q(country_name=country)
-            if source:
-                filters &= Q(source__in=ld_source if source in ld_source else [source])
-            if sub_source:
-                filters &= Q(sub_source__in=ld_sub_source  if sub_source in ld_sub_source else [sub_source])
-            if state:
-                filters &= Q(state_name__in=ld_state if state in ld_state else [state])
-            if city:
-                filters &= Q(city_name__in=ld_city if city in ld_city else [city])
-            if school:
-                filters &= Q(school__in=ld_school if school in ld_school else [school])
-            return filters
-
-        # Determine the appropriate queryset and response message
-        if source and not any([sub_source, state, city, school]):
-            if request.user.is_superuser or ld_sub_source is None or not ld_sub_source:
-                sub_source_qs = DataBridge.objects.filter(source=source).values_list("sub_source", flat=True).distinct()
-            else:
-                sub_source_qs = DataBridge.objects.filter(source__in=ld_source, sub_source__in=ld_sub_source).values_list("sub_source", flat=True).distinct()
-            message = "Sub Source List"
-            detail = sub_source_qs
-            
-        elif source and sub_source and not any([state, city, school]):
-            if request.user.is_superuser or ld_state is None or not ld_state:
-                state_qs = OptimizedAddressView.objects.filter(filter_queryset()).values_list("state_name", flat=True).distinct()
-            else:
-                state_qs = OptimizedAddressView.objects.filter(filter_queryset(), state_name__in=ld_state).values_list("state_name", flat=True).distinct()
-            message = "State List"
-            detail = state_qs
-            
-        elif source and sub_source and state and not city and not school:
-            if request.user.is_superuser or ld_city or not ld_city:
-                city_qs = OptimizedAddressView.objects.filter(filter_queryset()).values_list("city_name", flat=True).distinct()
-            else:
-                city_qs = OptimizedAddressView.objects.filter(filter_queryset(), city_name__in=ld_city).values_list("city_name", flat=True).distinct()
-            message = "City List"
-            detail = city_qs
-            
-        elif source and sub_source and state and city and not school:
-            if request.user.is_superuser or ld_school or not ld_school:
-                school_qs = OptimizedAddressView.objects.filter(filter_queryset()).values_list("school", flat=True).distinct()
-            else:
-                school_qs = OptimizedAddressView.objects.filter(filter_queryset(), school__in=ld_school).values_list("school", flat=True).distinct()
-            message = "School List"
-            detail = school_qs
-            
-        else:
-            source_qs = DataBridge.objects.filter(source__in=ld_source, ).values_list("source", flat=True).distinct()
-            message = "Source List"
-            detail = source_qs
+        # The level to list is the first filter that isn't selected yet, any
+        # other combination falls back to the source list.
+        selected = [source, sub_source, state, city, school]
+        depth = 0
+        while depth < len(selected) and selected[depth]:
+            depth += 1
+        if depth == len(selected) or any(selected[depth:]):
+            depth = 0
+
+        filters = Q(country_name=country, lead_count__gt=0)
+        for (field, _), value in zip(self.drill_down_levels[:depth], selected):
+            filters &= Q(**{field: value})
+        filters &= quota_service.get_quota_filter(
+            request.user.id, quota, quota_service.FACET_QUOTA_COLUMNS
+        )
+
+        field, message = self.drill_down_levels[depth]
+        detail = list(
+            LeadFacet.objects.filter(filters)
+            .values(name=F(field))
+            .annotate(
+                lead_count=Sum("lead_count"),
+                unattempted_count=Sum("unattempted_count"),
+            )
+            .order_by("name")
+        )
 
         payload = utils.get_payload(request, detail=detail, message=message)
         return Response(data=payload, status=status.HTTP_200_OK)
@@ -171,12 +131,15 @@ class FetchLeadAPIView(APIView):
             query &= Q(school=school)
         return query
 
-    def update_is_viewed_field(self, obj) -> None:
-        with connection.cursor() as cursor:
-            cursor.execute(
-                "UPDATE leads_studentleads SET is_attempted = TRUE WHERE id = %s",
-                [obj.id],
-            )
+    def get_claimed_leads_qs(self):
+        return StudentLeads.objects.select_related(
+            "parents_info",
+            "education_info",
+            "general_info",
+            "address__country",
+            "address__state",
+            "address__city",
+        )
 
     def get(self, request):
         source = request.GET.get("source", None)
@@ -186,6 +149,7 @@ class FetchLeadAPIView(APIView):
         city = request.GET.get("city", None)
         school = request.GET.get("school", None)
         lead_id = request.GET.get("lead_id", None)
+        batch = request.GET.get("batch", None)
 
         if lead_id:
             is_leadowner = IsLeadOwnerOrAdmin()
@@ -213,80 +177,86 @@ class FetchLeadAPIView(APIView):
             return Response(data=payload, status=status.HTTP_200_OK)
 
         else:
+            batch_size = None
+            if batch is not None:
+                try:
+                    batch_size = int(batch)
+                except ValueError:
+                    batch_size = 0
+
+                if not 0 < batch_size <= const.max_lead_claim_batch:
+                    payload = utils.get_payload(
+                        request,
+                        message=f"batch should be between 1 and {const.max_lead_claim_batch}.",
+                    )
+                    return Response(data=payload, status=status.HTTP_400_BAD_REQUEST)
+
+            query = self.get_query(source, sub_source, country, state, city, school)
             if not request.user.is_superuser:
-                lead_distribution_qs = LeadsDistributions.objects.filter(user_id=request.user.id)
-                
-                # Extract user permission data
-                user_permission = lead_distribution_qs.first()
-                ld_source = user_permission.source or []
-                ld_sub_source = user_permission.sub_source or []
-                ld_state = user_permission.state or []
-                ld_city = user_permission.city or []
-                ld_school = user_permission.school or []
-                
+                quota = quota_service.get_quota(request.user.id)
+                if quota is None:
+                    payload = utils.get_payload(request, message="There are no leads in your quotas.")
+                    return Response(data=payload, status=status.HTTP_403_FORBIDDEN)
+
                 # check for lead permission...
                 message=None
-                if (source and ld_source):
-                    if source not in ld_source:
-                        message=f"You have no permission to access the {source} leads."
-                if sub_source and ld_sub_source:
-                    if sub_source not in ld_sub_source:
-                        message = f"You have no permission to access the {sub_source} leads."
-                if state and ld_state:
-                    if state not in ld_state:
-                        message = f"You have no permission to access the {state} leads."
-                if city and ld_city:
-                    if city not in ld_city:
-                        message = f"You have no permission to access the {city} leads."
+                for field, value in (
+                    ("source", source),
+                    ("sub_source", sub_source),
+                    ("state", state),
+                    ("city", city),
+                ):
+                    if value and not quota_service.is_allowed(quota, field, value):
+                        message = f"You have no permission to access the {value} leads."
                 if message:
                     payload = utils.get_payload(request, message=message)
                     return Response(data=payload, status=status.HTTP_403_FORBIDDEN)
-            
-            query = self.get_query(source, sub_source, country, state, city, school)
-            student_leads_qs = StudentLeads.objects.select_related(
-                "parents_info", "education_info", "general_info", "address"
-            ).filter(query, is_attempted=False)
 
-            if student_leads_qs.exists():
-                try:
-                    
-                    # db transaction start over here...
-                    with transaction.atomic():
-                        first_student_obj = student_leads_qs.first()
-                        lead_remark_obj, is_created = LeadRemark.objects.get_or_create(
-                            lead_id=first_student_obj.id,
-                            defaults={
-                                "start_time": timezone.now(),
-                                "user_id": request.user.id,
-                            },
-                        )
-                        
-                        
-                        if is_created:
-                            self.update_is_viewed_field(obj=first_student_obj)
-                            serialized_student_details = StudentLeadsSerializer(
-                                first_student_obj, many=False
-                            ).data
-                            payload = utils.get_payload(
-                                request,
-                                detail=serialized_student_details,
-                                message="Student details.",
-                            )
-                            return Response(data=payload, status=status.HTTP_200_OK)
-                        else:
-                            raise LeadAlreadyAttemptedException(
-                                detail=f"This lead is already attempted by: {lead_remark_obj.user.email}. "
-                            )
-
-                except LeadAlreadyAttemptedException as laa:
-                    payload = utils.get_payload(request, message=str(laa))
-                    return Response(data=payload, status=status.HTTP_409_CONFLICT)
-
-                except Exception as e:
+                # Only leads inside every list of the quota can be claimed.
+                query &= quota_service.get_quota_filter(
+                    request.user.id, quota, quota_service.LEAD_QUOTA_COLUMNS
+                )
+
+            try:
+                lead_ids, lease_expires_at = claim_leads(
+                    user_id=request.user.id, query=query, limit=batch_size or 1
+                )
+            except Exception as e:
+                payload = utils.get_payload(
+                    request, message="An unexpected error occurse."
+                )
+                return Response(data=payload, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+            if lead_ids:
+                student_leads_qs = self.get_claimed_leads_qs().filter(id__in=lead_ids)
+                lease_information = {
+                    "lease_expires_at": utils.convert_into_desired_dtime_format(
+                        lease_expires_at
+                    ),
+                }
+
+                if batch_size is None:
+                    serialized_student_details = StudentLeadsSerializer(
+                        student_leads_qs.get(), many=False
+                    ).data
                     payload = utils.get_payload(
-                        request, message="An unexpected error occurse."
+                        request,
+                        detail=serialized_student_details,
+                        message="Student details.",
+                        extra_information=lease_information,
                     )
-                    return Response(data=payload, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                    return Response(data=payload, status=status.HTTP_200_OK)
+
+                serialized_student_details = StudentLeadsSerializer(
+                    student_leads_qs.order_by("id"), many=True
+                ).data
+                payload = utils.get_payload(
+                    request,
+                    detail=serialized_student_details,
+                    message=f"{len(lead_ids)} Student details.",
+                    extra_information=lease_information,
+                )
+                return Response(data=payload, status=status.HTTP_200_OK)
 
             payload = utils.get_payload(request, message="There is no leads.")
             return Response(data=payload, status=status.HTTP_404_NOT_FOUND)
@@ -382,17 +352,16 @@ class LeadRemarkHistoryAPIView(APIView):
         JWTAuthentication
     ]  # check for user is autnenticated or not.
     permission_classes = [CustomPermission]  # check for user has permissions or not
-    leadremark_history_serializer_class = LeadRemarkHistorySerializer
+    leadremark_history_serializer_class = LeadRemarkHistoryRowSerializer
 
     def get(self, request):
         records = 10
         lead_id = request.GET.get("lead_id", None)
-        lead_remark_history = (
-            LeadRemarkHistory.objects.select_related("leadremark")
-            .filter(leadremark__lead__id=lead_id)
-            .order_by("-updated_at")
-            .annotate(count=Count("id"))[:records]
-        )
+        lead_remark_history = self.leadremark_history_serializer_class.project(
+            LeadRemarkHistory.objects.filter(leadremark__lead__id=lead_id).order_by(
+                "-updated_at"
+            )
+        )[:records]
 
         try:
             lead_remark_history_serialized_data = (
@@ -448,17 +417,20 @@ class StatusWiseLeadAPIView(APIView):
     ]  # check for user is autnenticated or not.
     permission_classes = [CustomPermission]  # check for user has permissions or not
 
+    def get_remark_qs(self, query, user_id):
+        return LeadRemark.objects.filter(query, user_id=user_id).order_by(
+            "-updated_at", "-id"
+        )
+
     def handle_pending(self, lead_status, user_id):
-        pending_leads_qs = LeadRemark.objects.filter(
-            lead_status=lead_status, user_id=user_id
-        ).order_by("-updated_at")
+        pending_leads_qs = self.get_remark_qs(Q(lead_status=lead_status), user_id)
         message = "Pending"
         return pending_leads_qs, message
 
     def handle_referred(self, lead_status, user_id):
         # Add operation for "REFERRED"
         assigned_to_lead_qs = AssignedTO.objects.filter(assign_by__id=user_id).order_by(
-            "-assigned_at"
+            "-assigned_at", "-id"
         )
         message = "Assigned"
         return assigned_to_lead_qs, message
@@ -468,57 +440,74 @@ class StatusWiseLeadAPIView(APIView):
         un_qualified_ = "UNQUALIFIED"
         lost_ = "LOST"
         query = Q(lead_status=un_qualified_) | Q(lead_status=lost_)
-        rejected_lead_remark_qs = LeadRemark.objects.filter(
-            query, user_id=user_id
-        ).order_by("-updated_at")
+        rejected_lead_remark_qs = self.get_remark_qs(query, user_id)
         message = "Rejected"
 
         return rejected_lead_remark_qs, message
 
     def handle_completed(self, lead_status, user_id):
         # Add operation for "COMPLETED"
-        completed_lead_qs = LeadRemark.objects.filter(
-            lead_status=lead_status, user_id=user_id
-        ).order_by("-updated_at")
+        completed_lead_qs = self.get_remark_qs(Q(lead_status=lead_status), user_id)
         message = "Completed"
         return completed_lead_qs, message
 
     def handle_followup(self, lead_status, user_id):
-        followup_leads = FollowUp.objects.filter(
-            lead__lead_remark__lead_status=lead_status, follow_up_by_id=user_id
-        ).order_by("-follow_up_date")
+        # EXISTS rather than a join, so a lead with several matching remarks
+        # is listed once.
+        followup_leads = (
+            FollowUp.objects.filter(
+                Exists(
+                    LeadRemark.objects.filter(
+                        lead_id=OuterRef("lead_id"), lead_status=lead_status
+                    )
+                ),
+                follow_up_by_id=user_id,
+            )
+            .select_related("lead", "follow_up_by")
+            .only(
+                "follow_up_date",
+                "follow_up_time",
+                "notes",
+                "lead__first_name",
+                "lead__last_name",
+                "lead__contact_no",
+                "follow_up_by__username",
+                "follow_up_by__first_name",
+            )
+            .order_by("-follow_up_date", "-id")
+        )
         message = "Followup"
         return followup_leads, message
 
+    # lead_status -> (handler, serializer, keyset column for ?pagination=cursor).
+    # Only the requested status's queryset gets built. Row serializers project
+    # it with values(), the others read the select_related() instances.
+    lead_status_registry = {
+        "PENDING": ("handle_pending", PendingLeadsRowSerializer, "-updated_at"),
+        "REFERRED": ("handle_referred", ReferredLeadsRowSerializer, "-assigned_at"),
+        "REJECTED": ("handle_rejected", PendingLeadsRowSerializer, "-updated_at"),
+        "COMPLETED": ("handle_completed", PendingLeadsRowSerializer, "-updated_at"),
+        "FOLLOWUP": ("handle_followup", FollowUpSerializer, "-follow_up_date"),
+    }
+
     def get(self, request):
         user_id = request.GET.get("user_id", None)
         lead_status = request.GET.get("lead_status", None)
         lead_permissions = LeadTypePermissions()
 
-        lead_status_operations = {
-            "PENDING": self.handle_pending(lead_status, user_id),
-            "REFERRED": self.handle_referred(lead_status, user_id),
-            "REJECTED": self.handle_rejected(lead_status, user_id),
-            "COMPLETED": self.handle_completed(lead_status, user_id),
-            "FOLLOWUP": self.handle_followup(lead_status, user_id),
-        }
-
-        lead_serializers_dic = {
-            "PENDING": PendingLeadsSerializer,
-            "REFERRED": ReferredLeadsSerializer,
-            "REJECTED": PendingLeadsSerializer,
-            "COMPLETED": PendingLeadsSerializer,
-            "FOLLOWUP": FollowUpSerializer,
-        }
-
-        if lead_status in lead_status_operations:
+        if lead_status in self.lead_status_registry:
             try:
-                lead_qs, _message = lead_status_operations[lead_status]
-                lead_status_operations[lead_status]
+                handler, serializer_class, ordering = self.lead_status_registry[
+                    lead_status
+                ]
+                lead_qs, _message = getattr(self, handler)(lead_status, user_id)
+                if issubclass(serializer_class, RowSerializer):
+                    lead_qs = serializer_class.project(lead_qs)
 
                 if lead_permissions.has_object_permission(request, None, lead_qs):
-                    paginated_user_qs = pagination.paginate_queryset(lead_qs, request)
-                    serialized_lead_data = lead_serializers_dic[lead_status](
+                    paginator = get_paginator(request, ordering=ordering)
+                    paginated_user_qs = paginator.paginate_queryset(lead_qs, request)
+                    serialized_lead_data = serializer_class(
                         paginated_user_qs, many=True
                     ).data
 
@@ -526,7 +515,7 @@ class StatusWiseLeadAPIView(APIView):
                         request,
                         detail=serialized_lead_data,
                         message=f"{_message} Leads",
-                        extra_information=pagination.get_paginated_response(
+                        extra_information=paginator.get_paginated_response(
                             data=serialized_lead_data
                         ),
                     )
@@ -559,6 +548,38 @@ class StatusWiseLeadAPIView(APIView):
             return Response(data=payload, status=status.HTTP_400_BAD_REQUEST)
 
 
+class LeadStatusCounterAPIView(APIView):
+    """
+    Badge counts of every StatusWiseLeadAPIView list for one user, read from
+    the maintained LeadStatusCounter rows instead of counting each list.
+    """
+
+    authentication_classes = [
+        JWTAuthentication
+    ]  # check for user is autnenticated or not.
+    permission_classes = [CustomPermission]  # check for user has permissions or not
+
+    def get(self, request):
+        user_id = request.GET.get("user_id", None)
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            payload = utils.get_payload(request, message="user_id should be an integer.")
+            return Response(data=payload, status=status.HTTP_400_BAD_REQUEST)
+
+        if not LeadTypePermissions().has_object_permission(request, None, None):
+            payload = utils.get_payload(
+                request,
+                message="You do not have permission to access another user's lead counts.",
+            )
+            return Response(data=payload, status=status.HTTP_403_FORBIDDEN)
+
+        payload = utils.get_payload(
+            request, detail=get_counters(user_id), message="Lead status counters."
+        )
+        return Response(data=payload, status=status.HTTP_200_OK)
+
+
 class LeadDistributionAPIView(APIView):
 
     authentication_classes = [
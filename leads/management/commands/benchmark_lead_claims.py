@@ -0,0 +1,156 @@
+import threading
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from accounts.models import User
+from leads.models import LeadRemark, StudentLeads
+from leads.services.lead_claim_service import claim_leads
+from leads.services.lead_counter_service import reconcile_counters, remove_leads
+from leads.services.lead_facet_service import mark_released, rebuild_facets
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark concurrent lead claiming. Every worker claims leads in a loop and "
+        "the run reports claims/sec and the conflict rate. Claims are released at the "
+        "end unless --keep is passed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user-id", type=int, required=True)
+        parser.add_argument("--workers", type=int, default=50)
+        parser.add_argument("--claims", type=int, default=20, help="Claims per worker.")
+        parser.add_argument(
+            "--batch", type=int, default=1, help="Leads reserved per skip-locked claim."
+        )
+        parser.add_argument(
+            "--mode",
+            choices=["skip-locked", "legacy"],
+            default="skip-locked",
+            help="legacy replays the old exists()/first()/get_or_create() flow.",
+        )
+        parser.add_argument("--keep", action="store_true")
+
+    def legacy_claim(self, user_id):
+        """The pre SKIP LOCKED flow, kept only to compare against."""
+        student_leads_qs = StudentLeads.objects.filter(is_attempted=False)
+        if not student_leads_qs.exists():
+            return None, False
+
+        with transaction.atomic():
+            first_student_obj = student_leads_qs.first()
+            if first_student_obj is None:
+                return None, False
+            _, is_created = LeadRemark.objects.get_or_create(
+                lead_id=first_student_obj.id,
+                defaults={"start_time": timezone.now(), "user_id": user_id},
+            )
+            if is_created:
+                StudentLeads.objects.filter(id=first_student_obj.id).update(
+                    is_attempted=True
+                )
+            return first_student_obj.id, not is_created
+
+    def worker(self, mode, user_id, claims, batch, results, lock):
+        claimed, conflicts, empty, errors = [], 0, 0, 0
+        try:
+            for _ in range(claims):
+                try:
+                    if mode == "legacy":
+                        lead_id, is_conflict = self.legacy_claim(user_id)
+                        lead_ids = [lead_id] if lead_id is not None else []
+                    else:
+                        lead_ids, _ = claim_leads(user_id=user_id, limit=batch)
+                        is_conflict = False
+                except Exception:
+                    errors += 1
+                    continue
+
+                if is_conflict:
+                    conflicts += 1
+                elif not lead_ids:
+                    empty += 1
+                else:
+                    claimed.extend(lead_ids)
+        finally:
+            connection.close()
+
+        with lock:
+            results["claimed"].extend(claimed)
+            results["conflicts"] += conflicts
+            results["empty"] += empty
+            results["errors"] += errors
+
+    def release(self, mode, user_id, started_at):
+        """
+        Only claim_leads() moves the counters and facets, so only its claims
+        are taken back out of them; legacy claims are just undone.
+        """
+        lead_remark_qs = LeadRemark.objects.filter(
+            user_id=user_id, created_at__gte=started_at, is_remarked=False
+        )
+        lead_ids = list(lead_remark_qs.values_list("lead_id", flat=True))
+        with transaction.atomic():
+            if mode != "legacy":
+                remove_leads(lead_ids)
+            lead_remark_qs.delete()
+            StudentLeads.objects.filter(id__in=lead_ids).update(is_attempted=False)
+            if mode != "legacy":
+                mark_released(lead_ids)
+        return len(lead_ids)
+
+    def handle(self, *args, **options):
+        user_id = options["user_id"]
+        workers = options["workers"]
+        claims = options["claims"]
+        mode = options["mode"]
+        batch = options["batch"] if mode == "skip-locked" else 1
+
+        if not User.objects.filter(id=user_id).exists():
+            raise CommandError(f"User {user_id} doesn't exists.")
+
+        results = {"claimed": [], "conflicts": 0, "empty": 0, "errors": 0}
+        lock = threading.Lock()
+        threads = [
+            threading.Thread(
+                target=self.worker, args=(mode, user_id, claims, batch, results, lock)
+            )
+            for _ in range(workers)
+        ]
+
+        started_at = timezone.now()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        attempts = workers * claims
+        requested = attempts * batch
+        claimed = results["claimed"]
+        duplicates = len(claimed) - len(set(claimed))
+
+        self.stdout.write(f"mode:            {mode}")
+        self.stdout.write(f"workers:         {workers}")
+        self.stdout.write(f"batch:           {batch}")
+        self.stdout.write(f"attempts:        {attempts}")
+        self.stdout.write(f"claimed:         {len(claimed)}")
+        self.stdout.write(f"duplicate leads: {duplicates}")
+        self.stdout.write(f"conflicts:       {results['conflicts']}")
+        self.stdout.write(f"no lead left:    {results['empty']}")
+        self.stdout.write(f"errors:          {results['errors']}")
+        self.stdout.write(f"elapsed:         {elapsed:.2f}s")
+        self.stdout.write(f"claims/sec:      {len(claimed) / elapsed:.1f}")
+        self.stdout.write(
+            f"conflict rate:   {100 * (results['conflicts'] + duplicates) / requested:.2f}%"
+        )
+
+        if not options["keep"]:
+            released = self.release(mode, user_id, started_at)
+            self.stdout.write(f"released:        {released}")
+        elif mode == "legacy":
+            # The kept legacy claims bypassed the counters and facets.
+            rebuild_facets()
+            self.stdout.write(f"counters fixed:  {reconcile_counters()}")
@@ -0,0 +1,184 @@
+import json
+import time
+import uuid
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
+from accounts.models import User
+from info_bridge.apis.serializers import (
+    DataBridgeListRowSerializer,
+    DataBridgeListSerializer,
+)
+from info_bridge.models import DataBridge
+from leads.apis.serializers import (
+    LeadRemarkHistoryRowSerializer,
+    LeadRemarkHistorySerializer,
+    PendingLeadsRowSerializer,
+    PendingLeadsSerializer,
+    ReferredLeadsRowSerializer,
+    ReferredLeadsSerializer,
+)
+from leads.models import AssignedTO, LeadRemark, LeadRemarkHistory, StudentLeads
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the values() row serializers of the list endpoints against "
+        "the DRF serializers they replace, on synthetic rows created inside a "
+        "transaction that is rolled back. Reports rows/sec for fetching and "
+        "serializing a page and checks that both produce the same JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user-id", type=int, required=True)
+        parser.add_argument("--rows", type=int, default=100, help="Rows per page.")
+        parser.add_argument("--repeat", type=int, default=50)
+
+    def create_rows(self, user, rows):
+        prefix = uuid.uuid4().hex[:8]
+        now = timezone.now()
+        data_bridges = DataBridge.objects.bulk_create(
+            [
+                DataBridge(
+                    file_name=f"{prefix}_{index}.xlsx",
+                    source="BENCHMARK",
+                    sub_source="SERIALIZERS",
+                    lead_count=index,
+                    uploaded_by=user,
+                )
+                for index in range(rows)
+            ]
+        )
+        leads = StudentLeads.objects.bulk_create(
+            [
+                StudentLeads(
+                    first_name=f"first{index}",
+                    last_name=f"last{index}" if index % 2 else None,
+                    email=f"{prefix}.{index}@benchmark.local",
+                    contact_no=f"{9000000000 + index}",
+                    uploaded=data_bridges[0],
+                )
+                for index in range(rows)
+            ]
+        )
+        lead_remarks = LeadRemark.objects.bulk_create(
+            [
+                LeadRemark(
+                    lead=lead,
+                    user=user,
+                    contact_established=bool(index % 2),
+                    contact_status="Other",
+                    review=f"review {index}",
+                    start_time=now,
+                    end_time=now if index % 3 else None,
+                )
+                for index, lead in enumerate(leads)
+            ]
+        )
+        LeadRemarkHistory.objects.bulk_create(
+            [
+                LeadRemarkHistory(
+                    leadremark=lead_remark,
+                    user=user,
+                    start_time=now,
+                    end_time=now if index % 3 else None,
+                )
+                for index, lead_remark in enumerate(lead_remarks)
+            ]
+        )
+        AssignedTO.objects.bulk_create(
+            [AssignedTO(lead=lead, assign_to=user, assign_by=user) for lead in leads]
+        )
+        return data_bridges[0], leads
+
+    def get_cases(self, user, data_bridge, leads):
+        """(name, DRF serializer, its queryset, row serializer, base queryset)."""
+        lead_remark_qs = LeadRemark.objects.filter(user=user, lead__uploaded=data_bridge)
+        assigned_to_qs = AssignedTO.objects.filter(
+            assign_by=user, lead__uploaded=data_bridge
+        )
+        history_qs = LeadRemarkHistory.objects.filter(
+            leadremark__lead__uploaded=data_bridge
+        )
+        data_bridge_qs = DataBridge.objects.filter(sub_source="SERIALIZERS")
+        return [
+            (
+                "PendingLeads",
+                PendingLeadsSerializer,
+                lead_remark_qs.select_related("lead", "user"),
+                PendingLeadsRowSerializer,
+                lead_remark_qs,
+            ),
+            (
+                "ReferredLeads",
+                ReferredLeadsSerializer,
+                assigned_to_qs.select_related("lead", "assign_to", "assign_by"),
+                ReferredLeadsRowSerializer,
+                assigned_to_qs,
+            ),
+            (
+                "LeadRemarkHistory",
+                LeadRemarkHistorySerializer,
+                history_qs.select_related("user"),
+                LeadRemarkHistoryRowSerializer,
+                history_qs,
+            ),
+            (
+                "DataBridgeList",
+                DataBridgeListSerializer,
+                data_bridge_qs.select_related("uploaded_by"),
+                DataBridgeListRowSerializer,
+                data_bridge_qs,
+            ),
+        ]
+
+    def time_page(self, serialize, repeat):
+        started_at = time.perf_counter()
+        for _ in range(repeat):
+            data = serialize()
+        return data, time.perf_counter() - started_at
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(id=options["user_id"]).first()
+        if user is None:
+            raise CommandError(f"User {options['user_id']} doesn't exists.")
+
+        rows, repeat = options["rows"], options["repeat"]
+        results = []
+        try:
+            with transaction.atomic():
+                data_bridge, leads = self.create_rows(user, rows)
+                for name, serializer, queryset, row_serializer, base_qs in self.get_cases(
+                    user, data_bridge, leads
+                ):
+                    queryset = queryset.order_by("id")
+                    row_qs = row_serializer.project(base_qs.order_by("id"))
+                    drf_data, drf_elapsed = self.time_page(
+                        lambda: serializer(list(queryset), many=True).data, repeat
+                    )
+                    row_data, row_elapsed = self.time_page(
+                        lambda: row_serializer(list(row_qs), many=True).data, repeat
+                    )
+                    is_identical = json.dumps(drf_data, cls=JSONEncoder) == json.dumps(
+                        row_data, cls=JSONEncoder
+                    )
+                    results.append((name, drf_elapsed, row_elapsed, is_identical))
+                raise Rollback
+        except Rollback:
+            pass
+
+        self.stdout.write(f"rows per page: {rows}, pages: {repeat}")
+        self.stdout.write(
+            f"{'serializer':<20}{'drf rows/s':>14}{'row rows/s':>14}{'speedup':>10}  same json"
+        )
+        for name, drf_elapsed, row_elapsed, is_identical in results:
+            self.stdout.write(
+                f"{name:<20}{rows * repeat / drf_elapsed:>14,.0f}"
+                f"{rows * repeat / row_elapsed:>14,.0f}"
+                f"{drf_elapsed / row_elapsed:>9.1f}x  {'yes' if is_identical else 'NO'}"
+            )
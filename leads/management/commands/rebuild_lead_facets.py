@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from leads.models import LeadFacet
+from leads.services.lead_facet_service import rebuild_facets
+
+
+class Command(BaseCommand):
+    help = "Recompute the LeadFacet counts used by the dynamic lead filter."
+
+    def handle(self, *args, **options):
+        rebuild_facets()
+        self.stdout.write(f"Rebuilt {LeadFacet.objects.count()} lead facets.")
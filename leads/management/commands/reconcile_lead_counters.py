@@ -0,0 +1,27 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from leads.services.lead_counter_service import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the per-user status counters behind the status-counters "
+        "endpoint and correct any drift. Use --loop to run it periodically."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true")
+        parser.add_argument(
+            "--interval", type=int, default=3600, help="Seconds between runs."
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            corrected = reconcile_counters()
+            self.stdout.write(f"Corrected {corrected} lead status counters.")
+
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,50 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from leads.services.lead_claim_service import get_lease_ttl, release_expired_leads
+
+
+class Command(BaseCommand):
+    help = (
+        "Release attempted leads whose lease expired without a remark back into "
+        "the pool. Use --loop to keep sweeping in the background."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--ttl-minutes",
+            type=int,
+            default=None,
+            help="Defaults to settings.LEAD_LEASE_TTL_MINUTES.",
+        )
+        parser.add_argument("--loop", action="store_true")
+        parser.add_argument(
+            "--interval", type=int, default=60, help="Seconds between sweeps."
+        )
+
+    def sweep(self, batch_size, ttl):
+        released = 0
+        while True:
+            lead_ids = release_expired_leads(batch_size=batch_size, ttl=ttl)
+            released += len(lead_ids)
+            if len(lead_ids) < batch_size:
+                return released
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        ttl = (
+            timedelta(minutes=options["ttl_minutes"])
+            if options["ttl_minutes"] is not None
+            else get_lease_ttl()
+        )
+
+        while True:
+            close_old_connections()
+            released = self.sweep(batch_size, ttl)
+            self.stdout.write(f"Released {released} expired leads.")
+
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
@@ -47,7 +47,9 @@ class StudentLeads(models.Model):
         indexes = [
             models.Index(fields=["school"]),
             models.Index(fields=["is_attempted"]),
-            models.Index(fields=["is_assigned"])
+            models.Index(fields=["is_assigned"]),
+            # purge batches walk a file's leads in id order
+            models.Index(fields=["uploaded", "id"]),
         ]
 
 
@@ -141,7 +143,14 @@ class LeadRemark(models.Model):
 
     class Meta:
         indexes = [
-            models.Index(fields=["lead_status"])
+            models.Index(fields=["lead_status"]),
+            # keyset pagination of a user's remarks per status
+            models.Index(fields=["user", "lead_status", "updated_at", "id"]),
+            models.Index(
+                fields=["start_time"],
+                condition=models.Q(is_remarked=False),
+                name="leadremark_open_lease_idx",
+            ),
         ]
         
 class LeadRemarkHistory(models.Model):
@@ -203,6 +212,12 @@ class FollowUp(models.Model):
     def __str__(self):
         return f"Follow-up by {self.follow_up_by} on Lead {self.lead.id}"
 
+    class Meta:
+        indexes = [
+            # keyset pagination of a user's follow-ups
+            models.Index(fields=["follow_up_by", "follow_up_date", "id"]),
+        ]
+
 
 class AssignedTO(models.Model):
     lead = models.ForeignKey(
@@ -224,15 +239,76 @@ class AssignedTO(models.Model):
     )
     assigned_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # keyset pagination of the leads a user referred
+            models.Index(fields=["assign_by", "assigned_at", "id"]),
+        ]
+
+
+class LeadFacet(models.Model):
+    """
+    Lead counts per (source, sub_source, country, state, city, school).
+
+    Kept up to date by leads.services.lead_facet_service as leads are
+    uploaded, deleted, claimed and released, so DynamicLeadFilterAPIView can
+    read counts straight from the covering index.
+    """
 
-class OptimizedAddressView(models.Model):
     source = models.CharField(max_length=50)
     sub_source = models.CharField(max_length=50)
     country_name = models.CharField(max_length=100)
     state_name = models.CharField(max_length=100)
     city_name = models.CharField(max_length=100)
     school = models.CharField(max_length=400, null=True, blank=True)
+    lead_count = models.BigIntegerField(default=0)
+    unattempted_count = models.BigIntegerField(default=0)
 
     class Meta:
-        managed = False  # This is a view, not a table
-        db_table = "optimized_address_view"
\ No newline at end of file
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    "source",
+                    "sub_source",
+                    "country_name",
+                    "state_name",
+                    "city_name",
+                    "school",
+                ],
+                include=["lead_count", "unattempted_count"],
+                nulls_distinct=False,
+                name="unique_lead_facet",
+            )
+        ]
+
+
+class LeadStatusCounter(models.Model):
+    """
+    How many leads of each StatusWiseLeadAPIView list a user has.
+
+    Kept up to date by leads.services.lead_counter_service in the same
+    transaction as the change, and reconciled periodically.
+    """
+
+    STATUS_CHOICES = (
+        ("PENDING", "PENDING"),
+        ("REFERRED", "REFERRED"),
+        ("REJECTED", "REJECTED"),
+        ("COMPLETED", "COMPLETED"),
+        ("FOLLOWUP", "FOLLOWUP"),
+    )
+
+    user = models.ForeignKey(
+        User, related_name="lead_status_counters", on_delete=models.CASCADE
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES)
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "status"],
+                include=["count"],
+                name="unique_lead_status_counter",
+            )
+        ]
@@ -0,0 +1,152 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from leads.models import StudentLeads
+from leads.services import lead_counter_service, lead_facet_service
+
+
+# The candidate sub-select is compiled by the ORM (so the lead filters stay the
+# same Q objects the views already build) and locks its rows with
+# FOR UPDATE SKIP LOCKED: concurrent callers never wait on, nor receive, a lead
+# another transaction is claiming. Flagging the lead and creating its
+# LeadRemark happen in the same statement.
+CLAIM_LEAD_SQL = """
+WITH candidate AS (
+    {candidate_sql}
+),
+claimed AS (
+    UPDATE leads_studentleads sl
+    SET is_attempted = TRUE
+    FROM candidate
+    WHERE sl.id = candidate.id
+    RETURNING sl.id
+)
+INSERT INTO leads_leadremark (
+    lead_id,
+    user_id,
+    start_time,
+    contact_established,
+    lead_status,
+    time_spent_on_lead_in_min,
+    created_at,
+    updated_at,
+    is_follow_up,
+    is_remarked
+)
+SELECT claimed.id, %s, %s, FALSE, 'PENDING', 0, %s, %s, FALSE, FALSE
+FROM claimed
+RETURNING lead_id;
+"""
+
+# A lease is the un-remarked LeadRemark created by a claim. Once start_time is
+# older than the TTL the remark is dropped and the lead goes back to the pool.
+# Leads that were assigned, put on follow-up or already have history are
+# never touched. Rows are walked through leadremark_open_lease_idx and locked
+# with SKIP LOCKED so the sweeper never blocks a counsellor.
+RELEASE_EXPIRED_LEADS_SQL = """
+WITH expired AS (
+    SELECT lr.id
+    FROM leads_leadremark lr
+    JOIN leads_studentleads sl ON sl.id = lr.lead_id
+    WHERE lr.is_remarked = FALSE
+      AND lr.start_time < %s
+      AND lr.is_follow_up = FALSE
+      AND sl.is_assigned = FALSE
+      AND NOT EXISTS (
+          SELECT 1 FROM leads_leadremarkhistory lrh WHERE lrh.leadremark_id = lr.id
+      )
+    ORDER BY lr.start_time
+    LIMIT %s
+    FOR UPDATE OF lr, sl SKIP LOCKED
+),
+released AS (
+    DELETE FROM leads_leadremark lr
+    USING expired
+    WHERE lr.id = expired.id
+    RETURNING lr.lead_id, lr.user_id, lr.lead_status
+),
+reopened AS (
+    UPDATE leads_studentleads sl
+    SET is_attempted = FALSE
+    FROM released
+    WHERE sl.id = released.lead_id
+)
+SELECT lead_id, user_id, lead_status FROM released;
+"""
+
+
+def get_lease_ttl() -> timedelta:
+    """How long a claimed lead stays reserved before it can be released."""
+    return timedelta(minutes=settings.LEAD_LEASE_TTL_MINUTES)
+
+
+def claim_leads(user_id: int, query: Q = None, limit: int = 1):
+    """
+    Claim up to ``limit`` unattempted leads matching ``query`` for ``user_id``.
+
+    Every lead is marked as attempted and gets its LeadRemark in a single
+    round trip. Returns the claimed lead ids (ordered by id) and the time at
+    which their lease expires.
+    """
+    query = query or Q()
+    now = timezone.now()
+
+    with transaction.atomic():
+        candidate_qs = (
+            StudentLeads.objects.filter(query, is_attempted=False)
+            .order_by("id")
+            .select_for_update(skip_locked=True, of=("self",))
+            .values("id")[:limit]
+        )
+        candidate_sql, candidate_params = candidate_qs.query.sql_with_params()
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                CLAIM_LEAD_SQL.format(candidate_sql=candidate_sql),
+                [*candidate_params, user_id, now, now, now],
+            )
+            lead_ids = sorted(row[0] for row in cursor.fetchall())
+
+        lead_counter_service.add_leads(lead_ids)
+
+        # Facet counters are shared by every claimer of the same slice, so they
+        # are bumped after commit instead of being locked by the claim.
+        transaction.on_commit(lambda: lead_facet_service.mark_attempted(lead_ids))
+
+    return lead_ids, now + get_lease_ttl()
+
+
+def claim_next_lead(user_id: int, query: Q = None):
+    """
+    Claim the next unattempted lead matching ``query`` for ``user_id``.
+
+    Returns the claimed lead id, or None when no lead is free.
+    """
+    lead_ids, _ = claim_leads(user_id=user_id, query=query, limit=1)
+    return lead_ids[0] if lead_ids else None
+
+
+def release_expired_leads(batch_size: int = 1000, ttl: timedelta = None):
+    """
+    Release one batch of leads whose lease expired without a remark.
+
+    Returns the released lead ids; fewer than ``batch_size`` means the
+    backlog is drained.
+    """
+    expired_before = timezone.now() - (ttl or get_lease_ttl())
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(RELEASE_EXPIRED_LEADS_SQL, [expired_before, batch_size])
+            released = cursor.fetchall()
+
+        lead_ids = [lead_id for lead_id, _, _ in released]
+        lead_counter_service.remove_remarks(
+            (user_id, lead_status) for _, user_id, lead_status in released
+        )
+
+        transaction.on_commit(lambda: lead_facet_service.mark_released(lead_ids))
+
+    return lead_ids
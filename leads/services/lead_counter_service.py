@@ -0,0 +1,155 @@
+from django.db import connection, transaction
+from leads.models import LeadStatusCounter
+
+
+COUNTER_STATUSES = [status for status, _ in LeadStatusCounter.STATUS_CHOICES]
+
+# LeadRemark.lead_status -> the status list a remark shows up in.
+REMARK_STATUS_COUNTERS = {
+    "PENDING": "PENDING",
+    "COMPLETED": "COMPLETED",
+    "UNQUALIFIED": "REJECTED",
+    "LOST": "REJECTED",
+}
+
+REMARK_COUNTER_SQL = "CASE lr.lead_status {} END".format(
+    " ".join(
+        f"WHEN '{lead_status}' THEN '{status}'"
+        for lead_status, status in REMARK_STATUS_COUNTERS.items()
+    )
+)
+
+# What every lead contributes to its users' counters, matching the querysets
+# of StatusWiseLeadAPIView: the remark counts for its user, an assignment for
+# the user who referred it and a follow-up for its owner while the lead's
+# remark is on FOLLOWUP.
+COUNTER_SOURCE_SQL = f"""
+SELECT user_id, status, %s * COUNT(*)
+FROM (
+    SELECT lr.user_id, {REMARK_COUNTER_SQL} AS status
+    FROM leads_leadremark lr
+    {{join_remark}}
+    WHERE lr.user_id IS NOT NULL
+    UNION ALL
+    SELECT at.assign_by_id, 'REFERRED'
+    FROM leads_assignedto at
+    {{join_assigned}}
+    WHERE at.assign_by_id IS NOT NULL
+    UNION ALL
+    SELECT fu.follow_up_by_id, 'FOLLOWUP'
+    FROM leads_followup fu
+    {{join_follow_up}}
+    WHERE fu.follow_up_by_id IS NOT NULL
+      AND EXISTS (
+          SELECT 1 FROM leads_leadremark flr
+          WHERE flr.lead_id = fu.lead_id AND flr.lead_status = 'FOLLOWUP'
+      )
+) AS contribution
+WHERE status IS NOT NULL
+GROUP BY user_id, status
+ORDER BY user_id, status
+"""
+
+# Rows are upserted in (user, status) order so concurrent deltas lock the
+# counters they share in the same order.
+APPLY_COUNTER_DELTA_SQL = f"""
+WITH delta AS (
+    SELECT DISTINCT unnest(%s::bigint[]) AS lead_id
+)
+INSERT INTO leads_leadstatuscounter (user_id, status, count)
+{COUNTER_SOURCE_SQL.format(
+    join_remark="JOIN delta ON delta.lead_id = lr.lead_id",
+    join_assigned="JOIN delta ON delta.lead_id = at.lead_id",
+    join_follow_up="JOIN delta ON delta.lead_id = fu.lead_id",
+)}
+ON CONFLICT (user_id, status) DO UPDATE
+SET count = leads_leadstatuscounter.count + EXCLUDED.count;
+"""
+
+APPLY_REMARK_DELTA_SQL = """
+INSERT INTO leads_leadstatuscounter (user_id, status, count)
+SELECT user_id, status, %s * COUNT(*)
+FROM unnest(%s::bigint[], %s::text[]) AS remark(user_id, status)
+GROUP BY user_id, status
+ORDER BY user_id, status
+ON CONFLICT (user_id, status) DO UPDATE
+SET count = leads_leadstatuscounter.count + EXCLUDED.count;
+"""
+
+# The lock keeps deltas out while the counts are recomputed: writers that
+# already touched a counter have committed by the time the snapshot is taken,
+# later ones apply their delta on top of the reconciled value.
+RECONCILE_COUNTERS_SQL = f"""
+LOCK TABLE leads_leadstatuscounter IN SHARE ROW EXCLUSIVE MODE;
+WITH actual AS (
+    {COUNTER_SOURCE_SQL.format(join_remark="", join_assigned="", join_follow_up="")}
+),
+corrected AS (
+    INSERT INTO leads_leadstatuscounter (user_id, status, count)
+    SELECT * FROM actual
+    ON CONFLICT (user_id, status) DO UPDATE
+    SET count = EXCLUDED.count
+    WHERE leads_leadstatuscounter.count <> EXCLUDED.count
+    RETURNING 1
+),
+zeroed AS (
+    UPDATE leads_leadstatuscounter c
+    SET count = 0
+    WHERE c.count <> 0
+      AND NOT EXISTS (
+          SELECT 1 FROM actual a WHERE a.user_id = c.user_id AND a.status = c.status
+      )
+    RETURNING 1
+)
+SELECT (SELECT COUNT(*) FROM corrected) + (SELECT COUNT(*) FROM zeroed);
+"""
+
+
+def _apply_delta(lead_ids, sign: int):
+    if not lead_ids:
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(APPLY_COUNTER_DELTA_SQL, [list(lead_ids), sign])
+
+
+def add_leads(lead_ids):
+    """Count what ``lead_ids`` contribute now (call after changing them)."""
+    _apply_delta(lead_ids, sign=1)
+
+
+def remove_leads(lead_ids):
+    """Uncount what ``lead_ids`` contribute now (call before changing them)."""
+    _apply_delta(lead_ids, sign=-1)
+
+
+def remove_remarks(remarks):
+    """Uncount deleted remarks, given as (user_id, lead_status) pairs."""
+    counted = [
+        (user_id, REMARK_STATUS_COUNTERS[lead_status])
+        for user_id, lead_status in remarks
+        if user_id is not None and lead_status in REMARK_STATUS_COUNTERS
+    ]
+    if not counted:
+        return
+
+    user_ids, statuses = zip(*counted)
+    with connection.cursor() as cursor:
+        cursor.execute(APPLY_REMARK_DELTA_SQL, [-1, list(user_ids), list(statuses)])
+
+
+def get_counters(user_id: int) -> dict:
+    """Every status list's lead count for ``user_id``, from its counter rows."""
+    counters = dict.fromkeys(COUNTER_STATUSES, 0)
+    counters.update(
+        LeadStatusCounter.objects.filter(user_id=user_id).values_list("status", "count")
+    )
+    return counters
+
+
+def reconcile_counters() -> int:
+    """Recompute every counter from scratch. Returns how many had drifted."""
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(RECONCILE_COUNTERS_SQL, [1])
+            return cursor.fetchone()[0]
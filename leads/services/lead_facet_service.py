@@ -0,0 +1,94 @@
+from django.db import connection, transaction
+
+
+FACET_COLUMNS = "source, sub_source, country_name, state_name, city_name, school"
+
+# Groups come out in key order so concurrent deltas (upload chunks, claims,
+# releases) lock the facet rows they share in the same order.
+FACET_SOURCE_SQL = """
+SELECT
+    db.source,
+    db.sub_source,
+    c.name,
+    s.name,
+    ci.name,
+    sl.school,
+    %s * COUNT(*),
+    %s * COUNT(*) FILTER (WHERE %s OR NOT sl.is_attempted)
+FROM
+    leads_studentleads sl
+JOIN
+    info_bridge_databridge db ON sl.uploaded_id = db.id
+JOIN
+    locations_address a ON a.lead_id = sl.id
+JOIN
+    locations_country c ON a.country_id = c.id
+JOIN
+    locations_state s ON a.state_id = s.id
+JOIN
+    locations_city ci ON a.city_id = ci.id
+{join}
+GROUP BY 1, 2, 3, 4, 5, 6
+ORDER BY 1, 2, 3, 4, 5, 6
+"""
+
+APPLY_FACET_DELTA_SQL = f"""
+INSERT INTO leads_leadfacet ({FACET_COLUMNS}, lead_count, unattempted_count)
+{FACET_SOURCE_SQL.format(join="JOIN unnest(%s::bigint[]) AS delta(lead_id) ON delta.lead_id = sl.id")}
+ON CONFLICT ({FACET_COLUMNS}) DO UPDATE
+SET lead_count = leads_leadfacet.lead_count + EXCLUDED.lead_count,
+    unattempted_count = leads_leadfacet.unattempted_count + EXCLUDED.unattempted_count
+RETURNING id, lead_count;
+"""
+
+# Only the facets the delta just emptied, by primary key.
+DELETE_EMPTY_FACETS_SQL = """
+DELETE FROM leads_leadfacet WHERE id = ANY(%s::bigint[]) AND lead_count <= 0;
+"""
+
+REBUILD_FACETS_SQL = f"""
+TRUNCATE leads_leadfacet;
+INSERT INTO leads_leadfacet ({FACET_COLUMNS}, lead_count, unattempted_count)
+{FACET_SOURCE_SQL.format(join="")};
+"""
+
+
+def _apply_delta(lead_ids, lead_sign: int, unattempted_sign: int, count_all: bool):
+    if not lead_ids:
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            APPLY_FACET_DELTA_SQL,
+            [lead_sign, unattempted_sign, count_all, list(lead_ids)],
+        )
+        emptied = [facet_id for facet_id, lead_count in cursor.fetchall() if lead_count <= 0]
+        if emptied:
+            cursor.execute(DELETE_EMPTY_FACETS_SQL, [emptied])
+
+
+def add_leads(lead_ids):
+    """Count freshly inserted leads (call after their Address rows exist)."""
+    _apply_delta(lead_ids, lead_sign=1, unattempted_sign=1, count_all=False)
+
+
+def remove_leads(lead_ids):
+    """Uncount leads that are about to be deleted or moved to another facet."""
+    _apply_delta(lead_ids, lead_sign=-1, unattempted_sign=-1, count_all=False)
+
+
+def mark_attempted(lead_ids):
+    """Leads that were just claimed are no longer open."""
+    _apply_delta(lead_ids, lead_sign=0, unattempted_sign=-1, count_all=True)
+
+
+def mark_released(lead_ids):
+    """Leads whose lease expired are open again."""
+    _apply_delta(lead_ids, lead_sign=0, unattempted_sign=1, count_all=True)
+
+
+def rebuild_facets():
+    """Recompute every facet from scratch, e.g. to bootstrap or repair drift."""
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(REBUILD_FACETS_SQL, [1, 1, False])
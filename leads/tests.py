@@ -1,3 +1,743 @@
-from django.test import TestCase
+from datetime import date, datetime, time, timedelta, timezone
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from accounts.models import User
+from info_bridge.apis.purge_service import purge_data_bridge
+from info_bridge.apis.serializers import DataBridgeListRowSerializer, DataBridgeListSerializer
+from info_bridge.apis.upload_service import (
+    INGEST_ENGINE_COPY,
+    INGEST_ENGINE_ORM,
+    UPLOAD_COLUMNS,
+    DataProcessor,
+)
+from info_bridge.models import DataBridge
+from leads.apis.serializers import (
+    AssignedTOSerializer,
+    LeadRemarkHistoryRowSerializer,
+    LeadRemarkHistorySerializer,
+    LeadRemarkSerializer,
+    PendingLeadsRowSerializer,
+    PendingLeadsSerializer,
+    ReferredLeadsRowSerializer,
+    ReferredLeadsSerializer,
+    StudentLeadsSerializer,
+)
+from leads.apis.views import StatusWiseLeadAPIView
+from leads.models import (
+    AssignedTO,
+    FollowUp,
+    LeadFacet,
+    LeadRemark,
+    LeadRemarkHistory,
+    StudentLeads,
+)
+from leads.services import lead_counter_service, lead_facet_service
+from leads.services.lead_claim_service import claim_leads, release_expired_leads
+from locations.models import Address, City, Country, State
+from permissions.models import (
+    CustomPermissions,
+    LeadsDistributions,
+    Role,
+    RoleCustomPermissionMapping,
+    UserRoleMapping,
+)
+from permissions.services import quota_service
 
-# Create your tests here.
+
+class LeadFixtureMixin:
+    """Uploaded leads with a full address, so they are counted in LeadFacet."""
+
+    @classmethod
+    def create_geography(cls):
+        cls.uploader = User.objects.create_superuser(email="uploader@example.com")
+        cls.data_bridges = {
+            source: DataBridge.objects.create(
+                file_name=f"{source.lower()}.xlsx",
+                source=source,
+                sub_source="FORM",
+                uploaded_by=cls.uploader,
+            )
+            for source in ("WEB", "FAIR")
+        }
+        india = Country.objects.create(name="INDIA")
+        cls.cities = {}
+        for state_name, city_name in (("DELHI", "NEW DELHI"), ("KERALA", "KOCHI")):
+            state = State.objects.create(name=state_name, country=india)
+            cls.cities[state_name] = City.objects.create(name=city_name, state=state)
+
+    @classmethod
+    def create_lead(cls, name, source="WEB", state="DELHI", school="ST. MARY", **fields):
+        lead = StudentLeads.objects.create(
+            first_name=name,
+            email=f"{name.lower()}@example.com",
+            school=school,
+            uploaded=cls.data_bridges[source],
+            **fields,
+        )
+        city = cls.cities[state]
+        Address.objects.create(lead=lead, country=city.state.country, state=city.state, city=city)
+        return lead
+
+    def get_facets(self):
+        return sorted(
+            LeadFacet.objects.values_list(
+                "source",
+                "sub_source",
+                "country_name",
+                "state_name",
+                "city_name",
+                "school",
+                "lead_count",
+                "unattempted_count",
+            )
+        )
+
+    def assert_facets_rebuilt(self):
+        """The maintained facets are what a rebuild from scratch gives."""
+        maintained = self.get_facets()
+        lead_facet_service.rebuild_facets()
+        self.assertEqual(maintained, self.get_facets())
+
+
+class StatusWiseLeadQueryCountTestCase(TestCase):
+    """
+    Every StatusWiseLeadAPIView list runs a fixed number of queries, however
+    many rows the page holds.
+    """
+
+    # COUNT(*) or the EXPLAIN estimate, then the page itself.
+    OFFSET_QUERIES = 2
+    CURSOR_QUERIES = 2
+    ROWS_PER_STATUS = 12
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(email="admin@example.com", username="admin")
+        cls.agent = User.objects.create_user(email="agent@example.com", username="agent")
+        cls.counsellor = User.objects.create_user(email="counsellor@example.com")
+
+        remark_statuses = ["PENDING", "UNQUALIFIED", "LOST", "COMPLETED", "FOLLOWUP"]
+        for index in range(cls.ROWS_PER_STATUS * len(remark_statuses)):
+            lead = StudentLeads.objects.create(
+                first_name=f"Lead{index}",
+                last_name="Student",
+                email=f"lead{index}@example.com",
+                contact_no=f"98765{index:05d}",
+            )
+            lead_status = remark_statuses[index % len(remark_statuses)]
+            LeadRemark.objects.create(lead=lead, user=cls.agent, lead_status=lead_status)
+            if lead_status == "FOLLOWUP":
+                FollowUp.objects.create(
+                    lead=lead,
+                    follow_up_by=cls.agent,
+                    follow_up_date=date(2024, 1, 1 + index % 28),
+                    follow_up_time=time(10, 30),
+                    notes="Call back",
+                )
+            if index < cls.ROWS_PER_STATUS:
+                AssignedTO.objects.create(lead=lead, assign_by=cls.agent, assign_to=cls.counsellor)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin, token={"roles": ["admin"]})
+
+    def get_list(self, lead_status: str, page_size: int, **params):
+        response = self.client.get(
+            "/api/v1/leads/status-wise-lead/",
+            {
+                "user_id": self.agent.id,
+                "lead_status": lead_status,
+                "page_size": page_size,
+                **params,
+            },
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(len(response.data["detail"]), page_size)
+        return response
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        modes = [
+            ("offset", {}, self.OFFSET_QUERIES),
+            ("cursor", {"pagination": "cursor"}, self.CURSOR_QUERIES),
+        ]
+        for lead_status in StatusWiseLeadAPIView.lead_status_registry:
+            for mode, params, queries in modes:
+                for page_size in (2, 10):
+                    with self.subTest(lead_status=lead_status, mode=mode, page_size=page_size):
+                        with self.assertNumQueries(queries):
+                            self.get_list(lead_status, page_size, **params)
+
+    def test_cursor_pages_run_the_same_queries(self):
+        for lead_status in StatusWiseLeadAPIView.lead_status_registry:
+            with self.subTest(lead_status=lead_status):
+                response = self.get_list(lead_status, 2, pagination="cursor")
+                next_link = response.data["extra_information"]["pagination_info"]["links"]["next"]
+                with self.assertNumQueries(self.CURSOR_QUERIES):
+                    response = self.client.get(next_link)
+                self.assertEqual(response.status_code, 200, response.data)
+                self.assertEqual(len(response.data["detail"]), 2)
+
+
+class RowSerializerTestCase(TestCase):
+    """The row serializers give the same output as the DRF serializers they replace."""
+
+    @classmethod
+    def setUpTestData(cls):
+        started_at = datetime(2024, 2, 3, 10, 15, 30, tzinfo=timezone.utc)
+        ended_at = datetime(2024, 2, 3, 10, 45, 0, tzinfo=timezone.utc)
+
+        cls.users = [
+            User.objects.create_user(email="agent@example.com", username="agent"),
+            User.objects.create_user(
+                email="named@example.com", username="", first_name="Nora", last_name="Named"
+            ),
+            User.objects.create_user(email="anonymous@example.com", username="", first_name=""),
+        ]
+        leads = [
+            StudentLeads.objects.create(
+                first_name="Asha", last_name="Rao", email="asha@example.com", contact_no="9876500001"
+            ),
+            # No email: labelled by name.
+            StudentLeads.objects.create(first_name="Ravi", last_name=None, email=""),
+        ]
+
+        remarks = []
+        for lead in leads:
+            for user in cls.users:
+                remarks.append(
+                    LeadRemark.objects.create(
+                        lead=lead,
+                        user=user,
+                        contact_status="No Response",
+                        review="Call later",
+                        time_spent_on_lead_in_min=5,
+                    )
+                )
+        cls.remark_without_user = LeadRemark.objects.create(lead=leads[0], user=None)
+
+        AssignedTO.objects.create(lead=leads[0], assign_to=cls.users[1], assign_by=cls.users[0])
+        AssignedTO.objects.create(lead=leads[1], assign_to=None, assign_by=cls.users[0])
+        AssignedTO.objects.create(lead=leads[1], assign_to=cls.users[2], assign_by=None)
+
+        LeadRemarkHistory.objects.create(
+            leadremark=remarks[0],
+            user=cls.users[0],
+            contact_status="Partial Interest",
+            start_time=started_at,
+            end_time=ended_at,
+            time_spent_on_lead_in_min=30,
+            is_follow_up=True,
+        )
+        # Lead still open: no end_time yet.
+        LeadRemarkHistory.objects.create(
+            leadremark=remarks[1], user=cls.users[1], start_time=started_at, end_time=None
+        )
+        LeadRemarkHistory.objects.create(leadremark=None, user=None, start_time=None, end_time=None)
+
+        DataBridge.objects.create(
+            file_name="leads.xlsx", source="web", sub_source="form", uploaded_by=cls.users[0]
+        )
+        DataBridge.objects.create(
+            file_name=None,
+            source="fair",
+            sub_source="stall",
+            year=2020,
+            lead_count=7,
+            uploaded_by=cls.users[1],
+        )
+
+    def assert_same_data(self, serializer_class, row_serializer_class, queryset):
+        expected = [dict(item) for item in serializer_class(queryset, many=True).data]
+        rows = row_serializer_class(row_serializer_class.project(queryset), many=True).data
+        self.assertEqual(len(rows), queryset.count())
+        self.assertEqual([list(row) for row in rows], [list(item) for item in expected])
+        self.assertEqual(rows, expected)
+
+        # A single row, as for a detail response.
+        row = row_serializer_class.project(queryset)[0]
+        self.assertEqual(row_serializer_class(row).data, expected[0])
+
+    def test_pending_leads(self):
+        queryset = LeadRemark.objects.filter(user__isnull=False).order_by("id")
+        self.assert_same_data(PendingLeadsSerializer, PendingLeadsRowSerializer, queryset)
+
+    def test_pending_leads_without_user(self):
+        # PendingLeadsSerializer fails on a remark without a user.
+        queryset = LeadRemark.objects.filter(id=self.remark_without_user.id)
+        (row,) = PendingLeadsRowSerializer(
+            PendingLeadsRowSerializer.project(queryset), many=True
+        ).data
+        self.assertIsNone(row["user"])
+        self.assertEqual(row["lead"], "asha@example.com")
+
+    def test_referred_leads(self):
+        queryset = AssignedTO.objects.order_by("id")
+        self.assert_same_data(ReferredLeadsSerializer, ReferredLeadsRowSerializer, queryset)
+
+    def test_lead_remark_history(self):
+        queryset = LeadRemarkHistory.objects.order_by("id")
+        self.assert_same_data(
+            LeadRemarkHistorySerializer, LeadRemarkHistoryRowSerializer, queryset
+        )
+
+    def test_data_bridge_list(self):
+        queryset = DataBridge.objects.order_by("id")
+        self.assert_same_data(DataBridgeListSerializer, DataBridgeListRowSerializer, queryset)
+
+
+class ClaimLeadsTestCase(LeadFixtureMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_geography()
+        cls.agent = User.objects.create_user(email="agent@example.com")
+        cls.leads = [
+            cls.create_lead(f"Lead{index}", state=("DELHI", "KERALA")[index % 2])
+            for index in range(6)
+        ]
+        for lead in cls.leads[:2]:
+            lead.is_attempted = True
+            lead.save()
+        lead_facet_service.rebuild_facets()
+
+    def claim(self, limit):
+        with self.captureOnCommitCallbacks(execute=True):
+            lead_ids, _ = claim_leads(user_id=self.agent.id, limit=limit)
+        return lead_ids
+
+    def test_claims_only_unattempted_leads_once(self):
+        unattempted = {lead.id for lead in self.leads[2:]}
+
+        first = self.claim(limit=3)
+        second = self.claim(limit=3)
+        self.assertEqual(len(first), 3)
+        self.assertEqual(len(second), 1)
+        self.assertEqual(first, sorted(first))
+        self.assertEqual(set(first) | set(second), unattempted)
+        self.assertFalse(set(first) & set(second))
+        self.assertEqual(self.claim(limit=3), [])
+
+        self.assertEqual(
+            set(StudentLeads.objects.filter(is_attempted=True).values_list("id", flat=True)),
+            {lead.id for lead in self.leads},
+        )
+
+    def test_claim_creates_one_pending_remark_per_lead(self):
+        lead_ids = self.claim(limit=3)
+
+        remarks = LeadRemark.objects.filter(lead_id__in=lead_ids)
+        self.assertEqual(sorted(remarks.values_list("lead_id", flat=True)), lead_ids)
+        for remark in remarks:
+            self.assertEqual(remark.user_id, self.agent.id)
+            self.assertEqual(remark.lead_status, "PENDING")
+            self.assertFalse(remark.is_remarked)
+            self.assertIsNotNone(remark.start_time)
+
+    def test_claim_applies_counter_and_facet_deltas(self):
+        lead_ids = self.claim(limit=3)
+
+        self.assertEqual(lead_counter_service.get_counters(self.agent.id)["PENDING"], 3)
+        self.assertEqual(lead_counter_service.reconcile_counters(), 0)
+        self.assertEqual(sum(facet[-1] for facet in self.get_facets()), 6 - 2 - len(lead_ids))
+        self.assert_facets_rebuilt()
+
+
+class FetchLeadBatchTestCase(LeadFixtureMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_geography()
+        cls.admin = User.objects.create_superuser(email="admin@example.com")
+        cls.leads = [cls.create_lead(f"Lead{index}") for index in range(8)]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin, token={"roles": ["admin"]})
+
+    def test_invalid_batch_sizes_are_rejected(self):
+        for batch in ("0", "51", "abc", "-3"):
+            with self.subTest(batch=batch):
+                response = self.client.get("/api/v1/leads/", {"batch": batch})
+                self.assertEqual(response.status_code, 400)
+        self.assertFalse(StudentLeads.objects.filter(is_attempted=True).exists())
+
+    def test_batch_claims_leads_in_id_order(self):
+        response = self.client.get("/api/v1/leads/", {"batch": 5})
+        self.assertEqual(response.status_code, 200)
+        lead_ids = [lead["id"] for lead in response.data["detail"]]
+        self.assertEqual(lead_ids, [lead.id for lead in self.leads[:5]])
+        self.assertIsNotNone(response.data["extra_information"]["lease_expires_at"])
+
+        # Fewer than asked once the pool runs low.
+        response = self.client.get("/api/v1/leads/", {"batch": 5})
+        lead_ids = [lead["id"] for lead in response.data["detail"]]
+        self.assertEqual(lead_ids, [lead.id for lead in self.leads[5:]])
+
+        response = self.client.get("/api/v1/leads/", {"batch": 5})
+        self.assertEqual(response.status_code, 404)
+
+    def test_without_batch_one_lead_is_returned(self):
+        response = self.client.get("/api/v1/leads/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["detail"]["id"], self.leads[0].id)
+        self.assertIn("lease_expires_at", response.data["extra_information"])
+
+
+class ReleaseExpiredLeadsTestCase(LeadFixtureMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_geography()
+        cls.agent = User.objects.create_user(email="agent@example.com")
+        cls.leads = {
+            name: cls.create_lead(name, state=state)
+            for name, state in (
+                ("Expired", "DELHI"),
+                ("Remarked", "DELHI"),
+                ("Assigned", "KERALA"),
+                ("FollowedUp", "KERALA"),
+                ("Historic", "DELHI"),
+                ("Fresh", "KERALA"),
+            )
+        }
+        lead_facet_service.rebuild_facets()
+
+    def claim_all(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            claim_leads(user_id=self.agent.id, limit=len(self.leads))
+
+        remarks = {
+            remark.lead.first_name: remark for remark in LeadRemark.objects.select_related("lead")
+        }
+        LeadRemark.objects.exclude(lead__first_name="Fresh").update(
+            start_time=datetime.now(timezone.utc) - timedelta(hours=2)
+        )
+        LeadRemark.objects.filter(id=remarks["Remarked"].id).update(is_remarked=True)
+        LeadRemark.objects.filter(id=remarks["FollowedUp"].id).update(is_follow_up=True)
+        StudentLeads.objects.filter(id=self.leads["Assigned"].id).update(is_assigned=True)
+        LeadRemarkHistory.objects.create(leadremark=remarks["Historic"], user=self.agent)
+
+    def release(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return release_expired_leads(batch_size=100, ttl=timedelta(minutes=30))
+
+    def test_only_expired_unremarked_leases_are_released(self):
+        self.claim_all()
+
+        self.assertEqual(self.release(), [self.leads["Expired"].id])
+        self.assertEqual(self.release(), [])
+
+        expired = StudentLeads.objects.get(id=self.leads["Expired"].id)
+        self.assertFalse(expired.is_attempted)
+        self.assertFalse(LeadRemark.objects.filter(lead=expired).exists())
+        kept = StudentLeads.objects.exclude(id=expired.id)
+        self.assertTrue(all(lead.is_attempted for lead in kept))
+        self.assertEqual(LeadRemark.objects.filter(lead__in=kept).count(), len(self.leads) - 1)
+
+        # The released lead can be claimed again.
+        with self.captureOnCommitCallbacks(execute=True):
+            lead_ids, _ = claim_leads(user_id=self.agent.id, limit=10)
+        self.assertEqual(lead_ids, [expired.id])
+
+    def test_counters_and_facets_return_to_their_values(self):
+        self.claim_all()
+        counters_claimed = lead_counter_service.get_counters(self.agent.id)
+        self.assertEqual(counters_claimed["PENDING"], len(self.leads))
+
+        self.release()
+
+        counters = lead_counter_service.get_counters(self.agent.id)
+        self.assertEqual(counters["PENDING"], len(self.leads) - 1)
+        self.assertEqual(lead_counter_service.reconcile_counters(), 0)
+        self.assertEqual(sum(facet[-1] for facet in self.get_facets()), 1)
+        self.assert_facets_rebuilt()
+
+
+class LeadFacetDeltaTestCase(LeadFixtureMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_geography()
+        cls.delhi = [cls.create_lead(f"Delhi{index}") for index in range(2)]
+        cls.kerala = cls.create_lead("Kerala", state="KERALA")
+        lead_facet_service.rebuild_facets()
+
+    def test_removal_deletes_only_the_facets_it_emptied(self):
+        # An empty row the delta doesn't touch is left for the rebuild.
+        LeadFacet.objects.filter(state_name="KERALA").update(lead_count=0)
+
+        lead_facet_service.remove_leads([self.delhi[0].id])
+        self.assertEqual(LeadFacet.objects.get(state_name="DELHI").lead_count, 1)
+
+        lead_facet_service.remove_leads([self.delhi[1].id])
+        self.assertFalse(LeadFacet.objects.filter(state_name="DELHI").exists())
+        self.assertTrue(LeadFacet.objects.filter(state_name="KERALA").exists())
+
+
+class LeadFacetMaintenanceTestCase(LeadFixtureMixin, TestCase):
+    """Every path that changes leads keeps LeadFacet equal to a full rebuild."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_geography()
+        cls.agent = User.objects.create_user(email="agent@example.com")
+
+    def upload(self, source, engine, rows):
+        lines = [",".join(UPLOAD_COLUMNS)]
+        for name, state, city, school in rows:
+            values = dict.fromkeys(UPLOAD_COLUMNS, "")
+            values.update(
+                first_name=name,
+                email=f"{name.lower()}@example.com",
+                country="India",
+                state=state,
+                city=city,
+                school=school,
+            )
+            lines.append(",".join(values[column] for column in UPLOAD_COLUMNS))
+        upload_file = SimpleUploadedFile("leads.csv", "\n".join(lines).encode())
+        return DataProcessor.process_upload_file(
+            upload_file, self.data_bridges[source].id, engine=engine
+        )
+
+    def claim(self, limit):
+        with self.captureOnCommitCallbacks(execute=True):
+            lead_ids, _ = claim_leads(user_id=self.agent.id, limit=limit)
+        return lead_ids
+
+    def test_facets_follow_every_lead_change(self):
+        self.upload(
+            "WEB",
+            INGEST_ENGINE_ORM,
+            [
+                ("Asha", "Delhi", "New Delhi", "St. Mary"),
+                ("Ravi", "Delhi", "New Delhi", "St. Mary"),
+                ("Meera", "Kerala", "Kochi", "Model School"),
+            ],
+        )
+        self.upload(
+            "FAIR",
+            INGEST_ENGINE_COPY,
+            [
+                ("Kiran", "Kerala", "Kochi", "Model School"),
+                ("Dev", "Goa", "Panaji", "Sunrise"),
+            ],
+        )
+        self.assertEqual(sum(facet[-2] for facet in self.get_facets()), 5)
+        self.assert_facets_rebuilt()
+
+        claimed = self.claim(limit=2)
+        self.assert_facets_rebuilt()
+
+        LeadRemark.objects.filter(lead_id=claimed[0]).update(
+            start_time=datetime.now(timezone.utc) - timedelta(days=1)
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            release_expired_leads(ttl=timedelta(minutes=30))
+        self.assert_facets_rebuilt()
+
+        lead = StudentLeads.objects.get(first_name="Meera")
+        StudentLeadsSerializer().update(lead, {"school": "ST. JOHN"})
+        self.assert_facets_rebuilt()
+
+        delhi = self.cities["DELHI"]
+        StudentLeadsSerializer().update(
+            lead, {"address": {"city": delhi, "state": delhi.state}}
+        )
+        self.assert_facets_rebuilt()
+        self.assertTrue(
+            LeadFacet.objects.filter(state_name="DELHI", school="ST. JOHN").exists()
+        )
+
+        purge_data_bridge(self.data_bridges["FAIR"].id)
+        self.assertFalse(LeadFacet.objects.filter(source="FAIR").exists())
+        self.assert_facets_rebuilt()
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class DynamicLeadFilterTestCase(LeadFixtureMixin, TestCase):
+    url = "/api/v1/leads/dynamic-lead-filter/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_geography()
+        cls.admin = User.objects.create_superuser(email="admin@example.com")
+        cls.agent = User.objects.create_user(email="agent@example.com")
+        role = Role.objects.create(role_name="agent")
+        UserRoleMapping.objects.create(user=cls.agent, role=role)
+        permission = CustomPermissions.objects.create(
+            permission_name="Lead filter", method="GET", endpoint=cls.url
+        )
+        RoleCustomPermissionMapping.objects.create(role=role, custom_permission=permission)
+
+        cls.create_lead("Asha")
+        cls.create_lead("Ravi", is_attempted=True)
+        cls.create_lead("Meera", state="KERALA")
+        cls.create_lead("Kiran", source="FAIR", school="DPS")
+        lead_facet_service.rebuild_facets()
+
+    def setUp(self):
+        cache.clear()
+        quota_service._quotas.clear()
+
+    def get_levels(self, user, roles):
+        client = APIClient()
+        client.force_authenticate(user=user, token={"roles": roles})
+        drill_down = [
+            ("source", "WEB"),
+            ("sub_source", "FORM"),
+            ("state", "DELHI"),
+            ("city", "NEW DELHI"),
+        ]
+        levels = []
+        for depth in range(len(drill_down) + 1):
+            response = client.get(self.url, dict(drill_down[:depth]))
+            self.assertEqual(response.status_code, 200)
+            levels.append([dict(item) for item in response.data["detail"]])
+        return levels
+
+    def item(self, name, lead_count, unattempted_count):
+        return {"name": name, "lead_count": lead_count, "unattempted_count": unattempted_count}
+
+    def set_quota(self, **quota):
+        LeadsDistributions.objects.create(user=self.agent, **quota)
+        quota_service.sync_quota_entries(self.agent.id)
+
+    def test_counts_per_level(self):
+        self.assertEqual(
+            self.get_levels(self.admin, ["admin"]),
+            [
+                [self.item("FAIR", 1, 1), self.item("WEB", 3, 2)],
+                [self.item("FORM", 3, 2)],
+                [self.item("DELHI", 2, 1), self.item("KERALA", 1, 1)],
+                [self.item("NEW DELHI", 2, 1)],
+                [self.item("ST. MARY", 2, 1)],
+            ],
+        )
+
+    def test_quota_lists_restrict_every_level(self):
+        self.set_quota(source=[], sub_source=[], state=["KERALA"], city=[], school=[])
+        self.assertEqual(
+            self.get_levels(self.agent, ["agent"]),
+            [[self.item("WEB", 1, 1)], [self.item("FORM", 1, 1)], [self.item("KERALA", 1, 1)], [], []],
+        )
+
+    def test_empty_quota_lists_are_unrestricted(self):
+        self.set_quota(source=["WEB"], sub_source=[], state=[], city=None, school=None)
+        levels = self.get_levels(self.agent, ["agent"])
+        self.assertEqual(levels[0], [self.item("WEB", 3, 2)])
+        self.assertEqual(levels[2], [self.item("DELHI", 2, 1), self.item("KERALA", 1, 1)])
+        self.assertEqual(levels[4], [self.item("ST. MARY", 2, 1)])
+
+
+class LeadStatusCounterTestCase(LeadFixtureMixin, TestCase):
+    """The maintained counters always equal the StatusWiseLeadAPIView list totals."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_geography()
+        cls.admin = User.objects.create_superuser(email="admin@example.com")
+        cls.agents = [
+            User.objects.create_user(email=f"agent{index}@example.com") for index in range(2)
+        ]
+        for index in range(6):
+            cls.create_lead(f"Lead{index}")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin, token={"roles": ["admin"]})
+
+    def assert_counters_match(self):
+        for agent in self.agents:
+            counters = lead_counter_service.get_counters(agent.id)
+            response = self.client.get("/api/v1/leads/status-counters/", {"user_id": agent.id})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data["detail"], counters)
+
+            totals = {}
+            for lead_status in counters:
+                response = self.client.get(
+                    "/api/v1/leads/status-wise-lead/",
+                    {"user_id": agent.id, "lead_status": lead_status},
+                )
+                self.assertEqual(response.status_code, 200)
+                totals[lead_status] = response.data["extra_information"]["pagination_info"]["count"]
+            self.assertEqual(counters, totals, agent.email)
+        self.assertEqual(lead_counter_service.reconcile_counters(), 0)
+
+    def claim(self, agent, limit):
+        with self.captureOnCommitCallbacks(execute=True):
+            lead_ids, _ = claim_leads(user_id=agent.id, limit=limit)
+        return lead_ids
+
+    def remark(self, lead_id, lead_status, **data):
+        remark = LeadRemark.objects.get(lead_id=lead_id)
+        serializer = LeadRemarkSerializer(
+            remark,
+            data={
+                "lead_status": lead_status,
+                "contact_established": True,
+                "contact_status": "Successful Communication",
+                "review": "Called",
+                "is_follow_up": False,
+                **data,
+            },
+            partial=True,
+        )
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+
+    def assign(self, lead_id, assign_by, assign_to):
+        lead = StudentLeads.objects.get(id=lead_id)
+        leadremark_qs = LeadRemark.objects.filter(lead=lead)
+        assigned_lead_obj = AssignedTO.objects.filter(lead=lead, assign_by=assign_by)
+        AssignedTOSerializer()._handle_assignment(
+            lead,
+            assign_to,
+            assign_by,
+            leadremark_qs.first(),
+            leadremark_qs,
+            assigned_lead_obj,
+            assigned_lead_obj.filter(assign_to=assign_to).exists(),
+            {},
+        )
+
+    def test_counters_follow_remarks_assignments_claims_and_releases(self):
+        first, second = self.agents
+        lead_ids = self.claim(first, limit=4)
+        self.assertEqual(lead_counter_service.get_counters(first.id)["PENDING"], 4)
+        self.assert_counters_match()
+
+        self.remark(lead_ids[0], "COMPLETED")
+        self.remark(lead_ids[1], "LOST")
+        self.remark(
+            lead_ids[2],
+            "FOLLOWUP",
+            is_follow_up=True,
+            follow_up_date="2026-01-02",
+            follow_up_time="10:30:00",
+        )
+        self.assert_counters_match()
+
+        # Assigned leads move to the referrer's REFERRED list, out of the
+        # COMPLETED and FOLLOWUP ones.
+        self.assign(lead_ids[0], assign_by=first, assign_to=second)
+        self.assert_counters_match()
+        self.remark(lead_ids[1], "UNQUALIFIED")
+        self.assign(lead_ids[2], assign_by=first, assign_to=second)
+        self.assert_counters_match()
+        self.assertEqual(
+            lead_counter_service.get_counters(first.id),
+            {"PENDING": 1, "REFERRED": 2, "REJECTED": 1, "COMPLETED": 0, "FOLLOWUP": 0},
+        )
+
+        self.claim(second, limit=2)
+        self.assertEqual(lead_counter_service.get_counters(second.id)["PENDING"], 2)
+        LeadRemark.objects.filter(user=second).update(
+            start_time=datetime.now(timezone.utc) - timedelta(hours=2)
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            released = release_expired_leads(ttl=timedelta(minutes=30))
+        # The first agent's unremarked lease has expired too.
+        self.assertEqual(len(released), 2)
+        self.assert_counters_match()
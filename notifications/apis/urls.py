@@ -1,11 +1,8 @@
-
-
 from django.urls import path
-# from notifications.apis.views import 
+from notifications.apis.views import UnreadNotificationCountAPIView
 
 app_name='notifications-apis'
 
 urlpatterns = [
-
-    # path('', UsersAPIView.as_view(), name='users')
-]
\ No newline at end of file
+    path('unread-count/', UnreadNotificationCountAPIView.as_view(), name='unread-count'),
+]
@@ -0,0 +1,23 @@
+from rest_framework.views import APIView
+from rest_framework import status
+from rest_framework.response import Response
+from utilities import utils
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from permissions.custom_permissions import CustomPermission
+from notifications.services import unread_counter_service
+
+
+class UnreadNotificationCountAPIView(APIView):
+    """Notification badge count of the requesting user, read from redis."""
+
+    authentication_classes = [
+        JWTAuthentication
+    ]  # check for user is autnenticated or not.
+    permission_classes = [CustomPermission]  # check for user has permissions or not
+
+    def get(self, request):
+        count = unread_counter_service.get_unread_count(request.user.id)
+        payload = utils.get_payload(
+            request, detail={"count": count}, message="Unread notification count."
+        )
+        return Response(data=payload, status=status.HTTP_200_OK)
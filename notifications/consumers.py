@@ -1,11 +1,23 @@
 from channels.generic.websocket import AsyncWebsocketConsumer
 from datetime import timedelta
+from urllib.parse import parse_qs
 from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
 import json
 from notifications.models import Notification
 from notifications.apis.serializers import NotificationSerializer
 from asgiref.sync import sync_to_async
 from info_bridge.models import DataBridge
+from permissions.models import UserRoleMapping
+from notifications.services import unread_counter_service
+from notifications.services.notification_service import (
+    get_role_group,
+    get_user_group,
+    send_unread_count,
+)
+from utilities import constants as const
+from utilities.custom_exceptions import PageNotFound
+from utilities.utils import KeysetPagination
 
 
 class NotificationConsumer(AsyncWebsocketConsumer):
@@ -13,64 +25,148 @@ class NotificationConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         """used for connecting the application."""
 
-        self.room_name = "notification_room"
-        self.group_name = "notification_group"
+        self.group_names = []
+        self.user = self.scope.get("user")
+        if self.user is None or not self.user.is_authenticated:
+            await self.close()
+            return
 
-        await self.channel_layer.group_add(
-            self.group_name, self.channel_name
-        )  # Add the connection to the group
+        # One group per user and per role, so an event only reaches the
+        # sockets of its recipients.
+        roles = self.scope.get("roles")
+        if roles is None:
+            roles = await self.get_roles()
+        self.group_names = [get_user_group(self.user.id)]
+        self.group_names += [get_role_group(role_name) for role_name in roles]
+
+        for group_name in self.group_names:
+            await self.channel_layer.group_add(
+                group_name, self.channel_name
+            )  # Add the connection to the group
         await self.accept()
         await self.send(
             text_data=json.dumps({"status": "Connection has been established."})
         )
-        await self.send_last_week_notifications()
+        self.since_id = self.get_since_id()
+        await self.send_notification_backlog()
+        count = await sync_to_async(unread_counter_service.get_unread_count)(self.user.id)
+        await self.send(text_data=json.dumps({"action": "unread_count", "count": count}))
+
+    @sync_to_async
+    def get_roles(self):
+        return list(
+            UserRoleMapping.objects.filter(user_id=self.user.id).values_list(
+                "role__role_name", flat=True
+            )
+        )
 
     async def receive(self, text_data):
-        # {"notification_id": '74', "is_viewed": true}
+        # {"action": "update_status", "notification_id": 74}
+        # {"action": "load_backlog", "cursor": "<cursor of the previous backlog frame>"}
         # Handle receiving messages from WebSocket
-        
+
         data = json.loads(text_data)
-        if data['action'] == 'update_status':
-            await self.update_notification_status(data['notification_id'])
+        if data.get("action") == "update_status":
+            await self.update_notification_status(data["notification_id"])
+        elif data.get("action") == "load_backlog":
+            await self.send_notification_backlog(cursor=data.get("cursor"))
 
     @sync_to_async
     def update_notification_status(self, notification_id):
         """Updates the notification status to 'viewed'."""
+        viewed = Notification.objects.filter(
+            id=notification_id, user_id=self.user.id, is_viewed=False
+        ).update(is_viewed=True)
+        if viewed:
+            count = unread_counter_service.decrement(self.user.id, viewed)
+            # Keeps the badge of the user's other sockets in step.
+            send_unread_count(self.user.id, count)
+
+    def get_since_id(self):
+        """``?since=<notification id>``: only replay notifications newer than it."""
+        query_string = parse_qs(self.scope.get("query_string", b"").decode())
         try:
-            Notification.objects.filter(id=notification_id).update(is_viewed=True)
-        except Notification.DoesNotExist:
-            pass
-        
-    async def send_last_week_notifications(self):
-        # Calculate the time range for the past week
+            return int(query_string["since"][0])
+        except (KeyError, ValueError):
+            return None
+
+    @sync_to_async
+    def get_notification_backlog(self, cursor=None):
+        """
+        One page of the user's notifications from the last week, newest
+        first, read through notification_user_created_idx. Returns the
+        serialized page and the cursor of the next (older) page, if any.
+        """
         one_week_ago = timezone.now() - timedelta(days=7)
+        paginator = KeysetPagination(ordering="-created_at")
+        paginator.model = Notification
 
-        # Query and serialize the notifications in an asynchronous way
-        last_week_notifications = await sync_to_async(
-            lambda: Notification.objects.filter(created_at__gte=one_week_ago).order_by(
-                "-created_at"
+        notification_qs = Notification.objects.filter(
+            user_id=self.user.id, created_at__gte=one_week_ago
+        )
+        if self.since_id is not None:
+            notification_qs = notification_qs.filter(id__gt=self.since_id)
+
+        seek = paginator.parse_cursor(cursor, Notification)
+        if seek is not None:
+            notification_qs = notification_qs.filter(
+                paginator.get_seek_filter(Notification, seek[0], seek[1], descending=True)
             )
-        )()
 
-        # Serialize the notifications using NotificationSerializer
-        last_week_notifications_serialized_data = await sync_to_async(
-            lambda: NotificationSerializer(last_week_notifications, many=True).data
-        )()
+        page_size = const.notification_backlog_page_size
+        notifications = list(
+            notification_qs.order_by("-created_at", "-id")[: page_size + 1]
+        )
+        next_cursor = None
+        if len(notifications) > page_size:
+            notifications = notifications[:page_size]
+            next_cursor = paginator.encode_cursor(notifications[-1])
+        return NotificationSerializer(notifications, many=True).data, next_cursor
+
+    async def send_notification_backlog(self, cursor=None):
+        """Send one backlog page as a single frame the client can page back from."""
+        try:
+            notifications, next_cursor = await self.get_notification_backlog(cursor)
+        except PageNotFound:
+            await self.send(
+                text_data=json.dumps({"action": "notification_backlog", "error": "Invalid cursor."})
+            )
+            return
 
-        # Send the notifications to the client
-        for notification in last_week_notifications_serialized_data:
-            await self.send(text_data=json.dumps({"message": notification}))
+        await self.send(
+            text_data=json.dumps(
+                {
+                    "action": "notification_backlog",
+                    "notifications": notifications,
+                    "cursor": next_cursor,
+                },
+                cls=JSONEncoder,
+            )
+        )
 
     async def send_notification(self, event):
         # Send notification to WebSocket
         await self.send(text_data=json.dumps(event["message"]))
 
+    async def upload_progress(self, event):
+        # Send upload job progress to the WebSocket
+        await self.send(
+            text_data=json.dumps({"action": "upload_progress", "job": event["message"]})
+        )
+
+    async def unread_count(self, event):
+        # Send the unread notification count to the WebSocket
+        await self.send(
+            text_data=json.dumps({"action": "unread_count", "count": event["message"]["count"]})
+        )
+
     async def reset_counter(self, event):
         # Send counter reset to the WebSocket
 
         await self.send(text_data=json.dumps({"action": "reset_counter", "count": 0}))
 
     async def disconnect(self, close_code):
-        # Remove the connection from the group
-        await self.channel_layer.group_discard(self.group_name, self.channel_name)
+        # Remove the connection from the groups
+        for group_name in self.group_names:
+            await self.channel_layer.group_discard(group_name, self.channel_name)
         print("CONNECTION HAS BEEN CLOSED...")
@@ -0,0 +1,146 @@
+import asyncio
+import json
+import random
+import time
+from asgiref.testing import ApplicationCommunicator
+from channels.layers import channel_layers
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from accounts.models import User
+from notifications.consumers import NotificationConsumer
+from notifications.services.notification_service import get_user_group
+
+
+# The group every socket used to join, to compare against the old broadcast.
+BROADCAST_GROUP = "notification_group"
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test the notification websocket fan-out with simulated sockets on "
+        "the in-memory channel layer. Each event goes to one random user through "
+        "the per-user groups (and with --compare-broadcast, to every socket as "
+        "before). Reports frames delivered, send latency, and how many frames "
+        "reached another user's socket."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sockets", type=int, default=5000)
+        parser.add_argument("--users", type=int, default=2500)
+        parser.add_argument("--events", type=int, default=20)
+        parser.add_argument(
+            "--compare-broadcast",
+            action="store_true",
+            help="Also send the events to every socket as the global group did. "
+            "Slow: every event becomes one frame per socket.",
+        )
+
+    def handle(self, *args, **options):
+        layer_config = {
+            "default": {
+                "BACKEND": "channels.layers.InMemoryChannelLayer",
+                # Room for every event on every socket in the broadcast run.
+                "CONFIG": {"capacity": options["events"] + 10},
+            }
+        }
+        with override_settings(CHANNEL_LAYERS=layer_config):
+            channel_layers.backends.clear()
+            try:
+                asyncio.run(self.run(options))
+            finally:
+                channel_layers.backends.clear()
+
+    async def connect_sockets(self, sockets: int, users: int):
+        # Unsaved users past the last id: authenticated, and with no
+        # notification backlog to send on connect.
+        first_user_id = await User.objects.order_by("-id").values_list("id", flat=True).afirst()
+        first_user_id = (first_user_id or 0) + 1
+
+        communicators = []
+        started_at = time.perf_counter()
+        for index in range(sockets):
+            user = User(id=first_user_id + index % users)
+            scope = {"type": "websocket", "path": "/ws/notifications/", "user": user, "roles": []}
+            communicator = ApplicationCommunicator(NotificationConsumer.as_asgi(), scope)
+            await communicator.send_input({"type": "websocket.connect"})
+            accept = await communicator.receive_output(timeout=10)
+            assert accept["type"] == "websocket.accept", "socket was not accepted"
+            await communicator.receive_output(timeout=10)  # "Connection has been established."
+            await communicator.receive_output(timeout=10)  # Empty notification backlog.
+            communicators.append((user.id, communicator))
+        elapsed = time.perf_counter() - started_at
+        self.stdout.write(f"connected {sockets} sockets for {users} users in {elapsed:.1f}s")
+        return communicators
+
+    async def wait_for_frames(self, communicators, expected: int, timeout: float = 300):
+        deadline = time.monotonic() + timeout
+        while True:
+            delivered = sum(c.output_queue.qsize() for _, c in communicators)
+            if delivered >= expected or time.monotonic() > deadline:
+                return delivered
+            await asyncio.sleep(0.01)
+
+    def drain_frames(self, communicators) -> int:
+        """Empty every socket's queue, returning how many frames were misdelivered."""
+        misdelivered = 0
+        for user_id, communicator in communicators:
+            while not communicator.output_queue.empty():
+                frame = json.loads(communicator.output_queue.get_nowait()["text"])
+                misdelivered += frame["user"] != user_id
+        return misdelivered
+
+    async def send_events(self, communicators, label, recipients, get_group, expected):
+        layer = channel_layers["default"]
+
+        started_at = time.perf_counter()
+        for event_id, user_id in enumerate(recipients):
+            await layer.group_send(
+                get_group(user_id),
+                {"type": "send_notification", "message": {"id": event_id, "user": user_id}},
+            )
+        sent_at = time.perf_counter()
+        delivered = await self.wait_for_frames(communicators, expected)
+        elapsed = time.perf_counter() - started_at
+
+        misdelivered = self.drain_frames(communicators)
+        events = len(recipients)
+        self.stdout.write(
+            f"{label:<10}{events:>8}{delivered:>12}{delivered / events:>14.1f}"
+            f"{(sent_at - started_at) * 1000 / events:>12.3f}{elapsed:>10.2f}{misdelivered:>14}"
+        )
+
+    async def run(self, options):
+        communicators = await self.connect_sockets(options["sockets"], options["users"])
+        sockets_per_user = {}
+        for user_id, _ in communicators:
+            sockets_per_user[user_id] = sockets_per_user.get(user_id, 0) + 1
+        recipients = [random.choice(list(sockets_per_user)) for _ in range(options["events"])]
+
+        self.stdout.write(
+            f"{'mode':<10}{'events':>8}{'frames':>12}{'frames/event':>14}"
+            f"{'send ms/ev':>12}{'total s':>10}{'other users':>14}"
+        )
+        await self.send_events(
+            communicators,
+            "per-user",
+            recipients,
+            get_user_group,
+            expected=sum(sockets_per_user[user_id] for user_id in recipients),
+        )
+
+        if options["compare_broadcast"]:
+            layer = channel_layers["default"]
+            for group in list(layer.groups):
+                for channel_name in list(layer.groups[group]):
+                    await layer.group_add(BROADCAST_GROUP, channel_name)
+            await self.send_events(
+                communicators,
+                "broadcast",
+                recipients,
+                lambda user_id: BROADCAST_GROUP,
+                expected=len(recipients) * len(communicators),
+            )
+
+        for _, communicator in communicators:
+            await communicator.send_input({"type": "websocket.disconnect", "code": 1000})
+            await communicator.wait(timeout=10)
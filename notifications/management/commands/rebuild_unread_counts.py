@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from notifications.services.unread_counter_service import rebuild_unread_counts
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the redis unread notification counters from "
+        "Notification.is_viewed with one aggregate query."
+    )
+
+    def handle(self, *args, **options):
+        counters = rebuild_unread_counts()
+        self.stdout.write(f"Rebuilt {counters} unread notification counters.")
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from notifications.services import outbox_service
+
+
+class Command(BaseCommand):
+    help = (
+        "Relay committed notifications from the outbox to the websocket channel "
+        "layer in batches. Wakes up on the NOTIFY sent when a notification "
+        "commits and also polls every --interval seconds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Defaults to settings.NOTIFICATION_RELAY_BATCH_SIZE.",
+        )
+        parser.add_argument(
+            "--interval", type=float, default=5, help="Seconds between polls."
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Stop as soon as the outbox is empty.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            outbox_service.listen()
+
+            relayed = 0
+            while True:
+                batch = outbox_service.relay_batch(options["batch_size"])
+                relayed += batch
+                if not batch:
+                    break
+            if relayed:
+                self.stdout.write(f"Relayed {relayed} notifications.")
+
+            if options["once"]:
+                break
+            outbox_service.wait_for_outbox(options["interval"])
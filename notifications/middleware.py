@@ -0,0 +1,34 @@
+from urllib.parse import parse_qs
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import TokenError
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """
+    Authenticates a websocket from the ``?token=<access token>`` query
+    parameter, the same JWT the REST API takes in the Authorization header.
+
+    Sets scope["user"] and scope["roles"] (the token's roles claim). Without
+    a valid token the scope is left as AuthMiddlewareStack set it.
+    """
+
+    @database_sync_to_async
+    def get_user_and_roles(self, raw_token: str):
+        authentication = JWTAuthentication()
+        try:
+            validated_token = authentication.get_validated_token(raw_token)
+            return authentication.get_user(validated_token), validated_token.get("roles", [])
+        except (AuthenticationFailed, TokenError):
+            return None, None
+
+    async def __call__(self, scope, receive, send):
+        query_string = parse_qs(scope.get("query_string", b"").decode())
+        raw_token = query_string.get("token", [None])[0]
+        if raw_token:
+            user, roles = await self.get_user_and_roles(raw_token)
+            if user is not None:
+                scope = dict(scope, user=user, roles=roles)
+        return await super().__call__(scope, receive, send)
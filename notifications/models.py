@@ -20,6 +20,27 @@ class Notification(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Backlog replay: a user's notifications, newest first.
+            models.Index(
+                fields=["user", "created_at", "id"],
+                name="notification_user_created_idx",
+            ),
+        ]
+
     def __str__(self):
         return f"{self.notification_type} or {self.user.username}"
 
+
+class NotificationOutbox(models.Model):
+    """
+    A committed notification that hasn't been pushed to the websocket yet.
+    Written in the same transaction as the notification and drained in id
+    order by the relay_notifications command.
+    """
+
+    notification = models.OneToOneField(
+        Notification, on_delete=models.CASCADE, related_name="outbox"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
@@ -1,30 +1,82 @@
+import re
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
-from notifications.models import Notification
+from django.db import connection, transaction
+from notifications.models import Notification, NotificationOutbox
 from notifications.apis.serializers import NotificationSerializer
+from notifications.services import unread_counter_service
+
+
+# Postgres NOTIFY channel the relay LISTENs on.
+OUTBOX_CHANNEL = "notification_outbox"
+
+
+def get_user_group(user_id) -> str:
+    """Group of every websocket the user has open."""
+    return f"notifications_user_{user_id}"
+
+
+def get_role_group(role_name: str) -> str:
+    """Group of every websocket of a user with this role."""
+    # Group names only allow ASCII letters, digits, hyphens, underscores and periods.
+    return f"notifications_role_{re.sub(r'[^0-9A-Za-z_.-]', '_', role_name)}"
+
+
+def send_event(event: dict, user_ids=(), roles=()):
+    """
+    Send a consumer event to the sockets of ``user_ids`` and of the users
+    with one of ``roles``, one group_send per recipient group.
+    """
+    channel_layer = get_channel_layer()
+    groups = [get_user_group(user_id) for user_id in user_ids]
+    groups += [get_role_group(role_name) for role_name in roles]
+    for group in groups:
+        async_to_sync(channel_layer.group_send)(group, event)
+
+
+def _wake_relay():
+    with connection.cursor() as cursor:
+        cursor.execute(f"NOTIFY {OUTBOX_CHANNEL};")
 
 
 def create_notification(lead, notification_type, message, user=None):
-    notification = Notification.objects.create(
-        user=user, lead=lead, notification_type=notification_type, message=message
-    )  # Create a new notification
-    send_notification_via_websocket(user.id, notification) # Send the notification via WebSocket
+    """
+    Create the notification together with its outbox row, in the caller's
+    transaction. Nothing is sent from here: the relay_notifications process
+    pushes it to the websocket once the transaction commits, so the caller
+    never waits on redis and rolled-back notifications are never sent.
+    """
+    with transaction.atomic():
+        notification = Notification.objects.create(
+            user=user, lead=lead, notification_type=notification_type, message=message
+        )  # Create a new notification
+        NotificationOutbox.objects.create(notification=notification)
+        transaction.on_commit(_wake_relay)
     return notification
 
 
 def send_notification_via_websocket(user_id, notification: Notification):
-    channel_layer = get_channel_layer()
     notification_serializered_data = NotificationSerializer(notification).data
 
     message = {
         "type": "send_notification",
         "message": notification_serializered_data
     }
-    async_to_sync(channel_layer.group_send)(f"notification_group", message)
+    send_event(message, user_ids=[user_id])
+
+
+def send_unread_count(user_id, count: int):
+    send_event({"type": "unread_count", "message": {"count": count}}, user_ids=[user_id])
 
 
 def reset_notification_counter(user_id):
-    channel_layer = get_channel_layer()
-    async_to_sync(channel_layer.group_send)(
-        f"notification_group", {"type": "reset_counter", "message": {"count": 0}}
-    )
+    """
+    Mark the user's relayed notifications viewed and zero their badge. The
+    ones still in the outbox stay unread: the relay counts them when it
+    sends them.
+    """
+    Notification.objects.filter(
+        user_id=user_id, is_viewed=False, outbox__isnull=True
+    ).update(is_viewed=True)
+    unread_counter_service.reset(user_id)
+    send_event({"type": "reset_counter", "message": {"count": 0}}, user_ids=[user_id])
@@ -0,0 +1,70 @@
+import select
+from collections import Counter
+from django.conf import settings
+from django.db import connection, transaction
+from notifications.models import NotificationOutbox
+from notifications.services import notification_service, unread_counter_service
+
+
+def relay_batch(batch_size: int = None) -> int:
+    """
+    Push the oldest committed outbox rows to their users' websockets and
+    delete them. Rows another relay is sending are skipped, so several relays
+    can run. If sending fails the batch is rolled back and retried, i.e.
+    delivery is at least once.
+
+    Returns the number of notifications relayed.
+    """
+    batch_size = batch_size or settings.NOTIFICATION_RELAY_BATCH_SIZE
+
+    with transaction.atomic():
+        outbox = list(
+            NotificationOutbox.objects.select_for_update(skip_locked=True, of=("self",))
+            .select_related("notification")
+            .order_by("id")[:batch_size]
+        )
+        if not outbox:
+            return 0
+
+        unread = Counter()
+        for entry in outbox:
+            notification = entry.notification
+            notification_service.send_notification_via_websocket(
+                notification.user_id, notification
+            )
+            unread[notification.user_id] += 1
+
+        NotificationOutbox.objects.filter(id__in=[entry.id for entry in outbox]).delete()
+
+        # One counter update and badge push per user and batch.
+        for user_id, count in unread.items():
+            unread_counter_service.increment(
+                user_id,
+                count,
+                on_count=lambda total, user_id=user_id: notification_service.send_unread_count(
+                    user_id, total
+                ),
+            )
+
+    return len(outbox)
+
+
+def listen():
+    """Subscribe this connection to the NOTIFY sent when notifications commit."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"LISTEN {notification_service.OUTBOX_CHANNEL};")
+
+
+def wait_for_outbox(timeout: float) -> bool:
+    """
+    Block until a notification commits or ``timeout`` seconds pass.
+    Returns whether one did. Requires listen() on the current connection.
+    """
+    pg_connection = connection.connection
+    # psycopg2 also collects notifies while running queries, e.g. the drain.
+    if not pg_connection.notifies:
+        if not select.select([pg_connection], [], [], timeout)[0]:
+            return False
+        pg_connection.poll()
+    pg_connection.notifies.clear()
+    return True
@@ -0,0 +1,123 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from notifications.models import Notification
+
+
+UNREAD_COUNT_KEY = "notifications:unread:{user_id}"
+# Relayed batches whose increment hasn't been applied yet. Only a short
+# timeout, so a relay that rolls back or dies in between doesn't keep it set.
+UNREAD_PENDING_KEY = "notifications:unread-pending:{user_id}"
+UNREAD_PENDING_TIMEOUT = 60
+
+
+def _key(user_id) -> str:
+    return UNREAD_COUNT_KEY.format(user_id=user_id)
+
+
+def _pending_key(user_id) -> str:
+    return UNREAD_PENDING_KEY.format(user_id=user_id)
+
+
+def _mark_pending(user_id):
+    cache.add(_pending_key(user_id), 0, timeout=UNREAD_PENDING_TIMEOUT)
+    cache.incr(_pending_key(user_id))
+    cache.touch(_pending_key(user_id), timeout=UNREAD_PENDING_TIMEOUT)
+
+
+def _clear_pending(user_id):
+    try:
+        cache.decr(_pending_key(user_id))
+    except ValueError:
+        # Timed out already.
+        pass
+
+
+def count_unread(user_id) -> int:
+    """
+    Unread notifications already relayed. Ones still in the outbox are
+    counted by the relay's increment once it sends them.
+    """
+    return Notification.objects.filter(
+        user_id=user_id, is_viewed=False, outbox__isnull=True
+    ).count()
+
+
+def get_unread_count(user_id) -> int:
+    """The user's unread notification count, counted once on a cache miss."""
+    count = cache.get(_key(user_id))
+    if count is None:
+        count = count_unread(user_id)
+        # A relayed batch may be in the recount and still about to increment
+        # the key; the count is right now but must not be stored. The pending
+        # mark is read after counting, as it is set before the relay commits.
+        if cache.get(_pending_key(user_id)):
+            return count
+        # add() so a concurrent increment that created the key first wins.
+        cache.add(_key(user_id), count, timeout=None)
+        count = cache.get(_key(user_id))
+    return count
+
+
+def _apply_delta(user_id, delta: int):
+    """The new count, or None when the key is missing and nothing was applied."""
+    try:
+        # INCRBY on redis, atomic across processes.
+        count = cache.incr(_key(user_id), delta)
+    except ValueError:
+        return None
+    if count < 0:
+        cache.set(_key(user_id), 0, timeout=None)
+        count = 0
+    return count
+
+
+def increment(user_id, unread: int = 1, on_count=None):
+    """
+    Count ``unread`` more unread notifications once the current transaction
+    commits. ``on_count`` is called with the new count, e.g. to push it to
+    the user. Until then the counter is marked pending, so a recount that
+    already sees these notifications doesn't get them counted twice.
+    """
+    _mark_pending(user_id)
+
+    def apply():
+        count = _apply_delta(user_id, unread)
+        _clear_pending(user_id)
+        if count is None:
+            # Missing key: the recount includes this change.
+            count = get_unread_count(user_id)
+        if on_count is not None:
+            on_count(count)
+
+    transaction.on_commit(apply)
+
+
+def decrement(user_id, viewed: int = 1) -> int:
+    """Count ``viewed`` fewer unread notifications. Returns the new count."""
+    count = _apply_delta(user_id, -viewed)
+    if count is None:
+        # Missing key: the recount includes this change.
+        count = get_unread_count(user_id)
+    return count
+
+
+def reset(user_id):
+    cache.set(_key(user_id), 0, timeout=None)
+
+
+def rebuild_unread_counts() -> int:
+    """
+    Recompute every counter from Notification.is_viewed with one aggregate
+    query, leaving out the notifications still in the outbox as count_unread
+    does. Users without notifications are counted lazily by
+    get_unread_count. Returns the number of counters written.
+    """
+    unread_counts = (
+        Notification.objects.values("user_id")
+        .annotate(unread=Count("id", filter=Q(is_viewed=False, outbox__isnull=True)))
+        .order_by()
+    )
+    counters = {_key(row["user_id"]): row["unread"] for row in unread_counts}
+    cache.set_many(counters, timeout=None)
+    return len(counters)
@@ -1,3 +1,247 @@
-from django.test import TestCase
+import asyncio
+import json
+from datetime import timedelta
+from unittest import mock
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from channels.layers import channel_layers
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from accounts.models import User
+from leads.models import LeadRemark, StudentLeads
+from notifications.consumers import NotificationConsumer
+from notifications.models import Notification, NotificationOutbox
+from notifications.services import outbox_service, unread_counter_service
+from notifications.services.notification_service import (
+    create_notification,
+    reset_notification_counter,
+    send_unread_count,
+)
+from utilities import constants as const
 
-# Create your tests here.
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}},
+)
+class UnreadCounterTestCase(TestCase):
+    """A queued notification is counted once, by the relay that sends it."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="agent@example.com")
+        lead = StudentLeads.objects.create(first_name="Asha", email="asha@example.com")
+        cls.remark = LeadRemark.objects.create(lead=lead, user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        channel_layers.backends.clear()
+        self.addCleanup(channel_layers.backends.clear)
+
+    def notify(self):
+        return create_notification(self.remark, "follow-up-reminder", "Call back", user=self.user)
+
+    def relay(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            relayed = outbox_service.relay_batch()
+        self.assertFalse(NotificationOutbox.objects.exists())
+        return relayed
+
+    def test_queued_notifications_are_not_counted_before_the_relay(self):
+        self.notify()
+        self.notify()
+        self.assertEqual(unread_counter_service.count_unread(self.user.id), 0)
+        self.assertEqual(unread_counter_service.get_unread_count(self.user.id), 0)
+
+        self.assertEqual(self.relay(), 2)
+        self.assertEqual(unread_counter_service.get_unread_count(self.user.id), 2)
+        self.assertEqual(unread_counter_service.count_unread(self.user.id), 2)
+
+    def test_rebuild_does_not_count_queued_notifications_twice(self):
+        self.notify()
+        self.relay()
+        self.notify()
+
+        self.assertEqual(unread_counter_service.rebuild_unread_counts(), 1)
+        self.assertEqual(unread_counter_service.get_unread_count(self.user.id), 1)
+
+        self.relay()
+        self.assertEqual(unread_counter_service.get_unread_count(self.user.id), 2)
+        self.assertEqual(unread_counter_service.count_unread(self.user.id), 2)
+
+    def test_recount_between_relay_commit_and_increment_is_not_stored(self):
+        self.notify()
+        self.assertEqual(unread_counter_service.get_unread_count(self.user.id), 0)
+        cache.clear()
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            outbox_service.relay_batch()
+        # The relay committed, its increment hasn't run: the recount sees the
+        # notification already.
+        self.assertEqual(unread_counter_service.get_unread_count(self.user.id), 1)
+        for callback in callbacks:
+            callback()
+
+        self.assertEqual(unread_counter_service.get_unread_count(self.user.id), 1)
+        self.notify()
+        self.relay()
+        self.assertEqual(unread_counter_service.get_unread_count(self.user.id), 2)
+
+    def test_reset_keeps_queued_notifications_unread(self):
+        self.notify()
+        self.relay()
+        queued = self.notify()
+
+        reset_notification_counter(self.user.id)
+        self.assertEqual(unread_counter_service.get_unread_count(self.user.id), 0)
+        queued.refresh_from_db()
+        self.assertFalse(queued.is_viewed)
+
+        self.relay()
+        self.assertEqual(unread_counter_service.get_unread_count(self.user.id), 1)
+        self.assertEqual(unread_counter_service.count_unread(self.user.id), 1)
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}},
+)
+class NotificationConsumerTestCase(TestCase):
+    """
+    Driven through asgiref's ApplicationCommunicator; channels' own
+    WebsocketCommunicator needs daphne, which isn't a dependency.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="agent@example.com")
+        cls.other_user = User.objects.create_user(email="other@example.com")
+        lead = StudentLeads.objects.create(first_name="Asha", email="asha@example.com")
+        remark = LeadRemark.objects.create(lead=lead, user=cls.user)
+        now = timezone.now()
+
+        def notify(user, minutes_ago):
+            notification = Notification.objects.create(
+                user=user, lead=remark, notification_type="others", message="Hello"
+            )
+            Notification.objects.filter(id=notification.id).update(
+                created_at=now - timedelta(minutes=minutes_ago)
+            )
+            return notification.id
+
+        # Three share a timestamp, so paging has to break ties by id.
+        notifications = [(minutes, notify(cls.user, minutes)) for minutes in (5, 1, 5, 12, 5, 9)]
+        notify(cls.other_user, 3)
+        notify(cls.user, 60 * 24 * 8)  # older than the week the backlog covers
+        # Newest first, ties by the newest id.
+        cls.backlog_ids = [id for _, id in sorted(notifications, key=lambda row: (row[0], -row[1]))]
+
+    def setUp(self):
+        cache.clear()
+        channel_layers.backends.clear()
+        self.addCleanup(channel_layers.backends.clear)
+
+    async def receive(self, communicator):
+        frame = await communicator.receive_output(timeout=5)
+        return json.loads(frame["text"])
+
+    async def connect(self, user, query_string=b""):
+        """Open a socket and return it with its backlog frame."""
+        scope = {
+            "type": "websocket",
+            "path": "/ws/notifications/",
+            "user": user,
+            "roles": [],
+            "query_string": query_string,
+        }
+        communicator = ApplicationCommunicator(NotificationConsumer.as_asgi(), scope)
+        await communicator.send_input({"type": "websocket.connect"})
+        accept = await communicator.receive_output(timeout=5)
+        self.assertEqual(accept["type"], "websocket.accept")
+        await self.receive(communicator)  # "Connection has been established."
+        backlog = await self.receive(communicator)
+        unread = await self.receive(communicator)
+        self.assertEqual(unread["action"], "unread_count")
+        return communicator, backlog
+
+    async def disconnect(self, *communicators):
+        for communicator in communicators:
+            await communicator.send_input({"type": "websocket.disconnect", "code": 1000})
+            await communicator.wait(timeout=5)
+
+    async def load_backlog(self, communicator, cursor):
+        await communicator.send_input(
+            {"type": "websocket.receive", "text": json.dumps({"action": "load_backlog", "cursor": cursor})}
+        )
+        return await self.receive(communicator)
+
+    def get_ids(self, backlog):
+        self.assertEqual(backlog["action"], "notification_backlog")
+        return [notification["id"] for notification in backlog["notifications"]]
+
+    async def test_backlog_holds_only_the_users_notifications(self):
+        communicator, backlog = await self.connect(self.user)
+        self.assertEqual(self.get_ids(backlog), self.backlog_ids)
+        self.assertIsNone(backlog["cursor"])
+        self.assertTrue(communicator.output_queue.empty())
+        await self.disconnect(communicator)
+
+    async def test_backlog_cursor_pages_without_gaps(self):
+        with mock.patch.object(const, "notification_backlog_page_size", 2):
+            communicator, backlog = await self.connect(self.user)
+            pages = [self.get_ids(backlog)]
+            while backlog["cursor"] is not None:
+                backlog = await self.load_backlog(communicator, backlog["cursor"])
+                pages.append(self.get_ids(backlog))
+            await self.disconnect(communicator)
+
+        self.assertEqual([len(page) for page in pages], [2, 2, 2])
+        self.assertEqual(sum(pages, []), self.backlog_ids)
+
+    async def test_since_resumes_after_the_last_seen_notification(self):
+        since = self.backlog_ids[3]
+        communicator, backlog = await self.connect(self.user, f"since={since}".encode())
+        self.assertEqual(self.get_ids(backlog), [id for id in self.backlog_ids if id > since])
+        await self.disconnect(communicator)
+
+    async def test_invalid_cursor_gets_an_error_frame(self):
+        communicator, _ = await self.connect(self.user)
+        backlog = await self.load_backlog(communicator, "not-a-cursor")
+        self.assertEqual(backlog, {"action": "notification_backlog", "error": "Invalid cursor."})
+        await self.disconnect(communicator)
+
+    async def test_user_event_reaches_only_that_users_sockets(self):
+        first, _ = await self.connect(self.user)
+        second, _ = await self.connect(self.user)
+        other, _ = await self.connect(self.other_user)
+
+        await sync_to_async(send_unread_count)(self.user.id, 7)
+        for communicator in (first, second):
+            self.assertEqual(
+                await self.receive(communicator), {"action": "unread_count", "count": 7}
+            )
+        await asyncio.sleep(0.1)
+        self.assertTrue(other.output_queue.empty())
+        await self.disconnect(first, second, other)
+
+    async def test_viewing_twice_decrements_once(self):
+        first, _ = await self.connect(self.user)
+        second, _ = await self.connect(self.user)
+        unread = await sync_to_async(unread_counter_service.get_unread_count)(self.user.id)
+
+        viewed = {"action": "update_status", "notification_id": self.backlog_ids[0]}
+        for communicator in (first, second, first):
+            await communicator.send_input({"type": "websocket.receive", "text": json.dumps(viewed)})
+        for communicator in (first, second):
+            self.assertEqual(
+                await self.receive(communicator), {"action": "unread_count", "count": unread - 1}
+            )
+        await asyncio.sleep(0.1)
+        self.assertTrue(first.output_queue.empty())
+        self.assertTrue(second.output_queue.empty())
+        self.assertEqual(
+            await sync_to_async(unread_counter_service.get_unread_count)(self.user.id),
+            unread - 1,
+        )
+        await self.disconnect(first, second)
@@ -20,6 +20,7 @@ from django.db import IntegrityError, transaction
 from django.core.exceptions import ObjectDoesNotExist
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from permissions.custom_permissions import CustomPermission
+from permissions.services.permission_matrix_service import invalidate_permission_matrix
 
 
 class RoleAPIView(APIView):
@@ -47,6 +48,7 @@ class RoleAPIView(APIView):
         try:
             serialized_data.is_valid(raise_exception=True)
             serialized_data.save()
+            invalidate_permission_matrix()
 
         except IntegrityError:
             payload = utils.get_payload(
@@ -82,6 +84,7 @@ class RoleAPIView(APIView):
         try:
             if deserialized_data.is_valid():
                 deserialized_data.save()
+                invalidate_permission_matrix()
 
                 payload = utils.get_payload(
                     request, detail={}, message="Role updated successfully."
@@ -114,6 +117,7 @@ class RoleAPIView(APIView):
                 return Response(data=payload, status=status.HTTP_404_NOT_FOUND)
 
             role_qs.delete()
+            invalidate_permission_matrix()
             payload = utils.get_payload(request, message="Role obj deleted.")
             return Response(data=payload, status=status.HTTP_204_NO_CONTENT)
 
@@ -165,6 +169,7 @@ class PermissionsAPIView(APIView):
             serialized_data.is_valid()
             permissions = [CustomPermissions(**item_data) for item_data in data]
             CustomPermissions.objects.bulk_create(permissions)
+            invalidate_permission_matrix()
 
         except IntegrityError as e:
             payload = utils.get_payload(
@@ -278,6 +283,7 @@ class AssignPermissionToRoleAPIView(APIView):
                         )
                     except ObjectDoesNotExist:
                         raise ObjectDoesNotExist("Object doesn't exists.")
+                invalidate_permission_matrix()
 
         except ObjectDoesNotExist as e:
             payload = utils.get_payload(
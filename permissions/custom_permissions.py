@@ -1,7 +1,6 @@
-import re
+from django.utils.encoding import escape_uri_path
 from rest_framework.permissions import BasePermission
-from utilities import utils
-from permissions.models import RoleCustomPermissionMapping
+from permissions.services import permission_matrix_service
 from rest_framework.exceptions import PermissionDenied, NotAuthenticated
 
 
@@ -13,26 +12,15 @@ class CustomPermission(BasePermission):
     permission to access a particular view.
     """
 
-    def get_auth_token(self, request):
-        auth_token = request.headers.get("Authorization", None).split(" ")[1]
-        return auth_token
-
-    def get_roles(self, decoded_token: dict):
-        return decoded_token["roles"]
+    def get_roles(self, validated_token) -> list:
+        return validated_token.get("roles", [])
 
     def get_current_endpoint(self, request):
-        current_endpoint = request.get_full_path()
-        regrx_pattern = r"(/[^/?]+(?:/[^/?]*)*)"
-        match = re.match(regrx_pattern, current_endpoint)
-
-        if match:
-            return match.group(1)
-        return request.get_full_path()
+        # Same value get_full_path() gives, without the query string.
+        return escape_uri_path(request.path)
 
     def is_permitted(self, roles: list, current_endppoint: str) -> bool:
-        return RoleCustomPermissionMapping.objects.filter(
-            role__role_name__in=roles, custom_permission__endpoint=current_endppoint
-        ).exists()
+        return permission_matrix_service.is_permitted(roles, current_endppoint)
 
     def has_permission(self, request, view):
         """
@@ -50,9 +38,8 @@ class CustomPermission(BasePermission):
         if not request.user or not request.user.is_authenticated:
             raise NotAuthenticated(detail="You are not authenticated user.")
 
-        auth_token = self.get_auth_token(request)
-        decoded_token = utils.decode_jwt_token(auth_token)
-        roles = self.get_roles(decoded_token)
+        # JWTAuthentication already validated the token, reuse its claims.
+        roles = self.get_roles(request.auth)
 
         if "admin" not in roles or not request.user.is_superuser:
             current_endppoint = self.get_current_endpoint(request)
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from permissions.models import LeadQuotaEntry, LeadsDistributions
+from permissions.services import quota_service
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the LeadQuotaEntry rows that lead queries check quotas against "
+        "from every user's LeadsDistributions."
+    )
+
+    def handle(self, *args, **options):
+        user_ids = list(
+            LeadsDistributions.objects.filter(user__isnull=False)
+            .values_list("user_id", flat=True)
+            .distinct()
+        )
+        LeadQuotaEntry.objects.exclude(user_id__in=user_ids).delete()
+
+        entries = 0
+        for user_id in user_ids:
+            entries += quota_service.sync_quota_entries(user_id)
+            quota_service.invalidate_quota(user_id)
+        self.stdout.write(f"Synced {entries} quota entries for {len(user_ids)} users.")
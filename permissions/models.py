@@ -58,3 +58,26 @@ class LeadsDistributions(models.Model):
     state = models.JSONField(null=True, blank=True)
     city = models.JSONField(null=True, blank=True)
     school = models.JSONField(null=True, blank=True)
+
+
+class LeadQuotaEntry(models.Model):
+    """
+    One allowed value of a user's LeadsDistributions list, e.g.
+    (user, "state", "DELHI"), so lead queries can check the quota with an
+    indexed EXISTS instead of reading the JSON lists.
+
+    Derived from LeadsDistributions by permissions.services.quota_service.
+    """
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="lead_quota_entries"
+    )
+    dimension = models.CharField(max_length=20)
+    value = models.CharField(max_length=400)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "dimension", "value"], name="unique_lead_quota_entry"
+            )
+        ]
@@ -0,0 +1,66 @@
+import threading
+import time
+from django.core.cache import cache
+from django.db import transaction
+from permissions.models import RoleCustomPermissionMapping
+
+
+PERMISSION_MATRIX_VERSION_KEY = "permissions:matrix-version"
+
+_matrix_lock = threading.Lock()
+_matrix = {}
+_matrix_version = None
+
+
+def get_matrix_version():
+    """Current version of the role -> endpoints matrix, shared by every process."""
+    version = cache.get(PERMISSION_MATRIX_VERSION_KEY)
+    if version is None:
+        # Start from a timestamp so an evicted key never rewinds to a version
+        # a process may already hold.
+        cache.add(PERMISSION_MATRIX_VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(PERMISSION_MATRIX_VERSION_KEY)
+    return version
+
+
+def _bump_matrix_version():
+    try:
+        cache.incr(PERMISSION_MATRIX_VERSION_KEY)
+    except ValueError:
+        get_matrix_version()
+
+
+def invalidate_permission_matrix():
+    """Make every process reload the matrix once the current transaction commits."""
+    transaction.on_commit(_bump_matrix_version)
+
+
+def load_permission_matrix() -> dict:
+    matrix = {}
+    mappings = RoleCustomPermissionMapping.objects.values_list(
+        "role__role_name", "custom_permission__endpoint"
+    )
+    for role_name, endpoint in mappings:
+        matrix.setdefault(role_name, set()).add(endpoint)
+    return {role_name: frozenset(endpoints) for role_name, endpoints in matrix.items()}
+
+
+def get_permission_matrix() -> dict:
+    """
+    The compiled role -> frozenset(endpoints) matrix of this process, reloaded
+    only when the shared version moved.
+    """
+    global _matrix, _matrix_version
+
+    version = get_matrix_version()
+    if version != _matrix_version:
+        with _matrix_lock:
+            if version != _matrix_version:
+                _matrix = load_permission_matrix()
+                _matrix_version = version
+    return _matrix
+
+
+def is_permitted(roles, endpoint: str) -> bool:
+    matrix = get_permission_matrix()
+    return any(endpoint in matrix.get(role, ()) for role in roles)
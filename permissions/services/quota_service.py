@@ -0,0 +1,148 @@
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from permissions.models import LeadQuotaEntry, LeadsDistributions
+
+
+QUOTA_CACHE_KEY = "permissions:lead-quota:{user_id}"
+QUOTA_FIELDS = ("source", "sub_source", "state", "city", "school")
+
+# Quota dimension -> the column it restricts, for StudentLeads and LeadFacet.
+LEAD_QUOTA_COLUMNS = {
+    "source": "uploaded__source",
+    "sub_source": "uploaded__sub_source",
+    "state": "address__state__name",
+    "city": "address__city__name",
+    "school": "school",
+}
+FACET_QUOTA_COLUMNS = {
+    "source": "source",
+    "sub_source": "sub_source",
+    "state": "state_name",
+    "city": "city_name",
+    "school": "school",
+}
+
+# Stored in the shared cache for users without a distribution, since a
+# cached None can't be told apart from a miss.
+NO_QUOTA = "none"
+
+_quota_lock = threading.Lock()
+_quotas = {}
+
+
+def load_quota(user_id: int):
+    """
+    The user's LeadsDistributions as field -> frozenset(values), or None when
+    the user has no distribution. An empty set leaves that field unrestricted.
+    """
+    lead_distribution = (
+        LeadsDistributions.objects.filter(user_id=user_id).values(*QUOTA_FIELDS).first()
+    )
+    if lead_distribution is None:
+        return None
+    return {
+        field: frozenset(lead_distribution[field] or ()) for field in QUOTA_FIELDS
+    }
+
+
+def _get_shared_quota(user_id: int):
+    key = QUOTA_CACHE_KEY.format(user_id=user_id)
+    cached = cache.get(key)
+    if cached is not None:
+        if cached == NO_QUOTA:
+            return None
+        return {field: frozenset(values) for field, values in cached.items()}
+
+    quota = load_quota(user_id)
+    _set_shared_quota(user_id, quota)
+    return quota
+
+
+def _set_shared_quota(user_id: int, quota):
+    cached = NO_QUOTA
+    if quota is not None:
+        cached = {field: sorted(values) for field, values in quota.items()}
+    cache.set(
+        QUOTA_CACHE_KEY.format(user_id=user_id),
+        cached,
+        timeout=settings.LEAD_QUOTA_CACHE_SECONDS,
+    )
+
+
+def get_quota(user_id: int):
+    """
+    The user's quota (see load_quota), from this process when it was fetched
+    less than LEAD_QUOTA_LOCAL_CACHE_SECONDS ago, else from the shared cache,
+    else from the database.
+    """
+    now = time.monotonic()
+    cached = _quotas.get(user_id)
+    if cached is not None and cached[1] > now:
+        return cached[0]
+
+    quota = _get_shared_quota(user_id)
+    with _quota_lock:
+        _quotas[user_id] = (quota, now + settings.LEAD_QUOTA_LOCAL_CACHE_SECONDS)
+    return quota
+
+
+def is_allowed(quota, field: str, value) -> bool:
+    """Whether ``value`` of ``field`` is inside the quota; empty fields allow all."""
+    allowed_values = quota[field]
+    return not allowed_values or value in allowed_values
+
+
+def _refresh_quota(user_id: int):
+    with _quota_lock:
+        _quotas.pop(user_id, None)
+    _set_shared_quota(user_id, load_quota(user_id))
+
+
+def invalidate_quota(user_id: int):
+    """
+    Write the user's new quota through to the shared cache once the current
+    transaction commits. Other processes pick it up when their own copy
+    expires, i.e. within LEAD_QUOTA_LOCAL_CACHE_SECONDS.
+    """
+    transaction.on_commit(lambda: _refresh_quota(user_id))
+
+
+def get_quota_filter(user_id: int, quota, columns: dict) -> Q:
+    """
+    Q keeping the rows inside the user's quota, one EXISTS on the
+    LeadQuotaEntry unique index per restricted dimension. ``columns`` maps
+    the dimensions to the queried model's fields (LEAD_QUOTA_COLUMNS or
+    FACET_QUOTA_COLUMNS).
+    """
+    query = Q()
+    for dimension, allowed_values in quota.items():
+        if allowed_values:
+            query &= Exists(
+                LeadQuotaEntry.objects.filter(
+                    user_id=user_id,
+                    dimension=dimension,
+                    value=OuterRef(columns[dimension]),
+                )
+            )
+    return query
+
+
+def sync_quota_entries(user_id: int) -> int:
+    """
+    Rewrite the user's LeadQuotaEntry rows from their LeadsDistributions.
+    Returns the number of rows written.
+    """
+    quota = load_quota(user_id) or {}
+    entries = [
+        LeadQuotaEntry(user_id=user_id, dimension=dimension, value=str(value))
+        for dimension, allowed_values in quota.items()
+        for value in allowed_values
+    ]
+    with transaction.atomic():
+        LeadQuotaEntry.objects.filter(user_id=user_id).delete()
+        LeadQuotaEntry.objects.bulk_create(entries, ignore_conflicts=True)
+    return len(entries)
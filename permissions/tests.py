@@ -1,3 +1,205 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from accounts.models import User
+from info_bridge.models import DataBridge
+from leads.apis.serializers import LeadDistributionSerializer
+from leads.models import StudentLeads
+from locations.models import Address, City, Country, State
+from permissions.models import (
+    CustomPermissions,
+    LeadQuotaEntry,
+    LeadsDistributions,
+    Role,
+    RoleCustomPermissionMapping,
+    UserRoleMapping,
+)
+from permissions.services import permission_matrix_service, quota_service
 
-# Create your tests here.
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class LeadQuotaTestCase(TestCase):
+    """Claiming leads through FetchLeadAPIView stays inside the user's quota."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.agent = User.objects.create_user(email="agent@example.com", username="agent")
+        role = Role.objects.create(role_name="agent")
+        UserRoleMapping.objects.create(user=cls.agent, role=role)
+        permission = CustomPermissions.objects.create(
+            permission_name="Fetch lead", method="GET", endpoint="/api/v1/leads/"
+        )
+        RoleCustomPermissionMapping.objects.create(role=role, custom_permission=permission)
+
+        admin = User.objects.create_superuser(email="admin@example.com")
+        cls.web = DataBridge.objects.create(
+            file_name="web.xlsx", source="WEB", sub_source="FORM", uploaded_by=admin
+        )
+        cls.fair = DataBridge.objects.create(
+            file_name="fair.xlsx", source="FAIR", sub_source="STALL", uploaded_by=admin
+        )
+        india = Country.objects.create(name="INDIA")
+        cls.cities = {}
+        for state_name, city_name in (("DELHI", "NEW DELHI"), ("KERALA", "KOCHI")):
+            state = State.objects.create(name=state_name, country=india)
+            cls.cities[state_name] = City.objects.create(name=city_name, state=state)
+
+    def setUp(self):
+        cache.clear()
+        quota_service._quotas.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.agent, token={"roles": ["agent"]})
+
+    def create_lead(self, name: str, state: str, uploaded):
+        lead = StudentLeads.objects.create(
+            first_name=name, email=f"{name.lower()}@example.com", uploaded=uploaded
+        )
+        city = self.cities[state]
+        Address.objects.create(
+            lead=lead, country=city.state.country, state=city.state, city=city
+        )
+        return lead
+
+    def set_quota(self, **quota):
+        LeadsDistributions.objects.create(user=self.agent, **quota)
+        quota_service.sync_quota_entries(self.agent.id)
+
+    def claim(self, **params):
+        return self.client.get("/api/v1/leads/", params)
+
+    def claimed_names(self):
+        return set(
+            StudentLeads.objects.filter(is_attempted=True).values_list("first_name", flat=True)
+        )
+
+    def test_state_restricted_user_cannot_claim_other_states(self):
+        self.create_lead("Delhi", "DELHI", self.web)
+        self.create_lead("Kerala", "KERALA", self.web)
+        self.set_quota(source=[], sub_source=[], state=["KERALA"], city=[], school=[])
+
+        response = self.claim(state="DELHI")
+        self.assertEqual(response.status_code, 403)
+
+        # The Delhi lead comes first by id but is outside the quota.
+        response = self.claim()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["detail"]["first_name"], "Kerala")
+
+        response = self.claim()
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.claimed_names(), {"Kerala"})
+
+    def test_empty_quota_list_leaves_the_dimension_unrestricted(self):
+        self.create_lead("Fair", "DELHI", self.fair)
+        self.create_lead("Delhi", "DELHI", self.web)
+        self.create_lead("Kerala", "KERALA", self.web)
+        # No state list: every state of the WEB source is allowed.
+        self.set_quota(source=["WEB"], sub_source=None, state=[], city=None, school=None)
+
+        response = self.claim(batch=5)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.claimed_names(), {"Delhi", "Kerala"})
+
+    def test_user_without_quota_cannot_claim(self):
+        self.create_lead("Delhi", "DELHI", self.web)
+
+        response = self.claim()
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.claimed_names(), set())
+
+    def test_distribution_update_rewrites_entries_and_cache(self):
+        self.set_quota(source=["WEB"], sub_source=[], state=["DELHI"], city=[], school=[])
+        self.assertEqual(quota_service.get_quota(self.agent.id)["state"], {"DELHI"})
+
+        serializer = LeadDistributionSerializer(
+            data={"source": ["FAIR"], "sub_source": [], "state": ["KERALA", "GOA"]},
+            context={"user_id": self.agent.id},
+        )
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        with self.captureOnCommitCallbacks(execute=True):
+            serializer.save()
+
+        entries = set(
+            LeadQuotaEntry.objects.filter(user=self.agent).values_list("dimension", "value")
+        )
+        self.assertEqual(entries, {("source", "FAIR"), ("state", "GOA"), ("state", "KERALA")})
+
+        cached = cache.get(quota_service.QUOTA_CACHE_KEY.format(user_id=self.agent.id))
+        self.assertEqual(cached["source"], ["FAIR"])
+        self.assertEqual(cached["state"], ["GOA", "KERALA"])
+        quota = quota_service.get_quota(self.agent.id)
+        self.assertEqual(quota["source"], {"FAIR"})
+        self.assertEqual(quota["state"], {"GOA", "KERALA"})
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class PermissionMatrixTestCase(TestCase):
+    """Every write path that changes role permissions reloads the cached matrix."""
+
+    probe = "/api/v1/roles/permissions/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.agent = User.objects.create_user(email="agent@example.com", username="agent")
+        cls.admin = User.objects.create_superuser(email="admin@example.com")
+
+    def setUp(self):
+        cache.clear()
+        permission_matrix_service._matrix_version = None
+        self.admin_client = APIClient()
+        self.admin_client.force_authenticate(user=self.admin, token={"roles": ["admin"]})
+
+    def request_as(self, roles, path=None):
+        client = APIClient()
+        client.force_authenticate(user=self.agent, token={"roles": roles})
+        return client.get(path or self.probe).status_code
+
+    def write(self, method, path, data):
+        version = permission_matrix_service.get_matrix_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = getattr(self.admin_client, method)(path, data, format="json")
+        self.assertIn(response.status_code, (200, 204), response.data)
+        self.assertNotEqual(permission_matrix_service.get_matrix_version(), version)
+        return response
+
+    def test_role_permission_writes_take_effect(self):
+        # Warm this process's matrix so a missed invalidation would show.
+        self.assertEqual(self.request_as(["caller"]), 403)
+
+        self.write("post", "/api/v1/roles/", {"role_name": "caller"})
+        self.write(
+            "post",
+            "/api/v1/roles/permissions/",
+            [{"permission_name": "List permissions", "method": "GET", "endpoint": self.probe}],
+        )
+        self.assertEqual(self.request_as(["caller"]), 403)
+
+        self.write(
+            "post",
+            "/api/v1/roles/assign-permissions-to-role/",
+            [{"role_name": "caller", "method": "GET", "endpoint": self.probe}],
+        )
+        self.assertEqual(self.request_as(["caller"]), 200)
+
+        slug = Role.objects.get(role_name="caller").slug
+        self.write("patch", "/api/v1/roles/", {"slug": slug, "role_name": "dialer"})
+        self.assertEqual(self.request_as(["caller"]), 403)
+        self.assertEqual(self.request_as(["dialer"]), 200)
+
+        self.write("delete", "/api/v1/roles/", {"slug": [slug]})
+        self.assertEqual(self.request_as(["dialer"]), 403)
+
+    def test_endpoint_outside_the_matrix_is_denied(self):
+        role = Role.objects.create(role_name="caller")
+        permission = CustomPermissions.objects.create(
+            permission_name="List permissions", method="GET", endpoint=self.probe
+        )
+        RoleCustomPermissionMapping.objects.create(role=role, custom_permission=permission)
+
+        self.assertEqual(self.request_as(["caller"], f"{self.probe}?page=2"), 200)
+        self.assertEqual(self.request_as(["caller"], "/api/v1/roles/"), 403)
+        self.assertEqual(self.request_as(["caller"], "/api/v1/leads/"), 403)
@@ -2,4 +2,6 @@ email_validator_pattern="^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$"
 page_size = 20
 page_size_query_param = 'page_size'
 max_page_size = 10
-files_extensions=["CSV", "XLSX"]
\ No newline at end of file
+files_extensions=["CSV", "XLSX"]
+max_lead_claim_batch = 50
+notification_backlog_page_size = 50
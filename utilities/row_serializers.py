@@ -0,0 +1,66 @@
+from operator import itemgetter
+from utilities import utils
+
+
+def format_datetime(value):
+    """utils.convert_into_desired_dtime_format, None for missing values."""
+    if value is None:
+        return None
+    return utils.convert_into_desired_dtime_format(value)
+
+
+def _make_getter(sources, convert):
+    """Function reading one output value from a values() row."""
+    if convert is None:
+        return itemgetter(*sources)
+    if len(sources) == 1:
+        (source,) = sources
+        return lambda row: convert(row[source])
+    read = itemgetter(*sources)
+    return lambda row: convert(*read(row))
+
+
+class RowSerializer:
+    """
+    Read-only serializer for the hot list endpoints. The queryset is
+    projected with values() and every row dict is turned into the response
+    dict by getters built once per class, skipping DRF's per-field
+    machinery.
+
+    ``fields`` lists (key, source, convert) in output order. ``source`` is a
+    values() path such as "lead__email", or a tuple of paths that are all
+    passed to ``convert``. ``convert`` may be None to copy the value as is.
+    """
+
+    fields = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.sources = []
+        getters = []
+        for key, source, convert in cls.fields:
+            sources = source if isinstance(source, tuple) else (source,)
+            for name in sources:
+                if name not in cls.sources:
+                    cls.sources.append(name)
+            getters.append((key, _make_getter(sources, convert)))
+
+        def to_dict(row):
+            return {key: get(row) for key, get in getters}
+
+        cls.to_dict = staticmethod(to_dict)
+
+    @classmethod
+    def project(cls, queryset):
+        """Only the columns the fields read, one dict per row."""
+        return queryset.values(*cls.sources)
+
+    def __init__(self, instance, many=False):
+        self.instance = instance
+        self.many = many
+
+    @property
+    def data(self):
+        if self.many:
+            return list(map(self.to_dict, self.instance))
+        return self.to_dict(self.instance)
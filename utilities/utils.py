@@ -1,4 +1,5 @@
 import jwt
+import json
 import re
 import random
 import string
@@ -6,8 +7,12 @@ from typing import Any
 from utilities import constants as const
 from django.utils.text import slugify
 from django.conf import settings
-from datetime import datetime
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date, datetime, time
+from django.db import connections
+from django.db.models import Q
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 from rest_framework.response import Response
 from rest_framework.exceptions import NotFound
 from utilities.custom_exceptions import PageNotFound
@@ -130,3 +135,177 @@ class CustomPageNumberPagination(PageNumberPagination):
 
 
 class StandardResultsSetPagination(CustomPageNumberPagination): ...
+
+
+class KeysetPagination:
+    """
+    Cursor pagination keyed on (ordering column, pk) instead of OFFSET, so
+    deep pages cost the same as the first one given an index on the
+    filter columns followed by (ordering column, id).
+
+    The response has the same shape as CustomPageNumberPagination's. The
+    count is estimated from the query plan by default; ``?count=exact`` runs
+    a real COUNT(*) and ``?count=none`` skips it.
+    """
+
+    page_size = const.page_size
+    page_size_query_param = const.page_size_query_param
+    max_page_size = const.max_page_size
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    count_modes = ("estimate", "exact", "none")
+
+    def __init__(self, ordering: str):
+        self.descending = ordering.startswith("-")
+        self.ordering_field = ordering.lstrip("-")
+
+    def get_page_size(self, request) -> int:
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def encode_cursor(self, obj, reverse: bool = False) -> str:
+        # Pages of values() querysets hold dicts rather than instances.
+        if isinstance(obj, dict):
+            value, pk = obj[self.ordering_field], obj[self.model._meta.pk.attname]
+        else:
+            value, pk = getattr(obj, self.ordering_field), obj.pk
+        if isinstance(value, (date, datetime, time)):
+            # isoformat() keeps the microseconds an exact keyset needs.
+            value = value.isoformat()
+        cursor = json.dumps({"v": value, "id": pk, "r": reverse})
+        return urlsafe_b64encode(cursor.encode()).decode()
+
+    def decode_cursor(self, request, model):
+        return self.parse_cursor(request.query_params.get(self.cursor_query_param), model)
+
+    def parse_cursor(self, encoded, model):
+        """(value, pk, reverse) of an encoded cursor, None when there is none."""
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode()))
+            field = model._meta.get_field(self.ordering_field)
+            value = None if cursor["v"] is None else field.to_python(cursor["v"])
+            return value, int(cursor["id"]), bool(cursor["r"])
+        except Exception:
+            raise PageNotFound(detail="Invalid cursor.")
+
+    def get_seek_filter(self, model, value, pk, descending: bool) -> Q:
+        """
+        Rows after (value, pk) in the order (ordering column, pk), both
+        ``descending`` or both ascending, with NULLs sorting as Postgres does
+        by default (first when descending, last when ascending).
+
+        The column bound comes first so the index scan starts at the cursor
+        instead of filtering its way there.
+        """
+        field = self.ordering_field
+        lt, lte = ("lt", "lte") if descending else ("gt", "gte")
+        nullable = model._meta.get_field(field).null
+
+        if value is None:
+            seek = Q(**{f"{field}__isnull": True, f"pk__{lt}": pk})
+            if descending:
+                seek |= Q(**{f"{field}__isnull": False})
+            return seek
+
+        seek = Q(**{f"{field}__{lte}": value}) & (
+            Q(**{f"{field}__{lt}": value}) | Q(**{f"pk__{lt}": pk})
+        )
+        if nullable and not descending:
+            seek |= Q(**{f"{field}__isnull": True})
+        return seek
+
+    def get_count(self, queryset):
+        count_mode = self.request.query_params.get(self.count_query_param, "estimate")
+        if count_mode not in self.count_modes or count_mode == "none":
+            return None
+        queryset = queryset.order_by()
+        if count_mode == "exact":
+            return queryset.count()
+
+        sql, params = queryset.query.sql_with_params()
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]["Plan"]["Plan Rows"]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.model = model = queryset.model
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request, model)
+        reverse = cursor is not None and cursor[2]
+
+        self.count = self.get_count(queryset)
+
+        descending = self.descending != reverse
+        direction = "-" if descending else ""
+        queryset = queryset.order_by(
+            f"{direction}{self.ordering_field}", f"{direction}pk"
+        )
+        if cursor is not None:
+            queryset = queryset.filter(
+                self.get_seek_filter(model, cursor[0], cursor[1], descending)
+            )
+
+        page = list(queryset[: page_size + 1])
+        has_more = len(page) > page_size
+        page = page[:page_size]
+        if reverse:
+            page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+
+        self.page = page
+        return page
+
+    def get_next_link(self):
+        if not (self.has_next and self.page):
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.page[-1])
+        )
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        url = self.request.build_absolute_uri()
+        if not self.page:
+            return remove_query_param(url, self.cursor_query_param)
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.page[0], reverse=True)
+        )
+
+    def get_paginated_response(self, data):
+        return {
+            "pagination_info": {
+                "links": {
+                    "next": self.get_next_link(),
+                    "previous": self.get_previous_link(),
+                },
+                "count": self.count,
+            }
+        }
+
+
+def get_paginator(request, ordering: str):
+    """
+    Keyset pagination on ``ordering`` for ``?pagination=cursor``, the shared
+    page number paginator otherwise.
+    """
+    if request.query_params.get("pagination") == "cursor":
+        return KeysetPagination(ordering=ordering)
+
+    from utilities import pagination
+
+    return pagination